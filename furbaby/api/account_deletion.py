@@ -0,0 +1,172 @@
+"""
+Asynchronous account deletion.
+
+Deleting a user through the ORM makes Django's collector load every dependent row (pets,
+jobs, applications, locations, ...) into memory in the request. Instead the account is disabled
+right away (`schedule_account_deletion`) and an `AccountDeletion` job removes the dependent rows
+afterwards, children first, with raw `DELETE`s of at most `ACCOUNT_DELETION_BATCH_SIZE` rows
+each committed on its own, then the user's objects in storage and finally the user row.
+
+Jobs are run in a background thread once the request has committed, jobs that didn't complete
+(e.g. the process was restarted) are picked up by `manage.py process_account_deletions`.
+
+NOTE: pictures stored by content hash may be shared with other records, unreferenced ones are
+removed by `manage.py reconcile_pictures`
+"""
+
+import threading
+
+from django.conf import settings
+from django.contrib.admin.models import LogEntry
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django_rest_passwordreset.models import ResetPasswordToken
+
+from .models import AccountDeletion, Applications, Jobs, Locations, Notifications, Pets, Users
+from .storage import get_storage
+from .tokens import revoke_user_tokens
+from .user_cache import invalidate_cached_user
+from .utils import make_s3_path
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def schedule_account_deletion(user):
+    """disables the account of `user` and schedules the deletion of everything it owns"""
+    Users.objects.filter(pk=user.pk).update(is_active=False)
+    invalidate_cached_user(user.pk)
+    revoke_user_tokens(user.pk)
+    deletion, _ = AccountDeletion.objects.get_or_create(user_id=user.pk)
+    if getattr(settings, "ACCOUNT_DELETION_IN_BACKGROUND", True):
+        transaction.on_commit(lambda: start_account_deletion(deletion.id))
+    return deletion
+
+
+def start_account_deletion(deletion_id):
+    thread = threading.Thread(
+        target=__run_in_thread__,
+        args=(deletion_id,),
+        name="account-deletion-{}".format(deletion_id),
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def __run_in_thread__(deletion_id):
+    try:
+        run_account_deletion(deletion_id)
+    finally:
+        # threads get their own database connection, which Django won't close for them
+        connection.close()
+
+
+def __table__(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def __deletion_steps__():
+    """(name, table, primary key, condition) of the rows to delete, children first"""
+    pets, locations, jobs = (__table__(model) for model in (Pets, Locations, Jobs))
+    jobs_of_user = (
+        "SELECT id FROM {jobs} WHERE user_id = %(user_id)s "
+        "OR pet_id IN (SELECT id FROM {pets} WHERE owner_id = %(user_id)s) "
+        "OR location_id IN (SELECT id FROM {locations} WHERE user_id = %(user_id)s)"
+    ).format(jobs=jobs, pets=pets, locations=locations)
+    groups = Users._meta.get_field("groups")
+    user_permissions = Users._meta.get_field("user_permissions")
+
+    return [
+        (
+            "applications",
+            __table__(Applications),
+            "id",
+            "user_id = %(user_id)s OR job_id IN ({})".format(jobs_of_user),
+        ),
+        ("jobs", jobs, "id", "id IN ({})".format(jobs_of_user)),
+        ("pets", pets, "id", "owner_id = %(user_id)s"),
+        ("locations", locations, "id", "user_id = %(user_id)s"),
+        ("notifications", __table__(Notifications), "id", "recipient_id = %(user_id)s"),
+        ("password_reset_tokens", __table__(ResetPasswordToken), "id", "user_id = %(user_id)s"),
+        ("admin_log_entries", __table__(LogEntry), "id", "user_id = %(user_id)s"),
+        (
+            "groups",
+            __table__(groups.remote_field.through),
+            "id",
+            "{} = %(user_id)s".format(groups.m2m_column_name()),
+        ),
+        (
+            "user_permissions",
+            __table__(user_permissions.remote_field.through),
+            "id",
+            "{} = %(user_id)s".format(user_permissions.m2m_column_name()),
+        ),
+    ]
+
+
+def __delete_in_batches__(deletion, name, table, primary_key, condition, batch_size):
+    query = (
+        "DELETE FROM {table} WHERE {pk} IN "
+        "(SELECT {pk} FROM {table} WHERE {condition} LIMIT %(batch_size)s)"
+    ).format(table=table, pk=primary_key, condition=condition)
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(query, {"user_id": deletion.user_id, "batch_size": batch_size})
+            deleted = cursor.rowcount
+        __record_progress__(deletion, name, deleted)
+        if deleted < batch_size:
+            return
+
+
+def __delete_storage_objects__(deletion):
+    storage = get_storage()
+    prefix = make_s3_path(getattr(settings, "ASSETS_PATH"), str(deletion.user_id)) + "/"
+    for page in storage.list_objects(prefix):
+        __record_progress__(deletion, "storage", storage.delete_many([obj.key for obj in page]))
+
+
+def __record_progress__(deletion, name, count):
+    deletion.progress[name] = deletion.progress.get(name, 0) + count
+    deletion.save(update_fields=["progress", "updated_at"])
+
+
+def __claim__(deletion_id, stale_before=None):
+    claimable = Q(status=PENDING)
+    if stale_before is not None:
+        # failed jobs and jobs left running by a process that went away are retried
+        claimable |= Q(status=FAILED) | Q(status=RUNNING, updated_at__lt=stale_before)
+    claimed = AccountDeletion.objects.filter(claimable, id=deletion_id).update(
+        status=RUNNING, started_at=timezone.now(), error=None
+    )
+    return claimed == 1
+
+
+def run_account_deletion(deletion_id, stale_before=None):
+    """
+    Runs the deletion job, unless it is already being run. Returns the (refreshed) job or None
+    when it couldn't be claimed
+    """
+    if not __claim__(deletion_id, stale_before):
+        return None
+
+    deletion = AccountDeletion.objects.get(id=deletion_id)
+    batch_size = getattr(settings, "ACCOUNT_DELETION_BATCH_SIZE", 1000)
+    try:
+        for name, table, primary_key, condition in __deletion_steps__():
+            __delete_in_batches__(deletion, name, table, primary_key, condition, batch_size)
+        __delete_storage_objects__(deletion)
+        __delete_in_batches__(deletion, "users", __table__(Users), "id", "id = %(user_id)s", 1)
+    except Exception as e:
+        deletion.status = FAILED
+        deletion.error = str(e)
+        deletion.save(update_fields=["status", "error", "updated_at"])
+        raise
+
+    deletion.status = DONE
+    deletion.finished_at = timezone.now()
+    deletion.save(update_fields=["status", "finished_at", "updated_at"])
+    return deletion
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        # connects the receivers invalidating the cached users & taxonomy, linking pets to it
+        from . import taxonomy, user_cache  # noqa: F401
@@ -0,0 +1,322 @@
+"""
+Async versions of the picture handlers and of the login, used when the API is served through
+ASGI (see `ASYNC_PICTURE_VIEWS`, `ASYNC_LOGIN_VIEW` and furbaby/asgi.py).
+
+Storage calls run on the bounded executor of `api.storage.AsyncStorage` with a per-call
+timeout, so a slow storage backend never blocks the event loop. Only GET requests (the hot
+path, i.e. rendering avatars and pet pictures) are served natively, uploads and deletes are
+delegated to the synchronous views (inside a transaction, as ATOMIC_REQUESTS can't wrap async
+views). Requests are authenticated like they are by the synchronous views, by their session or
+by a bearer token (see api/authentication.py).
+
+NOTE: Django 4.0's ASGI handler iterates streaming responses synchronously on the event loop
+(async iterators are only supported from Django 4.2), hence the pictures are read in chunks in
+the storage executor and returned in one response here. Full reads of pictures up to
+PICTURE_COALESCE_MAX_BYTES are shared by concurrent requests (see `api.pictures.picture_reads`),
+larger ones are read by each request; pictures are bounded by PICTURE_UPLOAD_MAX_BYTES
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import login
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import views
+from .auth_backends import EmailBackend
+from .hashing import HashingOverloaded, check_password_async
+from .models import Pets
+from .serializers import UserLoginSerializer
+from .pictures import (
+    IMMUTABLE_CACHE_CONTROL,
+    MUTABLE_CACHE_CONTROL,
+    etag_matches,
+    is_picture_hash,
+    picture_key,
+    read_picture_async,
+)
+from .storage import (
+    get_async_storage,
+    InvalidRange,
+    ObjectNotFound,
+    StorageError,
+    StorageTimeout,
+    StorageUnavailable,
+)
+from .utils import json_response, make_s3_path, parse_range_header
+
+s3AssetsFolder = getattr(settings, "ASSETS_PATH")
+
+
+def __load_authenticated_user__(request, full=False):
+    # authenticates like the synchronous views (the session, then a bearer token, see
+    # REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"]) outside of the event loop, raises
+    # AuthenticationFailed for invalid tokens
+    authenticators = [
+        authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ]
+    user = Request(request, authenticators=authenticators).user
+    if user.is_authenticated:
+        # the authentication only loads a few columns (see api/user_cache.py), handlers needing
+        # the rest of the row (`full`) can't load it lazily from the event loop
+        deferred_fields = user.get_deferred_fields()
+        if full and deferred_fields:
+            user.refresh_from_db(fields=deferred_fields)
+        return user
+    return None
+
+
+async def __authenticate__(request, full=False):
+    """
+    the user of the request and None, or None and the response rejecting the request. Only the
+    columns of api/user_cache.py are loaded, unless `full`
+    """
+    try:
+        user = await sync_to_async(__load_authenticated_user__)(request, full)
+    except exceptions.AuthenticationFailed as e:
+        # as DRF rejects it in the synchronous views (the session authenticator comes first)
+        return None, json_response(data={"detail": str(e.detail)}, status=status.HTTP_403_FORBIDDEN)
+    if user is None:
+        return None, json_response(
+            data={"error": "unauthenticated request. rejected"},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+    return user, None
+
+
+async def __record_picture_presence__(record, has_picture):
+    if record.has_picture is None:
+        await sync_to_async(views.__record_picture_presence__)(record, has_picture)
+
+
+async def __picture_response__(
+    request,
+    key,
+    picture_hash=None,
+    cache_control=MUTABLE_CACHE_CONTROL,
+    content_type="image/jpeg",
+):
+    byte_range = parse_range_header(request.META.get("HTTP_RANGE"))
+    storage = get_async_storage()
+    if byte_range is None:
+        # concurrent downloads of the same (small) picture share a single storage read
+        picture, content = await read_picture_async(storage, key, views.pictureCoalesceMaxBytes)
+    else:
+        picture, content = await storage.read(
+            key, byte_range=byte_range, max_bytes=views.pictureCoalesceMaxBytes
+        )
+
+    response_status = (
+        status.HTTP_206_PARTIAL_CONTENT if picture.content_range else status.HTTP_200_OK
+    )
+    if content is None:
+        # too large to be shared, read by this request only (see the NOTE above)
+        content = await storage.read_body(picture, views.pictureStreamChunkSize)
+    response = HttpResponse(content, content_type=content_type, status=response_status)
+    return views.__set_picture_headers__(response, picture, picture_hash, cache_control)
+
+
+def __storage_error_response__(error, message, placeholder=None):
+    if isinstance(error, StorageUnavailable):
+        return views.__storage_unavailable_response__(error, placeholder)
+    if isinstance(error, StorageTimeout):
+        return json_response(
+            data={"error": str(error), "message": message},
+            status=status.HTTP_504_GATEWAY_TIMEOUT,
+        )
+    return json_response(
+        data={"error": "failed to fetch picture, ({})".format(error), "message": message},
+        status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+    )
+
+
+@transaction.non_atomic_requests
+async def handle_profile_picture(request):
+    if request.method != "GET":
+        return await sync_to_async(transaction.atomic(views.handle_profile_picture))(request)
+
+    user, rejected = await __authenticate__(request, full=True)
+    if rejected is not None:
+        return rejected
+
+    picture_hash = user.picture_hash
+    if picture_hash is None:
+        # pictures uploaded before they were stored by content hash
+        profile_picture_path = make_s3_path(
+            s3AssetsFolder, str(user.id), "profile-picture", "picture"
+        )
+    else:
+        profile_picture_path = picture_key(picture_hash)
+
+    if user.has_picture is False:
+        # known to be missing, answered without a storage round trip
+        return views.__profile_picture_not_found_response__(user, profile_picture_path)
+    if picture_hash is not None and etag_matches(request, picture_hash):
+        return views.__not_modified_response__(picture_hash, MUTABLE_CACHE_CONTROL)
+
+    try:
+        response = await __picture_response__(
+            request, profile_picture_path, picture_hash=picture_hash
+        )
+    except InvalidRange:
+        return views.__invalid_range_response__()
+    except ObjectNotFound:
+        await __record_picture_presence__(user, False)
+        return views.__profile_picture_not_found_response__(user, profile_picture_path)
+    except StorageError as e:
+        return __storage_error_response__(
+            e,
+            "unknown error occurred while fetching user profile picture",
+            placeholder=user.picture_placeholder,
+        )
+    await __record_picture_presence__(user, True)
+    return response
+
+
+@transaction.non_atomic_requests
+async def handle_pet_pictures(request):
+    if request.method != "GET":
+        return await sync_to_async(transaction.atomic(views.handle_pet_pictures))(request)
+
+    user, rejected = await __authenticate__(request)
+    if rejected is not None:
+        return rejected
+
+    pet_id = request.GET["id"]
+    owner_id = request.GET.get("owner_id") or user.id
+    pet_info = await sync_to_async(Pets.objects.filter(id=pet_id, owner=owner_id).first)()
+
+    if pet_info == None:
+        return json_response(
+            data={
+                "error": "failed to locate pet with given name and user",
+            },
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    picture_hash = pet_info.picture_hash
+    if picture_hash is None:
+        # pictures uploaded before they were stored by content hash
+        pet_picture_path = make_s3_path(s3AssetsFolder, str(owner_id), "pets", str(pet_info.id))
+    else:
+        pet_picture_path = picture_key(picture_hash)
+
+    if pet_info.has_picture is False:
+        # known to be missing, answered without a storage round trip
+        return views.__pet_picture_not_found_response__(owner_id, pet_info)
+    if picture_hash is not None and etag_matches(request, picture_hash):
+        return views.__not_modified_response__(picture_hash, MUTABLE_CACHE_CONTROL)
+
+    try:
+        response = await __picture_response__(request, pet_picture_path, picture_hash=picture_hash)
+    except InvalidRange:
+        return views.__invalid_range_response__()
+    except ObjectNotFound:
+        await __record_picture_presence__(pet_info, False)
+        return views.__pet_picture_not_found_response__(owner_id, pet_info)
+    except StorageError as e:
+        return __storage_error_response__(
+            e,
+            "unknown error occurred while fetching pet profile picture",
+            placeholder=pet_info.picture_placeholder,
+        )
+    await __record_picture_presence__(pet_info, True)
+    return response
+
+
+@transaction.non_atomic_requests
+async def serve_picture(request, picture_hash):
+    if request.method != "GET":
+        return await sync_to_async(transaction.atomic(views.serve_picture))(request, picture_hash)
+
+    user, rejected = await __authenticate__(request)
+    if rejected is not None:
+        return rejected
+
+    if not is_picture_hash(picture_hash):
+        return json_response(
+            data={"error": "no picture present with the given hash"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    if etag_matches(request, picture_hash):
+        return views.__not_modified_response__(picture_hash, IMMUTABLE_CACHE_CONTROL)
+
+    try:
+        return await __picture_response__(
+            request,
+            picture_key(picture_hash),
+            picture_hash=picture_hash,
+            cache_control=IMMUTABLE_CACHE_CONTROL,
+        )
+    except InvalidRange:
+        return views.__invalid_range_response__()
+    except ObjectNotFound:
+        return json_response(
+            data={"error": "no picture present with the given hash"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    except StorageError as e:
+        return __storage_error_response__(e, "unknown error occurred while fetching picture")
+
+
+def __is_authenticated__(request):
+    return request.user.is_authenticated
+
+
+def __read_login_data__(request):
+    if request.content_type == "application/json":
+        try:
+            return json.loads(request.body)
+        except ValueError:
+            return {}
+    return request.POST
+
+
+@transaction.non_atomic_requests
+async def login_view(request):
+    if request.method != "POST":
+        return json_response(
+            data={"error": "incorrect request method"},
+            status=status.HTTP_405_METHOD_NOT_ALLOWED,
+        )
+
+    if await sync_to_async(__is_authenticated__)(request):
+        return json_response(
+            data={"message": "user account has already been created"},
+            status=status.HTTP_200_OK,
+        )
+
+    serializer = UserLoginSerializer(data=__read_login_data__(request))
+    if not serializer.is_valid():
+        return json_response(data=serializer.errors, status=status.HTTP_401_UNAUTHORIZED)
+
+    email_backend = EmailBackend()
+    user = await sync_to_async(email_backend.get_user_by_email)(
+        serializer.validated_data["email"]  # type: ignore
+    )
+    try:
+        # the event loop keeps serving other requests while the pool checks the password
+        verified = user != None and await check_password_async(
+            serializer.validated_data["password"], user.password  # type: ignore
+        )
+    except HashingOverloaded as e:
+        return views.__hashing_overloaded_response__(e)
+
+    if not verified or not email_backend.user_can_authenticate(user):
+        return json_response(
+            data={"message": "User is not found"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    await sync_to_async(login)(request, user)
+    return json_response(data={"message": "Login successful"}, status=status.HTTP_200_OK)
+
+
+# like `views.UserLoginView`, the login doesn't need a session (nor a CSRF token) yet. NOTE: set
+# directly, Django 4.0's csrf_exempt decorator would hide that the view is a coroutine
+login_view.csrf_exempt = True
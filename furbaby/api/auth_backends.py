@@ -1,21 +1,86 @@
 from django.contrib.auth import get_user_model, logout
 from django.contrib.auth.backends import ModelBackend
-from django.contrib.auth.hashers import check_password
+from django.core.exceptions import ValidationError
+from django.db import connections, router
+from django.utils import timezone
 from rest_framework import status
 
-from .utils import json_response, read_request_body
+from .account_deletion import schedule_account_deletion
+from .hashing import check_password
+from .user_cache import get_cached_user, invalidate_cached_user
+from .utils import json_response, normalize_email, read_request_body
+
+# request body key -> column of the profile fields a user may update
+PROFILE_FIELDS = {
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "date_of_birth": "date_of_birth",
+    "about": "experience",
+    "qualifications": "qualifications",
+    "phone_number": "phone_number",
+}
+
+
+def __update_returning__(User, email, changes):
+    """
+    updates the `changes` (column -> value) of a user in a single `UPDATE ... RETURNING`,
+    returns the updated user (None if there isn't one)
+    """
+    connection = connections[router.db_for_write(User)]
+    changes = dict(changes, updated_at=timezone.now())
+    fields = [User._meta.get_field(name) for name in changes]
+    columns = list(User._meta.concrete_fields)
+    query = "UPDATE {table} SET {assignments} WHERE {email} = %s RETURNING {columns}".format(
+        table=connection.ops.quote_name(User._meta.db_table),
+        assignments=", ".join(
+            "{} = %s".format(connection.ops.quote_name(f.column)) for f in fields
+        ),
+        email=connection.ops.quote_name(User._meta.get_field("email").column),
+        columns=", ".join(connection.ops.quote_name(f.column) for f in columns),
+    )
+    params = [f.get_db_prep_save(changes[f.name], connection) for f in fields]
+    with connection.cursor() as cursor:
+        cursor.execute(query, params + [email])
+        row = cursor.fetchone()
+    if row is None:
+        return None
+
+    # the same conversions as a queryset (e.g. the array of user types)
+    values = []
+    for field, value in zip(columns, row):
+        for converter in connection.ops.get_db_converters(field) + field.get_db_converters(
+            connection
+        ):
+            value = converter(value, field, connection)
+        values.append(value)
+    user = User.from_db(connection.alias, [f.attname for f in columns], values)
+    # not saved through the ORM, so no post_save either, see api/user_cache.py
+    invalidate_cached_user(user.pk)
+    return user
 
 
 class EmailBackend(ModelBackend):
-    def authenticate(self, request, email=None, password=None, **kwargs):
+    def get_user_by_email(self, email):
         User = get_user_model()
         try:
-            user = User.objects.get(email=email, username=email)
-            if check_password(password, user.password):
-                return user
+            return User.objects.get(email=normalize_email(email))
         except User.DoesNotExist:
             return None
 
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        user = self.get_user_by_email(email)
+        # the password is checked on the hashing pool (see api/hashing.py), accounts being
+        # deleted are disabled
+        if user != None and check_password(password, user.password):
+            if self.user_can_authenticate(user):
+                return user
+        return None
+
+    def get_user(self, user_id):
+        # loads (& caches) only the columns needed for authorization, see api/user_cache.py
+        user = get_cached_user(user_id)
+        return user if user != None and self.user_can_authenticate(user) else None
+
     def __get_user_record__(self, user=None):
         if user is None:
             return None
@@ -30,6 +95,11 @@ class EmailBackend(ModelBackend):
             "about": user.experience,
             "qualifications": user.qualifications,
             "phone_number": user.phone_number,
+            "picture_hash": user.picture_hash,
+            "picture_placeholder": user.picture_placeholder,
+            "picture_color": user.picture_color,
+            "has_picture": user.has_picture,
+            "picture_version": user.picture_version,
             "created_at": user.created_at,
             "updated_at": user.updated_at,
         }
@@ -37,7 +107,7 @@ class EmailBackend(ModelBackend):
     def get_user_info(self, request, email=None, **kwargs):
         User = get_user_model()
         try:
-            user = User.objects.get(email=email, username=email)
+            user = User.objects.get(email=normalize_email(email))
             return json_response(
                 self.__get_user_record__(user),
                 status.HTTP_200_OK,
@@ -51,12 +121,13 @@ class EmailBackend(ModelBackend):
     def delete_user(self, request, email=None, **kwargs):
         User = get_user_model()
         try:
-            user = User.objects.get(email=email, username=email)
+            user = User.objects.get(email=normalize_email(email))
             logout(request)
-            user.delete()
+            # the account is disabled right away, its rows are deleted in the background
+            deletion = schedule_account_deletion(user)
             return json_response(
-                {"message": "User deleted successfully"},
-                status.HTTP_200_OK,
+                {"message": "User deleted successfully", "deletion_id": deletion.id},
+                status.HTTP_202_ACCEPTED,
             )
         except User.DoesNotExist:
             return json_response(
@@ -66,24 +137,26 @@ class EmailBackend(ModelBackend):
 
     def update_user_info(self, request, email=None, **kwargs):
         User = get_user_model()
+        req_body = read_request_body(request)
+        # only the fields present in the body are updated (PATCH semantics, for PUT too)
+        changes = {}
         try:
-            user = User.objects.get(email=email, username=email)
-            req_body = read_request_body(request)
-            user.first_name = req_body["first_name"]  # type: ignore
-            user.last_name = req_body["last_name"]  # type: ignore
-            user.date_of_birth = req_body["date_of_birth"]  # type: ignore
-            user.experience = req_body["about"]  # type: ignore
-            user.qualifications = req_body["qualifications"]  # type: ignore
-            user.phone_number = req_body["phone_number"]  # type: ignore
-            user.save()
-            # NOTE: use user.save(update_fields=[column_names...]) to make sure
-            # that it is going to be an update on those columns alone
+            for key, name in PROFILE_FIELDS.items():
+                if key in req_body:
+                    changes[name] = User._meta.get_field(name).to_python(req_body[key])
+        except ValidationError as e:
             return json_response(
-                self.__get_user_record__(User.objects.get(email=email, username=email)),
-                status.HTTP_200_OK,
+                data={"error": "invalid {}".format(key), "details": e.messages},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        except User.DoesNotExist:
+
+        if len(changes) == 0:
+            # nothing to write, the authenticated user is the current one
+            return json_response(self.__get_user_record__(request.user), status.HTTP_200_OK)
+        user = __update_returning__(User, normalize_email(email), changes)
+        if user is None:
             return json_response(
                 data={"error": "user not found", "email": email},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        return json_response(self.__get_user_record__(user), status.HTTP_200_OK)
@@ -0,0 +1,64 @@
+import functools
+
+from django.views.decorators.csrf import csrf_protect
+from rest_framework import authentication, exceptions
+
+from .tokens import ACCESS, InvalidToken, is_current_version, verify_token
+from .user_cache import get_cached_user
+
+
+def get_bearer_token(request):
+    header = request.META.get("HTTP_AUTHORIZATION", "").split()
+    if len(header) != 2 or header[0].lower() != "bearer":
+        return None
+    return header[1]
+
+
+class BearerTokenAuthentication(authentication.BaseAuthentication):
+    """
+    Authenticates requests with an `Authorization: Bearer <access token>` header (see
+    api/tokens.py), without any database access while the user is cached: `request.user` only
+    has the columns of api/user_cache.py loaded, the others are loaded on first use
+    """
+
+    def authenticate(self, request):
+        token = get_bearer_token(request)
+        if token is None:
+            return None
+        return authenticate_access_token(token)
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
+
+
+def authenticate_access_token(token):
+    """the (user, payload) of a valid access token, raises AuthenticationFailed otherwise"""
+    try:
+        payload = verify_token(token, ACCESS)
+    except InvalidToken as e:
+        raise exceptions.AuthenticationFailed(str(e))
+
+    # deactivated (e.g. deleted) users & users who changed their password since are refused
+    user = get_cached_user(payload["sub"])
+    if user == None or not user.is_active:
+        raise exceptions.AuthenticationFailed("user is inactive or deleted")
+    if not is_current_version(payload, user):
+        raise exceptions.AuthenticationFailed("token has been revoked")
+    return user, payload
+
+
+def csrf_protect_session(view):
+    """
+    `csrf_protect` for requests authenticated by the session cookie. Requests with a bearer token
+    skip it, browsers don't attach those on their own (and can't send the header cross-site
+    without a CORS preflight)
+    """
+    protected_view = csrf_protect(view)
+
+    @functools.wraps(view)
+    def wrapped_view(request, *args, **kwargs):
+        if get_bearer_token(request) is not None:
+            return view(request, *args, **kwargs)
+        return protected_view(request, *args, **kwargs)
+
+    return wrapped_view
@@ -0,0 +1,6 @@
+from api.pictures import picture_reads
+
+
+def check(request):
+    # storage reads performed vs. saved by coalescing concurrent picture downloads
+    return picture_reads.stats()
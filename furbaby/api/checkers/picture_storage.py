@@ -0,0 +1,11 @@
+from api.storage import CircuitBreakerStorage, get_storage
+
+
+def check(request):
+    storage = get_storage()
+    if not isinstance(storage, CircuitBreakerStorage):
+        return {"backend": type(storage).__name__, "circuit_breaker": None}
+    return {
+        "backend": type(storage.storage).__name__,
+        "circuit_breaker": storage.breaker.stats(),
+    }
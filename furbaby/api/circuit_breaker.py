@@ -0,0 +1,120 @@
+"""
+A per-process circuit breaker for calls to an external dependency (the picture storage).
+
+While closed, the outcome of the last `window_size` calls is recorded. Once at least
+`minimum_calls` have been recorded and the share of failures reaches `failure_rate_threshold`
+the circuit opens: calls are rejected right away (`CircuitOpen`) for `reset_timeout` seconds
+instead of holding a worker until the dependency times out. The circuit is then half-open and
+lets `half_open_max_calls` probe calls through, it closes again once they all succeed and
+re-opens as soon as one of them fails.
+"""
+
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpen(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__("{} is unavailable, retry in {}s".format(name, retry_after))
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name="dependency",
+        failure_rate_threshold=0.5,
+        minimum_calls=20,
+        window_size=50,
+        reset_timeout=30,
+        half_open_max_calls=3,
+        is_failure=None,
+        clock=time.monotonic,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        # decides whether an exception counts as a failure of the dependency, e.g. a missing
+        # object is an answer from storage rather than a sign of it being degraded
+        self.is_failure = is_failure if is_failure is not None else (lambda error: True)
+        self.clock = clock
+
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window_size)
+        self.opened_at = None
+        self.probes = 0
+        self.probe_successes = 0
+        self.rejected = 0
+
+    def __before_call__(self):
+        with self.lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.reset_timeout - self.clock()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpen(self.name, max(int(remaining + 0.5), 1))
+                self.state = HALF_OPEN
+                self.probes = 0
+                self.probe_successes = 0
+
+            if self.state == HALF_OPEN:
+                if self.probes >= self.half_open_max_calls:
+                    self.rejected += 1
+                    raise CircuitOpen(self.name, 1)
+                self.probes += 1
+
+    def __open__(self):
+        self.state = OPEN
+        self.opened_at = self.clock()
+        self.outcomes.clear()
+
+    def __record__(self, failed):
+        with self.lock:
+            if self.state == HALF_OPEN:
+                if failed:
+                    self.__open__()
+                    return
+                self.probe_successes += 1
+                if self.probe_successes >= self.half_open_max_calls:
+                    self.state = CLOSED
+                    self.outcomes.clear()
+                return
+
+            if self.state == OPEN:
+                # a call let through before the circuit opened
+                return
+
+            self.outcomes.append(failed)
+            if len(self.outcomes) >= self.minimum_calls:
+                failure_rate = sum(self.outcomes) / len(self.outcomes)
+                if failure_rate >= self.failure_rate_threshold:
+                    self.__open__()
+
+    def call(self, function, *args, **kwargs):
+        self.__before_call__()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            self.__record__(self.is_failure(e))
+            raise
+        self.__record__(False)
+        return result
+
+    def stats(self):
+        with self.lock:
+            return {
+                "state": self.state,
+                "failure_rate": (
+                    sum(self.outcomes) / len(self.outcomes) if len(self.outcomes) > 0 else 0.0
+                ),
+                "recorded_calls": len(self.outcomes),
+                "rejected_calls": self.rejected,
+            }
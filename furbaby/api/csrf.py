@@ -0,0 +1,49 @@
+"""
+The CSRF check of streamed uploads (see api/uploads.py), which has to run before the request body
+is read.
+
+`csrf_protect` looks for the token in the form field first, i.e. in the upload being checked, so
+`HeaderCsrfCheck` only accepts the token of the CSRF header. It overrides a private method of
+`CsrfViewMiddleware` and uses private helpers of django.middleware.csrf, whose names and
+signatures are those of Django 4.0 (they change in 4.1): they are all kept in this module, and
+api/tests/test_csrf.py fails when Django changes them.
+"""
+
+from django.conf import settings
+from django.middleware.csrf import (
+    REASON_CSRF_TOKEN_MISSING,
+    REASON_NO_CSRF_COOKIE,
+    CsrfViewMiddleware,
+    InvalidTokenFormat,
+    RejectRequest,
+    _does_token_match,
+    _sanitize_token,
+)
+
+
+class HeaderCsrfCheck(CsrfViewMiddleware):
+    """
+    The checks of `csrf_protect`, with the token of the CSRF header only: the form field would be
+    looked for in the request body, i.e. in the upload being checked
+    """
+
+    def __init__(self):
+        super().__init__(lambda request: None)
+
+    def _check_token(self, request):
+        try:
+            csrf_token = self._get_token(request)
+        except InvalidTokenFormat as e:
+            raise RejectRequest("CSRF cookie {}.".format(e.reason))
+        if csrf_token is None:
+            raise RejectRequest(REASON_NO_CSRF_COOKIE)
+
+        request_csrf_token = request.META.get(settings.CSRF_HEADER_NAME)
+        if request_csrf_token is None:
+            raise RejectRequest(REASON_CSRF_TOKEN_MISSING)
+        try:
+            request_csrf_token = _sanitize_token(request_csrf_token)
+        except InvalidTokenFormat as e:
+            raise RejectRequest(self._bad_token_message(e.reason, settings.CSRF_HEADER_NAME))
+        if not _does_token_match(request_csrf_token, csrf_token):
+            raise RejectRequest(self._bad_token_message("incorrect", settings.CSRF_HEADER_NAME))
@@ -0,0 +1,192 @@
+"""
+PostgreSQL backend with connection health checks & an optional in-process pool.
+
+Without CONN_MAX_AGE every request opened a new connection to RDS (TCP, TLS & authentication)
+before its first query. With it, the connection of a worker thread is kept between requests,
+and CONN_HEALTH_CHECKS (from Django 4.1, backported here) checks it with a `SELECT 1` before its
+first use in a request, so a connection dropped by the server (failover, idle timeout) is
+replaced instead of failing the request.
+
+OPTIONS["pool"] (min_size, max_size & timeout, as in Django 5.1) shares the connections of a
+process between its threads instead: a request checks one out and returns it when it ends
+(CONN_MAX_AGE must then be 0). Django 4.0 only supports psycopg2, so the pool is psycopg2's
+ThreadedConnectionPool, which keeps min_size connections open (those above it are closed when
+returned), behind a semaphore so that requests wait up to `timeout` seconds for a connection.
+"""
+
+import os
+import threading
+
+import psycopg2
+import psycopg2.extras
+import psycopg2.pool
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+
+POOL_DEFAULTS = {"min_size": 4, "max_size": 10, "timeout": 5}
+
+
+class ConnectionPool:
+    """psycopg2's ThreadedConnectionPool, waiting up to `timeout` seconds for a connection"""
+
+    def __init__(self, conn_params, min_size, max_size, timeout):
+        if min_size > max_size:
+            raise ImproperlyConfigured("the pool min_size can't be above its max_size")
+        self.pid = os.getpid()
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.pool = psycopg2.pool.ThreadedConnectionPool(min_size, max_size, **conn_params)
+
+    def getconn(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise psycopg2.OperationalError(
+                "no database connection available after {}s".format(self.timeout)
+            )
+        try:
+            return self.pool.getconn()
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def putconn(self, connection, close=False):
+        try:
+            # rolls back an unfinished transaction, a lost connection is discarded
+            self.pool.putconn(connection, close=close)
+        finally:
+            self.slots.release()
+
+    def close(self):
+        self.pool.closeall()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, options):
+    """the pool of the connections of `alias` in this process, created on first use"""
+    # keyed by the parameters too, the tests switch the NAME of a database
+    key = (alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        # forked processes don't share the connections of their parent
+        if pool == None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(conn_params, **options)
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            if pool.pid == os.getpid():
+                pool.close()
+        _pools.clear()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        # the pool of the current connection, None when it isn't pooled
+        self.connection_pool = None
+
+    @property
+    def pool_options(self):
+        """the options of the pool, None when connections aren't pooled"""
+        options = self.settings_dict["OPTIONS"].get("pool")
+        if options == True:
+            options = {}
+        if not options:
+            return None
+        options = {**POOL_DEFAULTS, **options}
+        return options if options["max_size"] > 0 else None
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        conn_params.pop("pool", None)
+        return conn_params
+
+    def check_settings(self):
+        super().check_settings()
+        if self.pool_options != None and self.settings_dict["CONN_MAX_AGE"] != 0:
+            raise ImproperlyConfigured(
+                "Connection '{}' is pooled, its CONN_MAX_AGE must be 0".format(self.alias)
+            )
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        options = self.pool_options
+        if options == None:
+            return super().get_new_connection(conn_params)
+
+        pool = get_pool(self.alias, conn_params, options)
+        while True:
+            connection = pool.getconn()
+            # idle connections may have been dropped by the server
+            if not self.settings_dict.get("CONN_HEALTH_CHECKS") or self.__usable__(connection):
+                break
+            pool.putconn(connection, close=True)
+        self.connection_pool = pool
+
+        # as the postgresql backend does for its connections
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def connect(self):
+        # new connections are healthy
+        self.health_check_done = True
+        super().connect()
+
+    def _close(self):
+        if self.connection_pool == None:
+            return super()._close()
+        pool, self.connection_pool = self.connection_pool, None
+        with self.wrap_database_errors:
+            pool.putconn(self.connection)
+        # returned connections may be used by another thread right away
+        self.connection = None
+
+    @staticmethod
+    def __usable__(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except psycopg2.Error:
+            return False
+        # the check opened a transaction when autocommit is off
+        connection.rollback()
+        return True
+
+    def close_if_unusable_or_obsolete(self):
+        # called when requests start & end, the connection kept is checked on its next use
+        if self.connection != None:
+            self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection == None
+            or self.health_check_done
+            or self.in_atomic_block
+            or not self.settings_dict.get("CONN_HEALTH_CHECKS")
+        ):
+            return
+        self.health_check_done = True
+        if not self.is_usable():
+            self.close()
+
+    # the first uses of a connection in a request, by a query or (ATOMIC_REQUESTS) a transaction
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    @async_unsafe
+    def set_autocommit(self, autocommit, force_begin_transaction_with_broken_autocommit=False):
+        self.close_if_health_check_failed()
+        super().set_autocommit(autocommit, force_begin_transaction_with_broken_autocommit)
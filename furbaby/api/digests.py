@@ -0,0 +1,84 @@
+"""
+Notification digest emails.
+
+Notifications are only shown while their recipient has the app open (the UI polls
+`notifications_view`, which marks them read). The ones left unread for `min_age` are sent in one
+digest email per recipient: a single grouped query collects the unread notifications of every
+recipient, one outbox row is queued per digest (so the digests are rendered & sent in batches
+over one SMTP connection, at most EMAIL_OUTBOX_MAX_RATE per second, see api/outbox.py) and the
+notifications are marked emailed so that they're never sent twice.
+"""
+
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import EmailOutbox, Notifications
+
+
+def __content__(data):
+    # notifications are stored as a JSON encoded string
+    if isinstance(data, str):
+        data = json.loads(data)
+    content = data.get("content", {})
+    return {"title": content.get("title", ""), "message": content.get("message", "")}
+
+
+def unread_notifications_by_recipient(min_age=0):
+    """one row per recipient with the ids & data (newest first) of their unread notifications"""
+    return (
+        Notifications.objects.filter(
+            recipient__isnull=False,
+            recipient__is_active=True,
+            read_at=None,
+            emailed_at=None,
+            created_at__lte=timezone.now() - timedelta(seconds=min_age),
+        )
+        .values("recipient_id", "recipient__email", "recipient__first_name")
+        .annotate(
+            count=Count("id"),
+            ids=ArrayAgg("id"),
+            items=ArrayAgg("data", ordering="-created_at"),
+        )
+        .order_by()
+    )
+
+
+def queue_notification_digests(min_age=None, max_items=None):
+    """queues a digest email per recipient of unread notifications, returns how many"""
+    min_age = min_age if min_age != None else getattr(settings, "NOTIFICATION_DIGEST_MIN_AGE", 0)
+    max_items = max_items or getattr(settings, "NOTIFICATION_DIGEST_MAX_ITEMS", 10)
+    home_url = "{}/home".format(os.environ.get("FORGOT_PASSWORD_HOST", ""))
+
+    with transaction.atomic():
+        emails = []
+        notification_ids = []
+        for digest in unread_notifications_by_recipient(min_age):
+            notification_ids += digest["ids"]
+            emails.append(
+                EmailOutbox(
+                    template="notification_digest",
+                    recipient=digest["recipient__email"],
+                    context={
+                        "name": digest["recipient__first_name"] or digest["recipient__email"],
+                        "count": digest["count"],
+                        "notifications": [
+                            __content__(data) for data in digest["items"][:max_items]
+                        ],
+                        "more": max(digest["count"] - max_items, 0),
+                        "home_url": home_url,
+                    },
+                )
+            )
+        if len(emails) == 0:
+            return 0
+
+        EmailOutbox.objects.bulk_create(emails)
+        Notifications.objects.filter(id__in=notification_ids).update(emailed_at=timezone.now())
+    return len(emails)
@@ -0,0 +1,199 @@
+"""
+Offline address normalization & geocoding of locations.
+
+Locations used to keep their address as typed, so the same place had many spellings and nothing
+could be looked up by area. On save (see `Locations.save`, & the geocode_locations command for
+existing rows), the address is normalized with the USPS (Publication 28) abbreviations, e.g.
+"123 west 45 street, apt. 4b" -> "123 W 45th St Apt 4B", and the borough & coordinates are
+those of the zipcode.
+
+The zipcodes come from api/data/nyc_zipcodes.csv (the residential zipcodes of NYC, with the
+approximate centroid of each), loaded once per process into a sorted list searched with bisect
+and parallel arrays of boroughs & coordinates.
+"""
+
+import bisect
+import csv
+import re
+from array import array
+from pathlib import Path
+
+DATASET = Path(__file__).resolve().parent / "data" / "nyc_zipcodes.csv"
+
+# the columns of Locations filled by `geocode`
+GEOCODED_FIELDS = ["normalized_address", "borough", "latitude", "longitude"]
+
+BOROUGHS = ["Bronx", "Brooklyn", "Manhattan", "Queens", "Staten Island"]
+
+DIRECTIONALS = {
+    "east": "E",
+    "west": "W",
+    "north": "N",
+    "south": "S",
+    "e": "E",
+    "w": "W",
+    "n": "N",
+    "s": "S",
+}
+
+SUFFIXES = {
+    "street": "St",
+    "st": "St",
+    "str": "St",
+    "avenue": "Ave",
+    "ave": "Ave",
+    "av": "Ave",
+    "boulevard": "Blvd",
+    "blvd": "Blvd",
+    "road": "Rd",
+    "rd": "Rd",
+    "place": "Pl",
+    "pl": "Pl",
+    "drive": "Dr",
+    "dr": "Dr",
+    "lane": "Ln",
+    "ln": "Ln",
+    "court": "Ct",
+    "ct": "Ct",
+    "terrace": "Ter",
+    "ter": "Ter",
+    "parkway": "Pkwy",
+    "pkwy": "Pkwy",
+    "square": "Sq",
+    "sq": "Sq",
+    "plaza": "Plz",
+    "plz": "Plz",
+    "highway": "Hwy",
+    "hwy": "Hwy",
+    "expressway": "Expy",
+    "expy": "Expy",
+    "turnpike": "Tpke",
+    "tpke": "Tpke",
+}
+
+UNITS = {
+    "apartment": "Apt",
+    "apt": "Apt",
+    "unit": "Unit",
+    "suite": "Ste",
+    "ste": "Ste",
+    "floor": "Fl",
+    "fl": "Fl",
+    "room": "Rm",
+    "rm": "Rm",
+    "#": "#",
+}
+
+ORDINAL_WORDS = {
+    "first": "1st",
+    "second": "2nd",
+    "third": "3rd",
+    "fourth": "4th",
+    "fifth": "5th",
+    "sixth": "6th",
+    "seventh": "7th",
+    "eighth": "8th",
+    "ninth": "9th",
+    "tenth": "10th",
+    "eleventh": "11th",
+    "twelfth": "12th",
+}
+
+
+def __ordinal__(number):
+    if 10 <= number % 100 <= 20:
+        return "{}th".format(number)
+    return "{}{}".format(number, {1: "st", 2: "nd", 3: "rd"}.get(number % 10, "th"))
+
+
+class ZipcodeIndex:
+    """zipcodes in a sorted list, with their borough & centroid in parallel (compact) arrays"""
+
+    def __init__(self, rows):
+        rows = sorted(rows)
+        self.zipcodes = [row[0] for row in rows]
+        self.boroughs = array("B", [BOROUGHS.index(row[1]) for row in rows])
+        self.latitudes = array("d", [row[2] for row in rows])
+        self.longitudes = array("d", [row[3] for row in rows])
+
+    @classmethod
+    def load(cls, path=DATASET):
+        with open(path, newline="", encoding="utf-8") as file:
+            return cls(
+                (row["zipcode"], row["borough"], float(row["latitude"]), float(row["longitude"]))
+                for row in csv.DictReader(file)
+            )
+
+    def __len__(self):
+        return len(self.zipcodes)
+
+    def lookup(self, zipcode):
+        """(borough, latitude, longitude) of a 5 digits zipcode, None if it isn't in NYC"""
+        index = bisect.bisect_left(self.zipcodes, zipcode)
+        if index == len(self.zipcodes) or self.zipcodes[index] != zipcode:
+            return None
+        return BOROUGHS[self.boroughs[index]], self.latitudes[index], self.longitudes[index]
+
+
+zipcodes = ZipcodeIndex.load()
+
+
+def normalize_zipcode(zipcode):
+    """the 5 digits of a zipcode ("10001-1234" -> "10001"), None if it isn't one"""
+    match = re.match(r"^\s*(\d{5})(?:-?\d{4})?\s*$", zipcode or "")
+    return match.group(1) if match else None
+
+
+def __street_token__(token, position, tokens):
+    lowered = token.lower()
+    if re.fullmatch(r"\d+(st|nd|rd|th)", lowered):
+        return lowered
+    if lowered in ORDINAL_WORDS:
+        return ORDINAL_WORDS[lowered]
+    is_last = position == len(tokens) - 1
+    if is_last and lowered in SUFFIXES and position > 0:
+        return SUFFIXES[lowered]
+    # numbered streets & avenues: "45 street" -> "45th St"
+    next_token = tokens[position + 1].lower() if not is_last else ""
+    if lowered.isdigit() and next_token in SUFFIXES:
+        return __ordinal__(int(lowered))
+    if position == 0 and lowered in DIRECTIONALS and len(tokens) > 2:
+        return DIRECTIONALS[lowered]
+    if any(c.isdigit() for c in token):
+        return token.upper()
+    if position > 0 and lowered in ("of", "the", "and"):
+        return lowered
+    return token[:1].upper() + token[1:].lower()
+
+
+def normalize_address(address):
+    """the USPS style spelling of a street address, e.g. "123 W 45th St Apt 4B" """
+    address = re.sub(r"[.,]", " ", address or "")
+    address = re.sub(r"#\s*", "# ", address)
+    tokens = address.split()
+    if len(tokens) == 0:
+        return ""
+
+    # "37-12" house numbers (Queens) are kept as is
+    number = []
+    if re.fullmatch(r"\d+[a-zA-Z]?(-\d+[a-zA-Z]?)?", tokens[0]) and len(tokens) > 1:
+        number, tokens = [tokens[0].upper()], tokens[1:]
+
+    unit = []
+    for position, token in enumerate(tokens):
+        if token.lower() in UNITS and position > 0:
+            designator = UNITS[token.lower()]
+            unit = [designator] + [t.upper() for t in tokens[position + 1 :]]
+            tokens = tokens[:position]
+            break
+
+    street = [__street_token__(token, position, tokens) for position, token in enumerate(tokens)]
+    return " ".join(number + street + unit)
+
+
+def geocode(address, zipcode):
+    """the normalized address, borough, latitude & longitude of a location"""
+    zipcode = normalize_zipcode(zipcode)
+    found = zipcodes.lookup(zipcode) if zipcode != None else None
+    borough, latitude, longitude = found if found != None else (None, None, None)
+    return dict(zip(GEOCODED_FIELDS, (normalize_address(address), borough, latitude, longitude)))
@@ -0,0 +1,132 @@
+"""
+Password hashing off the request workers.
+
+Checking or making a password runs PBKDF2 for hundreds of milliseconds of CPU. Done inline, a
+burst of logins (e.g. at semester start) keeps every worker busy and stalls unrelated endpoints.
+Instead `check_password` & `make_password` run on a pool of `PASSWORD_HASHING_WORKERS`
+processes. At most `PASSWORD_HASHING_MAX_PENDING` hashes may be queued or running, beyond that
+`HashingOverloaded` is raised right away (answered with a 429), so excess logins are shed
+instead of piling up.
+
+With `PASSWORD_HASHING_WORKERS = 0` (the default) the hashing runs inline, the pool is opt-in.
+The async login then hashes on a thread, never on the event loop.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+class HashingOverloaded(Exception):
+    def __init__(self, retry_after=1):
+        super().__init__("too many passwords are being hashed")
+        self.retry_after = retry_after
+
+
+class HashingPool:
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.executor = None
+        # the futures of the executor that haven't completed yet
+        self.futures = set()
+
+    def __executor__(self):
+        if self.executor is None:
+            # spawned rather than forked, the request workers run threads (& hold connections)
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.executor
+
+    def __done__(self, future):
+        with self.lock:
+            self.pending -= 1
+            self.futures.discard(future)
+
+    def submit(self, fn, *args):
+        """returns a future of `fn(*args)`, raises HashingOverloaded when the queue is full"""
+        with self.lock:
+            if self.pending >= self.max_pending:
+                raise HashingOverloaded()
+            self.pending += 1
+
+        if self.workers == 0:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            try:
+                future = self.__executor__().submit(fn, *args)
+            except Exception:
+                self.__done__(None)
+                raise
+            with self.lock:
+                self.futures.add(future)
+        future.add_done_callback(self.__done__)
+        return future
+
+    def stats(self):
+        return {"workers": self.workers, "pending": self.pending, "max_pending": self.max_pending}
+
+    def shutdown(self):
+        if self.executor is not None:
+            # the queued hashes are cancelled (`shutdown(cancel_futures=True)` needs Python 3.9)
+            with self.lock:
+                futures = list(self.futures)
+            for future in futures:
+                future.cancel()
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HashingPool(
+                getattr(settings, "PASSWORD_HASHING_WORKERS", 0),
+                getattr(settings, "PASSWORD_HASHING_MAX_PENDING", 32),
+            )
+        return _pool
+
+
+@receiver(setting_changed)
+def reset_hashing_pool(*, setting, **kwargs):
+    global _pool
+    if setting in ("PASSWORD_HASHING_WORKERS", "PASSWORD_HASHING_MAX_PENDING", "PASSWORD_HASHERS"):
+        with _pool_lock:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = None
+
+
+def check_password(password, encoded):
+    return get_hashing_pool().submit(hashers.check_password, password, encoded).result()
+
+
+def make_password(password):
+    return get_hashing_pool().submit(hashers.make_password, password).result()
+
+
+async def check_password_async(password, encoded):
+    pool = get_hashing_pool()
+    if pool.workers == 0:
+        # hashed inline, on a thread rather than on the event loop
+        return await sync_to_async(check_password, thread_sensitive=False)(password, encoded)
+    return await asyncio.wrap_future(pool.submit(hashers.check_password, password, encoded))
@@ -0,0 +1,126 @@
+import threading
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.test import Client
+from django.urls import reverse
+
+from api.db.base import close_pools
+from api.models import Users
+
+
+def __percentile__(latencies, percent):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends authenticated GET requests from concurrent threads with a new database connection "
+        "per request, persistent connections & pooled connections, and reports the p50/p99 "
+        "latencies (as a throwaway user, against the default database)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="per thread")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--url", default=None, help="defaults to the whoami endpoint")
+        parser.add_argument(
+            "--pool-size", type=int, default=None, help="defaults to the concurrency"
+        )
+
+    def __requests__(self, user, url, latencies, options):
+        client = Client()
+        client.force_login(user)
+        # the login opened the connection of the thread, requests start without one
+        connections.close_all()
+        for _ in range(options["requests"]):
+            started = time.perf_counter()
+            # the test client skips the request_started & request_finished receivers
+            close_old_connections()
+            response = client.get(url)
+            close_old_connections()
+            latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            self.stderr.write("{} returned {}".format(url, response.status_code))
+        connections.close_all()
+
+    def __run__(self, label, settings, user, url, options):
+        # shared by the connections of every thread
+        settings_dict = connections["default"].settings_dict
+        saved = {key: settings_dict.get(key) for key in settings}
+        connections.close_all()
+        settings_dict.update(settings)
+        latencies = []
+        try:
+            threads = [
+                threading.Thread(target=self.__requests__, args=(user, url, latencies, options))
+                for _ in range(options["concurrency"])
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            settings_dict.update(saved)
+            close_pools()
+
+        latencies.sort()
+        self.stdout.write(
+            "{:<16} {:>8.1f} req/s p50 {:>7.2f}ms p99 {:>7.2f}ms max {:>7.2f}ms".format(
+                label,
+                len(latencies) / elapsed,
+                __percentile__(latencies, 50) * 1000,
+                __percentile__(latencies, 99) * 1000,
+                latencies[-1] * 1000,
+            )
+        )
+
+    def handle(self, *args, **options):
+        url = options["url"] or reverse("user-whoami")
+        pool_size = options["pool_size"] or options["concurrency"]
+        options_dict = connections["default"].settings_dict["OPTIONS"]
+        pool = {"min_size": pool_size, "max_size": pool_size, "timeout": 30}
+        modes = [
+            ("new connection", {"CONN_MAX_AGE": 0, "OPTIONS": {**options_dict, "pool": None}}),
+            (
+                "persistent",
+                {
+                    "CONN_MAX_AGE": 600,
+                    "CONN_HEALTH_CHECKS": True,
+                    "OPTIONS": {**options_dict, "pool": None},
+                },
+            ),
+            (
+                "pooled",
+                {
+                    "CONN_MAX_AGE": 0,
+                    "CONN_HEALTH_CHECKS": True,
+                    "OPTIONS": {**options_dict, "pool": pool},
+                },
+            ),
+        ]
+
+        user = Users.objects.create(
+            email="benchmark-db-connections@furbabyapi.net",
+            username="benchmark-db-connections@furbabyapi.net",
+            password=make_password(None),
+            user_type=["owner"],
+        )
+        self.stdout.write(
+            "{} requests to {} from {} threads per mode, {}:{}".format(
+                options["requests"] * options["concurrency"],
+                url,
+                options["concurrency"],
+                connections["default"].settings_dict["HOST"] or "localhost",
+                connections["default"].settings_dict["PORT"] or 5432,
+            )
+        )
+        try:
+            for label, settings in modes:
+                self.__run__(label, settings, user, url, options)
+        finally:
+            user.delete()
@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.models import Users
+
+TABLE = "benchmark_users"
+
+LOOKUPS = [
+    # registration used to check for existing emails with email__iexact
+    ("iexact", "SELECT id FROM {table} WHERE UPPER(email::text) = UPPER(%s)"),
+    ("email & username", "SELECT id FROM {table} WHERE email = %s AND username = %s"),
+    ("email", "SELECT id FROM {table} WHERE email = %s"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the email lookups against a temporary copy of the users table (with its "
+        "indexes) filled with generated users, nothing is written to the users table"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000000)
+        parser.add_argument("--lookups", type=int, default=200)
+
+    def __fill__(self, count):
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE {} (LIKE {} INCLUDING ALL) ON COMMIT DROP".format(
+                    TABLE, connection.ops.quote_name(Users._meta.db_table)
+                )
+            )
+            cursor.execute(
+                """
+                INSERT INTO {table} (
+                    id, email, username, password, user_type, is_superuser, is_staff,
+                    is_active, date_joined, has_picture, picture_version, created_at, updated_at
+                )
+                SELECT
+                    gen_random_uuid(), 'user' || n || '@example.com', 'user' || n || '@example.com',
+                    '', ARRAY['owner'], false, false, true, now(), false, 0, now(), now()
+                FROM generate_series(1, %s) AS n
+                """.format(
+                    table=TABLE
+                ),
+                [count],
+            )
+            cursor.execute("ANALYZE {}".format(TABLE))
+        self.stdout.write(
+            "{} users generated in {:.1f}s".format(count, time.perf_counter() - started)
+        )
+
+    def __run__(self, label, query, options):
+        query = query.format(table=TABLE)
+        emails = [
+            "user{}@example.com".format(n * options["users"] // options["lookups"] + 1)
+            for n in range(options["lookups"])
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN " + query, [emails[0]] * query.count("%s"))
+            plan = cursor.fetchone()[0]
+
+            started = time.perf_counter()
+            for email in emails:
+                cursor.execute(query, [email] * query.count("%s"))
+                cursor.fetchall()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            "{:<18} {:>9.3f} ms/lookup   {}".format(
+                label, elapsed * 1000 / options["lookups"], plan.strip()
+            )
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.__fill__(options["users"])
+            for label, query in LOOKUPS:
+                self.__run__(label, query, options)
+            transaction.set_rollback(True)
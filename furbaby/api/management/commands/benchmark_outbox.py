@@ -0,0 +1,116 @@
+import time
+
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.locmem import EmailBackend as LocMemEmailBackend
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from api.models import EmailOutbox
+from api.outbox import EMAIL_TEMPLATES, send_outbox_batch
+
+
+class LatencyEmailBackend(LocMemEmailBackend):
+    """in-memory email backend adding the latency of an SMTP (TLS) connection & of each send"""
+
+    def __init__(self, connect_latency=0.0, send_latency=0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.connect_latency = connect_latency
+        self.send_latency = send_latency
+        self.connection = None
+        self.connections = 0
+
+    def open(self):
+        if self.connection is not None:
+            return False
+        time.sleep(self.connect_latency)
+        self.connection = object()
+        self.connections += 1
+        return True
+
+    def close(self):
+        self.connection = None
+
+    def send_messages(self, messages):
+        new_connection = self.open()
+        time.sleep(self.send_latency * len(messages))
+        count = super().send_messages(messages)
+        if new_connection:
+            self.close()
+        return count
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends password reset emails one connection per email (as the request used to) and "
+        "through the outbox, with a simulated SMTP latency (nothing is kept in the database)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--emails", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--connect-latency", type=float, default=0.15, help="seconds")
+        parser.add_argument("--send-latency", type=float, default=0.01, help="seconds")
+
+    def __report__(self, label, elapsed, backend, options):
+        self.stdout.write(
+            "{:<12} {:>8.1f} emails/s {:>5} connections ({} emails in {:.3f}s)".format(
+                label,
+                options["emails"] / elapsed,
+                backend.connections,
+                options["emails"],
+                elapsed,
+            )
+        )
+
+    def __backend__(self, options):
+        return LatencyEmailBackend(options["connect_latency"], options["send_latency"])
+
+    def __contexts__(self, options):
+        return [
+            {
+                "username": "user{}@example.com".format(n),
+                "email": "user{}@example.com".format(n),
+                "reset_password_url": "https://ui.furbabyapi.net/forgot-password?token={}".format(
+                    n
+                ),
+            }
+            for n in range(options["emails"])
+        ]
+
+    def __send_inline__(self, options):
+        template = EMAIL_TEMPLATES["password_reset"]
+        backend = self.__backend__(options)
+        started = time.perf_counter()
+        for context in self.__contexts__(options):
+            message = EmailMultiAlternatives(
+                template["subject"],
+                render_to_string(template["text"], context),
+                template["from_email"],
+                [context["email"]],
+                connection=backend,
+            )
+            message.attach_alternative(render_to_string(template["html"], context), "text/html")
+            message.send()
+        self.__report__("per email", time.perf_counter() - started, backend, options)
+
+    def __send_outbox__(self, options):
+        backend = self.__backend__(options)
+        with transaction.atomic():
+            EmailOutbox.objects.bulk_create(
+                [
+                    EmailOutbox(
+                        template="password_reset", recipient=context["email"], context=context
+                    )
+                    for context in self.__contexts__(options)
+                ]
+            )
+            started = time.perf_counter()
+            while send_outbox_batch(options["batch_size"], backend, rate=0)["claimed"] > 0:
+                pass
+            self.__report__("outbox", time.perf_counter() - started, backend, options)
+            transaction.set_rollback(True)
+
+    def handle(self, *args, **options):
+        self.__send_inline__(options)
+        self.__send_outbox__(options)
@@ -0,0 +1,82 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.pictures import read_picture
+from api.singleflight import SingleFlight
+from api.storage import InMemoryStorage
+from api.utils import make_s3_path
+
+
+class SlowStorage(InMemoryStorage):
+    """in-memory storage adding a fixed latency (and counting calls) to every read"""
+
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+        self.reads = 0
+        self.reads_lock = threading.Lock()
+
+    def stream(self, key, byte_range=None):
+        with self.reads_lock:
+            self.reads += 1
+        time.sleep(self.latency)
+        return super().stream(key, byte_range=byte_range)
+
+
+class Command(BaseCommand):
+    help = "Hammers a single picture with concurrent reads, with and without coalescing"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--size", type=int, default=128 * 1024, help="picture size in bytes")
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.02,
+            help="simulated storage latency per read, in seconds",
+        )
+
+    def __run__(self, label, read, storage, options):
+        storage.reads = 0
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            started = time.perf_counter()
+            list(executor.map(lambda _: read(), range(options["requests"])))
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            "{:<12} {:>8.1f} req/s {:>6} storage reads ({} requests in {:.3f}s)".format(
+                label, options["requests"] / elapsed, storage.reads, options["requests"], elapsed
+            )
+        )
+
+    def handle(self, *args, **options):
+        max_bytes = getattr(settings, "PICTURE_COALESCE_MAX_BYTES", 1024 * 1024)
+        storage = SlowStorage(options["latency"])
+        key = make_s3_path(getattr(settings, "ASSETS_PATH"), "benchmark", "picture")
+        storage.put(key, os.urandom(options["size"]), "image/jpeg")
+        flight = SingleFlight()
+
+        self.stdout.write(
+            "{} requests for one {} byte picture, concurrency {}, {:.0f}ms storage latency".format(
+                options["requests"],
+                options["size"],
+                options["concurrency"],
+                options["latency"] * 1000,
+            )
+        )
+        self.__run__("direct", lambda: read_picture(storage, key, max_bytes), storage, options)
+        self.__run__(
+            "coalesced",
+            lambda: flight.do(key, read_picture, storage, key, max_bytes),
+            storage,
+            options,
+        )
+        stats = flight.stats()
+        self.stdout.write(
+            "coalescing saved {} of {} storage reads".format(stats["saved"], stats["calls"])
+        )
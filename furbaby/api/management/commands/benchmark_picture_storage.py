@@ -0,0 +1,86 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from api.storage import get_storage
+from api.utils import iter_stream_chunks, make_s3_path
+
+
+class Command(BaseCommand):
+    help = "Measures put/stream/delete throughput of a picture storage backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            help="dotted path of the storage backend to benchmark "
+            "(default: the backend configured through PICTURE_STORAGE)",
+        )
+        parser.add_argument(
+            "--location",
+            default="/tmp/furbaby-storage-benchmark",
+            help="storage location used with api.storage.LocalFileSystemStorage",
+        )
+        parser.add_argument("--objects", type=int, default=200)
+        parser.add_argument("--size", type=int, default=256 * 1024, help="object size in bytes")
+        parser.add_argument("--concurrency", type=int, default=8)
+
+    def __get_backend__(self, options):
+        if options["backend"] is None:
+            return get_storage()
+        backend = import_string(options["backend"])
+        if backend.__name__ == "LocalFileSystemStorage":
+            return backend(location=options["location"])
+        if backend.__name__ == "S3Storage":
+            return backend(
+                bucket_name=getattr(settings, "AWS_BUCKET_NAME"),
+                config=getattr(settings, "S3_CONFIG", None),
+            )
+        return backend()
+
+    def __report__(self, operation, count, size, elapsed):
+        self.stdout.write(
+            "{:<8} {:>8.1f} ops/s {:>10.1f} MiB/s ({} objects in {:.3f}s)".format(
+                operation,
+                count / elapsed,
+                count * size / elapsed / (1024 * 1024),
+                count,
+                elapsed,
+            )
+        )
+
+    def handle(self, *args, **options):
+        storage = self.__get_backend__(options)
+        count, size = options["objects"], options["size"]
+        chunk_size = getattr(settings, "PICTURE_STREAM_CHUNK_SIZE", 64 * 1024)
+        payload = os.urandom(size)
+        keys = [
+            make_s3_path(getattr(settings, "ASSETS_PATH"), "benchmark", str(index))
+            for index in range(count)
+        ]
+
+        def stream(key):
+            picture = storage.stream(key)
+            for _ in iter_stream_chunks(picture.body, chunk_size):
+                pass
+
+        self.stdout.write(
+            "benchmarking {} with {} objects of {} bytes, concurrency {}".format(
+                type(storage).__name__, count, size, options["concurrency"]
+            )
+        )
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            started = time.perf_counter()
+            list(executor.map(lambda key: storage.put(key, payload, "image/jpeg"), keys))
+            self.__report__("put", count, size, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            list(executor.map(stream, keys))
+            self.__report__("stream", count, size, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        storage.delete_many(keys)
+        self.__report__("delete", count, size, time.perf_counter() - started)
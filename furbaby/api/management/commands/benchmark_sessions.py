@@ -0,0 +1,68 @@
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.models import Users
+
+ENGINES = [
+    "django.contrib.sessions.backends.db",
+    "api.sessions",
+    "django.contrib.sessions.backends.signed_cookies",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends authenticated GET requests with each session engine and reports the requests/s "
+        "and the queries per request (as a throwaway user)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--url", default=None, help="defaults to the whoami endpoint")
+        parser.add_argument("--engine", action="append", dest="engines", default=None)
+
+    def __run__(self, engine, user, url, options):
+        with override_settings(SESSION_ENGINE=engine):
+            client = Client()
+            client.force_login(user)
+            # the first request warms the session cache up
+            client.get(url)
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(options["requests"]):
+                    response = client.get(url)
+                elapsed = time.perf_counter() - started
+            client.logout()
+
+        session_queries = [query for query in queries if "django_session" in query["sql"]]
+        self.stdout.write(
+            "{:<48} {:>8.1f} req/s {:>6.2f} queries/req {:>6.2f} session queries/req "
+            "(last status {})".format(
+                engine,
+                options["requests"] / elapsed,
+                len(queries) / options["requests"],
+                len(session_queries) / options["requests"],
+                response.status_code,
+            )
+        )
+
+    def handle(self, *args, **options):
+        url = options["url"] or reverse("user-whoami")
+        user = Users.objects.create(
+            email="benchmark-sessions@furbabyapi.net",
+            username="benchmark-sessions@furbabyapi.net",
+            password=make_password(None),
+            user_type=["owner"],
+        )
+        try:
+            for engine in options["engines"] or ENGINES:
+                self.__run__(engine, user, url, options)
+        finally:
+            user.delete()
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.tokens import clear_revoked_refresh_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes the records of the used & revoked refresh tokens that have expired since (like "
+        "clearsessions, to be run periodically)"
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            "{} expired refresh tokens cleared".format(clear_revoked_refresh_tokens())
+        )
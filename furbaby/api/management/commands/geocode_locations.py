@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.geocoding import GEOCODED_FIELDS, geocode
+from api.models import Locations
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills the normalized address, borough & coordinates of the locations saved before "
+        "they were geocoded (of all of them with --all, e.g. after a dataset update)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--all", action="store_true")
+
+    def handle(self, *args, **options):
+        processed, geocoded, started = 0, 0, time.perf_counter()
+        locations = Locations.objects.order_by("pk").only("id", "address", "zipcode")
+        if not options["all"]:
+            locations = locations.filter(normalized_address=None)
+
+        last_pk = None
+        while True:
+            batch = locations if last_pk == None else locations.filter(pk__gt=last_pk)
+            batch = list(batch[: options["batch_size"]])
+            if len(batch) == 0:
+                break
+            for location in batch:
+                for name, value in geocode(location.address, location.zipcode).items():
+                    setattr(location, name, value)
+                geocoded += location.latitude != None
+            Locations.objects.bulk_update(batch, GEOCODED_FIELDS)
+            processed += len(batch)
+            last_pk = batch[-1].pk
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            "{} locations processed, {} geocoded in {:.3f}s ({:.1f} rows/s)".format(
+                processed, geocoded, elapsed, processed / elapsed if elapsed > 0 else 0
+            )
+        )
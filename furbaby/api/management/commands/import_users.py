@@ -0,0 +1,159 @@
+import csv
+import json
+import os
+import re
+import time
+
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.hashing import HashingPool
+from api.models import Users
+from api.serializers import UserImportSerializer
+
+
+# readers yield the (line number, row) of the rows of a file, the row is the error message of
+# the rows that can't be read
+
+
+def __read_csv__(file):
+    reader = csv.DictReader(file)
+    for row in reader:
+        # user types are a single column, e.g. "owner;sitter"
+        row["user_type"] = [t for t in re.split(r"[;,| ]+", row.get("user_type") or "") if t]
+        # the (last) line of the row, the header & quoted line breaks included
+        yield reader.line_num, row
+
+
+def __read_jsonl__(file):
+    # blank lines are skipped but counted
+    for line_number, line in enumerate(file, start=1):
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, "invalid JSON ({})".format(e)
+                continue
+            if not isinstance(row, dict):
+                yield line_number, "not a JSON object"
+                continue
+            if isinstance(row.get("user_type"), str):
+                row["user_type"] = [row["user_type"]]
+            yield line_number, row
+
+
+def __chunks__(rows, size):
+    chunk = []
+    for line_number, row in rows:
+        chunk.append((line_number, row))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates the users of a CSV (with a header) or JSONL file of email, password, user_type "
+        "(& optionally first_name, last_name, phone_number), validated like registrations. "
+        "Passwords are hashed on a process pool and users inserted in chunks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format", choices=["csv", "jsonl"], default=None, help="defaults to the extension"
+        )
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="hashing processes, defaults to the number of CPUs (0 hashes inline)",
+        )
+
+    def __validate__(self, chunk, seen, totals):
+        """the (line number, validated data) of the new users of a chunk"""
+        valid = []
+        for line_number, row in chunk:
+            if isinstance(row, str):
+                totals["invalid"] += 1
+                self.stderr.write("line {}: {}".format(line_number, row))
+                continue
+            serializer = UserImportSerializer(data=row)
+            if not serializer.is_valid():
+                totals["invalid"] += 1
+                self.stderr.write("line {}: {}".format(line_number, json.dumps(serializer.errors)))
+                continue
+            valid.append((line_number, serializer.validated_data))
+
+        # a single query for the duplicates of the whole chunk
+        emails = [data["email"] for _, data in valid]
+        existing = set(Users.objects.filter(email__in=emails).values_list("email", flat=True))
+        new = []
+        for line_number, data in valid:
+            if data["email"] in existing or data["email"] in seen:
+                totals["duplicates"] += 1
+                self.stderr.write("line {}: {} already exists".format(line_number, data["email"]))
+                continue
+            seen.add(data["email"])
+            new.append((line_number, data))
+        return new
+
+    def __import_rows__(self, rows, pool, options):
+        totals = {"read": 0, "created": 0, "duplicates": 0, "invalid": 0}
+        seen = set()
+        for chunk in __chunks__(rows, options["chunk_size"]):
+            totals["read"] += len(chunk)
+            new = self.__validate__(chunk, seen, totals)
+            futures = [pool.submit(hashers.make_password, data["password"]) for _, data in new]
+            users = [
+                Users(**dict(data, username=data["email"], password=future.result()))
+                for (_, data), future in zip(new, futures)
+            ]
+            with transaction.atomic():
+                # users created since the duplicates were looked up (e.g. registrations) are
+                # skipped instead of failing the whole import
+                Users.objects.bulk_create(users, ignore_conflicts=True)
+                created = set(
+                    Users.objects.filter(id__in=[user.id for user in users]).values_list(
+                        "id", flat=True
+                    )
+                )
+            for (line_number, data), user in zip(new, users):
+                if user.id not in created:
+                    totals["duplicates"] += 1
+                    self.stderr.write(
+                        "line {}: {} already exists".format(line_number, data["email"])
+                    )
+            totals["created"] += len(created)
+        return totals
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or options["path"].rsplit(".", 1)[-1].lower()
+        readers = {"csv": __read_csv__, "jsonl": __read_jsonl__}
+        if file_format not in readers:
+            raise CommandError("unknown format, use --format csv or jsonl")
+        workers = options["workers"]
+        if workers == None:
+            # unlike the request workers, the command has the host to itself
+            workers = os.cpu_count() or 1
+        # sized to hold a whole chunk, unlike the pool of the request workers
+        pool = HashingPool(workers, max_pending=options["chunk_size"])
+
+        started = time.perf_counter()
+        try:
+            with open(options["path"], newline="", encoding="utf-8") as file:
+                totals = self.__import_rows__(readers[file_format](file), pool, options)
+        finally:
+            pool.shutdown()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            "{created} users created, {duplicates} duplicates & {invalid} invalid rows skipped "
+            "out of {read} in {elapsed:.3f}s ({rate:.1f} rows/s)".format(
+                elapsed=elapsed, rate=totals["read"] / elapsed if elapsed > 0 else 0, **totals
+            )
+        )
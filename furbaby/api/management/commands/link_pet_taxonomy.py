@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import Pets
+from api.taxonomy import link_pet
+
+
+class Command(BaseCommand):
+    help = (
+        "Links the pets to the species & breeds their (free text) species & breed match, those "
+        "saved before the taxonomy existed or all of them with --all (e.g. after adding aliases)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--all", action="store_true")
+
+    def handle(self, *args, **options):
+        processed, linked, started = 0, 0, time.perf_counter()
+        pets = Pets.objects.order_by("pk").only("id", "species", "breed")
+        if not options["all"]:
+            pets = pets.filter(species_taxon=None, breed_taxon=None)
+
+        last_pk = None
+        while True:
+            batch = pets if last_pk == None else pets.filter(pk__gt=last_pk)
+            batch = list(batch[: options["batch_size"]])
+            if len(batch) == 0:
+                break
+            for pet in batch:
+                link_pet(pet)
+                linked += pet.breed_taxon_id != None
+            Pets.objects.bulk_update(batch, ["species_taxon", "breed_taxon"])
+            processed += len(batch)
+            last_pk = batch[-1].pk
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            "{} pets processed, {} linked to a breed in {:.3f}s".format(processed, linked, elapsed)
+        )
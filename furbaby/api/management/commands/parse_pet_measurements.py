@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.measurements import ImplausibleMeasurement, parse_height, parse_weight
+from api.models import Pets
+
+
+def __parse__(parse, text):
+    try:
+        return parse(text)
+    except ImplausibleMeasurement:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Parses the (free text) weight & height of the pets saved before they were parsed, or of "
+        "all of them with --all (e.g. after adding units)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--all", action="store_true")
+
+    def handle(self, *args, **options):
+        processed, parsed, started = 0, 0, time.perf_counter()
+        pets = Pets.objects.order_by("pk").only("id", "weight", "height")
+        if not options["all"]:
+            pets = pets.filter(weight_grams=None, height_cm=None)
+
+        last_pk = None
+        while True:
+            batch = pets if last_pk == None else pets.filter(pk__gt=last_pk)
+            batch = list(batch[: options["batch_size"]])
+            if len(batch) == 0:
+                break
+            for pet in batch:
+                # implausible measurements saved before they were rejected aren't kept
+                pet.weight_grams = __parse__(parse_weight, pet.weight)
+                pet.height_cm = __parse__(parse_height, pet.height)
+                parsed += pet.weight_grams != None or pet.height_cm != None
+            Pets.objects.bulk_update(batch, ["weight_grams", "height_cm"])
+            processed += len(batch)
+            last_pk = batch[-1].pk
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            "{} pets processed, {} with a weight or height in {:.3f}s".format(
+                processed, parsed, elapsed
+            )
+        )
@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from api.account_deletion import FAILED, PENDING, RUNNING, run_account_deletion
+from api.models import AccountDeletion
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the account deletions that are pending, failed or were left running by a process "
+        "that went away, and reports their progress"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=60 * 60,
+            help="running deletions without progress for this long (seconds) are restarted",
+        )
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(seconds=options["stale_after"])
+        deletions = AccountDeletion.objects.filter(
+            Q(status__in=[PENDING, FAILED]) | Q(status=RUNNING, updated_at__lt=stale_before)
+        ).order_by("created_at")
+
+        for deletion_id in deletions.values_list("id", flat=True):
+            try:
+                deletion = run_account_deletion(deletion_id, stale_before=stale_before)
+            except Exception as e:
+                self.stderr.write("deletion {} failed: {}".format(deletion_id, e))
+                continue
+            if deletion is None:
+                # picked up by another process in the meantime
+                continue
+            self.stdout.write(
+                "deleted user {} in {:.3f}s: {}".format(
+                    deletion.user_id,
+                    (deletion.finished_at - deletion.started_at).total_seconds(),
+                    ", ".join(
+                        "{} {}".format(count, name) for name, count in deletion.progress.items()
+                    ),
+                )
+            )
@@ -0,0 +1,206 @@
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.models import Pets, Users
+from api.pictures import is_picture_hash
+from api.storage import ObjectNotFound, get_storage
+
+# S3 accepts at most 1000 keys per DeleteObjects call
+DELETE_BATCH_SIZE = 1000
+
+
+def parse_uuid(value):
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Pages through the picture storage and deletes the objects no user or pet refers to "
+        "anymore (pictures of deleted users & pets, replaced legacy pictures, unreferenced "
+        "content hashes and abandoned uploads)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="only report the orphaned objects, nothing is deleted",
+        )
+        parser.add_argument("--page-size", type=int, default=1000)
+        parser.add_argument(
+            "--grace-period",
+            type=int,
+            default=24 * 60 * 60,
+            help="content hash and upload objects younger than this (seconds) are kept, "
+            "an upload might be about to refer to them",
+        )
+
+    def __classify__(self, key):
+        """returns (kind, ids) for a key of the assets layout, (None, None) for other keys"""
+        parts = key[len(self.prefix) :].split("/")
+        if len(parts) == 2 and parts[0] == "pictures" and is_picture_hash(parts[1]):
+            return "picture", parts[1]
+        if len(parts) == 2 and parts[0] == "uploads":
+            return "upload", parts[1]
+        if len(parts) == 3 and parts[1:] == ["profile-picture", "picture"]:
+            user_id = parse_uuid(parts[0])
+            if user_id is not None:
+                return "user", user_id
+        if len(parts) == 3 and parts[1] == "pets":
+            user_id, pet_id = parse_uuid(parts[0]), parse_uuid(parts[2])
+            if user_id is not None and pet_id is not None:
+                return "pet", (user_id, pet_id)
+        return None, None
+
+    def __find_orphans__(self, page):
+        """returns the objects of a listing page nothing refers to, with one query per kind"""
+        classified = [
+            (stored_object, *self.__classify__(stored_object.key)) for stored_object in page
+        ]
+        ids = {"picture": set(), "upload": set(), "user": set(), "pet": set()}
+        for _, kind, object_ids in classified:
+            if kind is not None:
+                ids[kind].add(object_ids)
+            else:
+                self.counts["skipped"] += 1
+
+        # legacy pictures are only served as long as no picture was stored by content hash
+        users_with_legacy_picture = set(
+            Users.objects.filter(id__in=ids["user"], picture_hash=None).values_list("id", flat=True)
+        )
+        pets_with_legacy_picture = set(
+            Pets.objects.filter(
+                id__in=[pet_id for _, pet_id in ids["pet"]], picture_hash=None
+            ).values_list("owner_id", "id")
+        )
+        referenced_hashes = set(
+            Users.objects.filter(picture_hash__in=ids["picture"]).values_list(
+                "picture_hash", flat=True
+            )
+        ) | set(
+            Pets.objects.filter(picture_hash__in=ids["picture"]).values_list(
+                "picture_hash", flat=True
+            )
+        )
+
+        orphans = []
+        for stored_object, kind, object_ids in classified:
+            if kind == "user":
+                orphaned = object_ids not in users_with_legacy_picture
+            elif kind == "pet":
+                orphaned = object_ids not in pets_with_legacy_picture
+            elif kind == "picture":
+                orphaned = object_ids not in referenced_hashes and self.__expired__(stored_object)
+                if orphaned:
+                    self.orphaned_hashes[stored_object.key] = object_ids
+            elif kind == "upload":
+                orphaned = self.__expired__(stored_object)
+            else:
+                orphaned = False
+            if orphaned:
+                orphans.append(stored_object)
+                self.counts[kind] += 1
+        return orphans
+
+    def __expired__(self, stored_object):
+        return stored_object.last_modified is None or stored_object.last_modified < self.cutoff
+
+    def __recheck__(self, storage, keys):
+        """
+        returns the keys still orphaned right before they are deleted: an upload of the same
+        content touches the object (see `api.pictures.store_picture`) and then points a record at
+        it, either of which can happen after the page was listed
+        """
+        hashes = {key: self.orphaned_hashes.pop(key) for key in keys if key in self.orphaned_hashes}
+        if len(hashes) == 0:
+            return keys
+        referenced_hashes = set(
+            Users.objects.filter(picture_hash__in=hashes.values()).values_list(
+                "picture_hash", flat=True
+            )
+        ) | set(
+            Pets.objects.filter(picture_hash__in=hashes.values()).values_list(
+                "picture_hash", flat=True
+            )
+        )
+        kept = set()
+        for key, picture_hash in hashes.items():
+            if picture_hash in referenced_hashes:
+                kept.add(key)
+                continue
+            try:
+                if not self.__expired__(storage.head(key)):
+                    kept.add(key)
+            except ObjectNotFound:
+                pass
+        self.kept += len(kept)
+        return [key for key in keys if key not in kept]
+
+    def __delete__(self, storage, keys, options):
+        if options["dry_run"] or len(keys) == 0:
+            return
+        keys = self.__recheck__(storage, keys)
+        if len(keys) == 0:
+            return
+        storage.delete_many(keys)
+        self.deleted += len(keys)
+
+    def handle(self, *args, **options):
+        storage = get_storage()
+        self.prefix = getattr(settings, "ASSETS_PATH").rstrip("/") + "/"
+        self.cutoff = datetime.now(timezone.utc) - timedelta(seconds=options["grace_period"])
+        self.counts = {"picture": 0, "upload": 0, "user": 0, "pet": 0, "skipped": 0}
+        self.orphaned_hashes = {}
+        self.deleted = self.kept = 0
+        listed = orphaned_bytes = 0
+        pending = []
+
+        started = time.perf_counter()
+        for page in storage.list_objects(self.prefix, page_size=options["page_size"]):
+            listed += len(page)
+            for orphan in self.__find_orphans__(page):
+                orphaned_bytes += orphan.size
+                pending.append(orphan.key)
+            while len(pending) >= DELETE_BATCH_SIZE:
+                self.__delete__(storage, pending[:DELETE_BATCH_SIZE], options)
+                pending = pending[DELETE_BATCH_SIZE:]
+            if options["verbosity"] > 1:
+                self.stdout.write("{} objects listed, {} deleted".format(listed, self.deleted))
+        self.__delete__(storage, pending, options)
+        elapsed = time.perf_counter() - started
+
+        orphans = sum(count for kind, count in self.counts.items() if kind != "skipped")
+        self.stdout.write(
+            "{}{} orphaned objects ({} bytes) out of {} listed: {} content hash, {} upload, "
+            "{} profile, {} pet pictures ({} keys of unknown layout skipped)".format(
+                "[dry run] " if options["dry_run"] else "",
+                orphans,
+                orphaned_bytes,
+                listed,
+                self.counts["picture"],
+                self.counts["upload"],
+                self.counts["user"],
+                self.counts["pet"],
+                self.counts["skipped"],
+            )
+        )
+        if self.kept > 0:
+            self.stdout.write(
+                "{} content hash objects kept, they were referenced or uploaded again while "
+                "reconciling".format(self.kept)
+            )
+        self.stdout.write(
+            "{} deleted in {:.3f}s ({:.1f} objects/s listed, {:.1f} objects/s deleted)".format(
+                self.deleted,
+                elapsed,
+                listed / elapsed if elapsed > 0 else 0,
+                self.deleted / elapsed if elapsed > 0 else 0,
+            )
+        )
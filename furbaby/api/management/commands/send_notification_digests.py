@@ -0,0 +1,62 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from api.digests import queue_notification_digests
+from api.outbox import send_outbox_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Emails a digest of their unread notifications to every recipient, the digests are "
+        "sent through the outbox over a single connection"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=None,
+            help="seconds a notification stays unread before being emailed, defaults to "
+            "NOTIFICATION_DIGEST_MIN_AGE",
+        )
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=None,
+            help="emails/s at most, defaults to EMAIL_OUTBOX_MAX_RATE (0 for no limit)",
+        )
+        parser.add_argument(
+            "--queue-only",
+            action="store_true",
+            help="leaves the digests to the outbox workers (`send_outbox_emails`)",
+        )
+
+    def handle(self, *args, **options):
+        queued = queue_notification_digests(options["min_age"])
+        self.stdout.write("{} digests queued".format(queued))
+        if queued == 0 or options["queue_only"]:
+            return
+
+        totals = {"claimed": 0, "sent": 0, "retried": 0, "failed": 0}
+        started = time.perf_counter()
+        # opened here, so that every batch reuses it
+        smtp_connection = get_connection()
+        smtp_connection.open()
+        try:
+            while True:
+                counts = send_outbox_batch(options["batch_size"], smtp_connection, options["rate"])
+                for name, count in counts.items():
+                    totals[name] += count
+                if counts["claimed"] == 0:
+                    break
+        finally:
+            smtp_connection.close()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            "{sent} sent, {retried} to retry, {failed} failed in {elapsed:.3f}s".format(
+                elapsed=elapsed, **totals
+            )
+        )
@@ -0,0 +1,67 @@
+import time
+from datetime import timedelta
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import EmailOutbox
+from api.outbox import SENT, send_outbox_batch
+
+
+class Command(BaseCommand):
+    help = "Sends the due emails of the outbox in batches, over one connection per batch"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="keeps polling the outbox every --interval seconds",
+        )
+        parser.add_argument("--interval", type=float, default=5)
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=None,
+            help="emails/s at most, defaults to EMAIL_OUTBOX_MAX_RATE (0 for no limit)",
+        )
+        parser.add_argument(
+            "--purge-after",
+            type=int,
+            default=7,
+            help="sent emails older than this (days) are deleted from the outbox",
+        )
+
+    def __drain__(self, options):
+        totals = {"claimed": 0, "sent": 0, "retried": 0, "failed": 0}
+        started = time.perf_counter()
+        smtp_connection = get_connection()
+        while True:
+            counts = send_outbox_batch(options["batch_size"], smtp_connection, options["rate"])
+            for name, count in counts.items():
+                totals[name] += count
+            if counts["claimed"] == 0:
+                break
+        elapsed = time.perf_counter() - started
+        if totals["claimed"] > 0 or options["verbosity"] > 1:
+            self.stdout.write(
+                "{sent} sent, {retried} to retry, {failed} failed in {elapsed:.3f}s "
+                "({rate:.1f} emails/s)".format(
+                    elapsed=elapsed,
+                    rate=totals["sent"] / elapsed if elapsed > 0 else 0,
+                    **totals,
+                )
+            )
+
+    def handle(self, *args, **options):
+        purged, _ = EmailOutbox.objects.filter(
+            status=SENT, sent_at__lt=timezone.now() - timedelta(days=options["purge_after"])
+        ).delete()
+        if purged > 0:
+            self.stdout.write("{} sent emails purged".format(purged))
+
+        self.__drain__(options)
+        while options["loop"]:
+            time.sleep(options["interval"])
+            self.__drain__(options)
@@ -0,0 +1,60 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.models import Pets, Users
+from api.storage import get_storage
+from api.utils import make_s3_path
+
+
+def profile_picture_key(user):
+    return make_s3_path(
+        getattr(settings, "ASSETS_PATH"), str(user.id), "profile-picture", "picture"
+    )
+
+
+def pet_picture_key(pet):
+    return make_s3_path(getattr(settings, "ASSETS_PATH"), str(pet.owner_id), "pets", str(pet.id))
+
+
+class Command(BaseCommand):
+    help = (
+        "Looks up the (legacy) pictures of users and pets whose `has_picture` is still unknown "
+        "and records whether they exist"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=16)
+
+    def __sync__(self, model, fields, picture_key, options):
+        storage = get_storage()
+        synced, started = 0, time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            while True:
+                records = list(
+                    model.objects.filter(has_picture=None)
+                    .order_by("pk")
+                    .only(*fields)[: options["batch_size"]]
+                )
+                if len(records) == 0:
+                    break
+                found = executor.map(lambda record: storage.exists(picture_key(record)), records)
+                present = [record.pk for record, exists in zip(records, found) if exists]
+                model.objects.filter(pk__in=present).update(has_picture=True)
+                model.objects.filter(pk__in=[record.pk for record in records]).exclude(
+                    pk__in=present
+                ).update(has_picture=False)
+                synced += len(records)
+
+        self.stdout.write(
+            "{}: {} records synced in {:.3f}s".format(
+                model.__name__, synced, time.perf_counter() - started
+            )
+        )
+
+    def handle(self, *args, **options):
+        self.__sync__(Users, ["id", "has_picture"], profile_picture_key, options)
+        self.__sync__(Pets, ["id", "owner", "has_picture"], pet_picture_key, options)
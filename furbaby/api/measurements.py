@@ -0,0 +1,114 @@
+"""
+Parsing of the (free text) weight & height of pets.
+
+`Pets.weight` & `Pets.height` are typed freely ("12 lbs", "5.5kg", "1 lb 4 oz", "2'3\"",
+"10-15 lb", "medium"), so they can't be compared. `PetSerializer` stores them parsed, in grams
+& centimeters (`weight_grams` & `height_cm`, indexed, None when the text has no measurement),
+and the job feed filters on those (see the parse_pet_measurements command for existing pets).
+Numbers without a unit are taken as pounds & inches, a comma is a decimal separator ("12,5 kg").
+Negative measurements and measurements above `MAX_WEIGHT_GRAMS` & `MAX_HEIGHT_CM` raise
+`ImplausibleMeasurement`, answered with a 400.
+"""
+
+import re
+
+GRAMS = {
+    "g": 1,
+    "gr": 1,
+    "gram": 1,
+    "grams": 1,
+    "kg": 1000,
+    "kgs": 1000,
+    "kilo": 1000,
+    "kilos": 1000,
+    "kilogram": 1000,
+    "kilograms": 1000,
+    "lb": 453.59237,
+    "lbs": 453.59237,
+    "pound": 453.59237,
+    "pounds": 453.59237,
+    "#": 453.59237,
+    "oz": 28.349523125,
+    "ounce": 28.349523125,
+    "ounces": 28.349523125,
+}
+
+CENTIMETERS = {
+    "mm": 0.1,
+    "cm": 1,
+    "cms": 1,
+    "centimeter": 1,
+    "centimeters": 1,
+    "centimetre": 1,
+    "centimetres": 1,
+    "m": 100,
+    "meter": 100,
+    "meters": 100,
+    "metre": 100,
+    "metres": 100,
+    "in": 2.54,
+    "inch": 2.54,
+    "inches": 2.54,
+    '"': 2.54,
+    "ft": 30.48,
+    "foot": 30.48,
+    "feet": 30.48,
+    "'": 30.48,
+}
+
+# the heaviest & tallest pets (horses) with some margin, also bounds the integer column
+MAX_WEIGHT_GRAMS = 2000 * 1000
+MAX_HEIGHT_CM = 300
+
+NUMBER = r"(\d+(?:\.\d+)?|\.\d+)"
+RANGE = re.compile(r"^{n}\s*(?:-|to)\s*{n}\s*(\D*)$".format(n=NUMBER))
+QUANTITY = re.compile(r"{}\s*([a-z]+\.?|[#'\"])?".format(NUMBER))
+NEGATIVE = re.compile(r"(?:^|[^\d.\s])\s*-\s*\.?\d")
+
+
+class ImplausibleMeasurement(ValueError):
+    pass
+
+
+def __parse__(text, units, default_unit):
+    """the sum of the quantities of `text` in the unit of `units`, None without any"""
+    text = (text or "").strip().lower().replace(",", ".")
+    if NEGATIVE.search(text):
+        raise ImplausibleMeasurement("must not be negative")
+    # ranges ("10-15 lb") are taken at their middle
+    match = RANGE.match(text)
+    if match:
+        low, high, unit = match.groups()
+        text = "{} {}".format((float(low) + float(high)) / 2, unit)
+
+    quantities = QUANTITY.findall(text)
+    if len(quantities) == 0:
+        return None
+    total = 0
+    for number, unit in quantities:
+        unit = unit.rstrip(".") or default_unit
+        if unit not in units:
+            # e.g. "3 years"
+            return None
+        total += float(number) * units[unit]
+    return total if total > 0 else None
+
+
+def parse_weight(text):
+    """the weight in grams of e.g. "12 lbs" or "1 lb 4 oz", None if it isn't one"""
+    grams = __parse__(text, GRAMS, "lb")
+    if grams == None:
+        return None
+    if grams > MAX_WEIGHT_GRAMS:
+        raise ImplausibleMeasurement("must be at most {} kg".format(MAX_WEIGHT_GRAMS // 1000))
+    return round(grams)
+
+
+def parse_height(text):
+    """the height in centimeters of e.g. "20 in" or "2'3\"", None if it isn't one"""
+    centimeters = __parse__(text, CENTIMETERS, "in")
+    if centimeters == None:
+        return None
+    if centimeters > MAX_HEIGHT_CM:
+        raise ImplausibleMeasurement("must be at most {} cm".format(MAX_HEIGHT_CM))
+    return round(centimeters, 1)
@@ -0,0 +1,22 @@
+# Generated by Django 4.0 on 2026-10-19 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0016_notifications"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pets",
+            name="picture_hash",
+            field=models.TextField(null=True),
+        ),
+        migrations.AddField(
+            model_name="users",
+            name="picture_hash",
+            field=models.TextField(null=True),
+        ),
+    ]
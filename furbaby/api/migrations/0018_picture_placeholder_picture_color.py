@@ -0,0 +1,32 @@
+# Generated by Django 4.0 on 2026-10-19 15:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0017_users_picture_hash_pets_picture_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pets",
+            name="picture_color",
+            field=models.TextField(max_length=7, null=True),
+        ),
+        migrations.AddField(
+            model_name="pets",
+            name="picture_placeholder",
+            field=models.TextField(null=True),
+        ),
+        migrations.AddField(
+            model_name="users",
+            name="picture_color",
+            field=models.TextField(max_length=7, null=True),
+        ),
+        migrations.AddField(
+            model_name="users",
+            name="picture_placeholder",
+            field=models.TextField(null=True),
+        ),
+    ]
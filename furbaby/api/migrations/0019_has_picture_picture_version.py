@@ -0,0 +1,51 @@
+# Generated by Django 4.0 on 2026-10-19 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0018_picture_placeholder_picture_color"),
+    ]
+
+    operations = [
+        # existing rows start out as unknown (NULL), only pictures stored by content hash are
+        # known to exist, legacy pictures are looked up by `manage.py sync_picture_presence`
+        migrations.AddField(
+            model_name="pets",
+            name="has_picture",
+            field=models.BooleanField(null=True),
+        ),
+        migrations.AddField(
+            model_name="users",
+            name="has_picture",
+            field=models.BooleanField(null=True),
+        ),
+        migrations.RunSQL(
+            sql=[
+                "UPDATE api_pets SET has_picture = true WHERE picture_hash IS NOT NULL",
+                "UPDATE api_users SET has_picture = true WHERE picture_hash IS NOT NULL",
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name="pets",
+            name="has_picture",
+            field=models.BooleanField(default=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name="users",
+            name="has_picture",
+            field=models.BooleanField(default=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="pets",
+            name="picture_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="users",
+            name="picture_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
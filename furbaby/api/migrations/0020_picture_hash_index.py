@@ -0,0 +1,22 @@
+# Generated by Django 4.0 on 2026-10-19 15:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0019_has_picture_picture_version"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="pets",
+            name="picture_hash",
+            field=models.TextField(db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="users",
+            name="picture_hash",
+            field=models.TextField(db_index=True, null=True),
+        ),
+    ]
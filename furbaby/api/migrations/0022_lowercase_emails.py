@@ -0,0 +1,28 @@
+# Generated by Django 4.0 on 2026-10-19 15:46
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0021_accountdeletion"),
+    ]
+
+    operations = [
+        # registration used to store emails as typed (it only compared them case-insensitively)
+        migrations.RunSQL(
+            sql=[
+                "UPDATE api_users SET email = lower(email) WHERE email <> lower(email)",
+                "UPDATE api_users SET username = lower(username) WHERE username <> lower(username)",
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name="users",
+            constraint=models.CheckConstraint(
+                check=models.Q(("email", django.db.models.functions.text.Lower("email"))),
+                name="users_email_lowercase",
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.0 on 2026-10-19 15:57
+
+from django.db import migrations, models
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0022_lowercase_emails"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmailOutbox",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False
+                    ),
+                ),
+                ("template", models.TextField(editable=False)),
+                ("recipient", models.TextField(editable=False)),
+                ("context", models.JSONField(default=dict, editable=False)),
+                ("status", models.TextField(default="pending")),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("next_attempt_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_error", models.TextField(null=True)),
+                ("sent_at", models.DateTimeField(null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="emailoutbox",
+            index=models.Index(fields=["status", "next_attempt_at"], name="email_outbox_due_idx"),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.0 on 2026-10-19 15:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0023_emailoutbox"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notifications",
+            name="emailed_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="notifications",
+            name="read_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="notifications",
+            name="recipient",
+            field=models.ForeignKey(
+                null=True, on_delete=django.db.models.deletion.CASCADE, to="api.users"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notifications",
+            index=models.Index(
+                condition=models.Q(("read_at", None)),
+                fields=["recipient"],
+                name="notifications_unread_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.0 on 2026-10-19 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0024_notification_recipients"),
+    ]
+
+    operations = [
+        # creating a location used to leave the previous default set, the latest one is kept
+        migrations.RunSQL(
+            sql="""
+                UPDATE api_locations SET default_location = false
+                WHERE default_location AND id NOT IN (
+                    SELECT DISTINCT ON (user_id) id FROM api_locations
+                    WHERE default_location ORDER BY user_id, updated_at DESC
+                )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name="locations",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("default_location", True)),
+                fields=("user",),
+                name="locations_one_default_per_user",
+            ),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.0 on 2026-10-19 16:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0025_one_default_location"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="locations",
+            name="borough",
+            field=models.TextField(null=True),
+        ),
+        migrations.AddField(
+            model_name="locations",
+            name="latitude",
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name="locations",
+            name="longitude",
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name="locations",
+            name="normalized_address",
+            field=models.TextField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name="locations",
+            index=models.Index(fields=["latitude", "longitude"], name="locations_coordinates_idx"),
+        ),
+    ]
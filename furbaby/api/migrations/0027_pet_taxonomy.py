@@ -0,0 +1,78 @@
+# Generated by Django 4.0 on 2026-10-19 16:13
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0026_location_geocoding"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Species",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("name", models.TextField(unique=True)),
+                (
+                    "aliases",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.TextField(), blank=True, default=list, size=None
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Breeds",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("name", models.TextField()),
+                (
+                    "aliases",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.TextField(), blank=True, default=list, size=None
+                    ),
+                ),
+                (
+                    "species",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="breeds",
+                        to="api.species",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="pets",
+            name="breed_taxon",
+            field=models.ForeignKey(
+                null=True, on_delete=django.db.models.deletion.SET_NULL, to="api.breeds"
+            ),
+        ),
+        migrations.AddField(
+            model_name="pets",
+            name="species_taxon",
+            field=models.ForeignKey(
+                null=True, on_delete=django.db.models.deletion.SET_NULL, to="api.species"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="breeds",
+            constraint=models.UniqueConstraint(
+                fields=("species", "name"), name="breeds_species_name_unique"
+            ),
+        ),
+    ]
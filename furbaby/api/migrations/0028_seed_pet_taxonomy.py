@@ -0,0 +1,134 @@
+from django.db import migrations
+
+# species: (aliases, {breed: aliases})
+TAXONOMY = {
+    "Dog": (
+        ["dogs", "puppy", "puppies", "canine"],
+        {
+            "Mixed Breed": ["mutt", "mixed", "mix"],
+            "Labrador Retriever": ["lab", "labrador", "labs"],
+            "Golden Retriever": ["golden", "goldie"],
+            "German Shepherd": ["gsd", "alsatian", "german shepherd dog"],
+            "French Bulldog": ["frenchie", "french bull dog"],
+            "Bulldog": ["english bulldog", "british bulldog"],
+            "Poodle": ["standard poodle", "toy poodle", "miniature poodle"],
+            "Beagle": [],
+            "Rottweiler": ["rottie"],
+            "Dachshund": ["wiener dog", "sausage dog", "doxie"],
+            "Yorkshire Terrier": ["yorkie"],
+            "Boxer": [],
+            "Siberian Husky": ["husky"],
+            "Cavalier King Charles Spaniel": ["cavalier", "king charles spaniel"],
+            "Shih Tzu": ["shihtzu", "shih-tzu"],
+            "Chihuahua": [],
+            "Pomeranian": ["pom"],
+            "Pug": [],
+            "Boston Terrier": [],
+            "Border Collie": [],
+            "Australian Shepherd": ["aussie"],
+            "Cocker Spaniel": [],
+            "Maltese": [],
+            "Havanese": [],
+            "Bernese Mountain Dog": ["berner"],
+            "Great Dane": [],
+            "Doberman Pinscher": ["doberman", "dobermann"],
+            "Miniature Schnauzer": ["schnauzer"],
+            "Pembroke Welsh Corgi": ["corgi", "welsh corgi"],
+            "Shiba Inu": ["shiba"],
+            "Jack Russell Terrier": ["jack russell", "parson russell terrier"],
+            "American Pit Bull Terrier": ["pit bull", "pitbull", "pittie"],
+            "Staffordshire Bull Terrier": ["staffy", "staffie"],
+            "Bichon Frise": ["bichon"],
+            "Goldendoodle": ["golden doodle", "groodle"],
+            "Labradoodle": ["labra doodle"],
+            "Cockapoo": [],
+            "Maltipoo": [],
+            "Greyhound": [],
+            "Whippet": [],
+            "Basset Hound": ["basset"],
+            "Shetland Sheepdog": ["sheltie"],
+            "Newfoundland": ["newfie"],
+            "Akita": [],
+            "Samoyed": [],
+        },
+    ),
+    "Cat": (
+        ["cats", "kitten", "kittens", "kitty", "feline"],
+        {
+            "Domestic Shorthair": ["dsh", "shorthair", "tabby", "mixed", "moggy"],
+            "Domestic Longhair": ["dlh", "longhair"],
+            "Siamese": [],
+            "Persian": [],
+            "Maine Coon": ["mainecoon"],
+            "Ragdoll": [],
+            "Bengal": [],
+            "British Shorthair": [],
+            "Scottish Fold": [],
+            "Sphynx": ["sphinx", "hairless cat"],
+            "Russian Blue": [],
+            "Abyssinian": [],
+            "Birman": [],
+            "Norwegian Forest Cat": ["wegie", "norwegian forest"],
+            "American Shorthair": [],
+        },
+    ),
+    "Bird": (
+        ["birds"],
+        {
+            "Budgerigar": ["budgie", "parakeet"],
+            "Cockatiel": [],
+            "Canary": [],
+            "Lovebird": [],
+            "African Grey Parrot": ["african grey", "grey parrot", "parrot"],
+            "Cockatoo": [],
+            "Finch": ["zebra finch"],
+        },
+    ),
+    "Rabbit": (
+        ["rabbits", "bunny", "bunnies"],
+        {
+            "Holland Lop": ["lop"],
+            "Netherland Dwarf": ["dwarf rabbit"],
+            "Lionhead": [],
+            "Mini Rex": ["rex"],
+        },
+    ),
+    "Guinea Pig": (["guinea pigs", "cavy", "cavies"], {}),
+    "Hamster": (["hamsters"], {"Syrian Hamster": ["golden hamster"], "Dwarf Hamster": []}),
+    "Ferret": (["ferrets"], {}),
+    "Fish": (["fishes"], {"Goldfish": [], "Betta": ["betta fish", "siamese fighting fish"]}),
+    "Turtle": (["turtles", "tortoise", "tortoises"], {"Red-Eared Slider": ["slider"]}),
+    "Reptile": (
+        ["reptiles", "lizard"],
+        {"Bearded Dragon": ["beardie"], "Leopard Gecko": ["gecko"], "Ball Python": ["python"]},
+    ),
+}
+
+
+def seed_taxonomy(apps, schema_editor):
+    Species = apps.get_model("api", "Species")
+    Breeds = apps.get_model("api", "Breeds")
+    for species_name, (aliases, breeds) in TAXONOMY.items():
+        species = Species.objects.create(name=species_name, aliases=aliases)
+        Breeds.objects.bulk_create(
+            [
+                Breeds(species=species, name=name, aliases=breed_aliases)
+                for name, breed_aliases in breeds.items()
+            ]
+        )
+
+
+def remove_taxonomy(apps, schema_editor):
+    Pets = apps.get_model("api", "Pets")
+    Pets.objects.update(species_taxon=None, breed_taxon=None)
+    apps.get_model("api", "Breeds").objects.all().delete()
+    apps.get_model("api", "Species").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0027_pet_taxonomy"),
+    ]
+
+    # existing pets are linked by `manage.py link_pet_taxonomy`
+    operations = [migrations.RunPython(seed_taxonomy, remove_taxonomy)]
@@ -0,0 +1,30 @@
+# Generated by Django 4.0 on 2026-10-19 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0028_seed_pet_taxonomy"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pets",
+            name="height_cm",
+            field=models.FloatField(null=True),
+        ),
+        migrations.AddField(
+            model_name="pets",
+            name="weight_grams",
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name="pets",
+            index=models.Index(fields=["weight_grams"], name="pets_weight_grams_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="pets",
+            index=models.Index(fields=["height_cm"], name="pets_height_cm_idx"),
+        ),
+    ]
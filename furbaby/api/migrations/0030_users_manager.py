@@ -0,0 +1,19 @@
+# Generated by Django 4.0 on 2026-10-19 16:45
+
+import api.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0029_pet_measurements"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="users",
+            managers=[
+                ("objects", api.models.UsersManager()),
+            ],
+        ),
+    ]
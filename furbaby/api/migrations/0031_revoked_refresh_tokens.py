@@ -0,0 +1,19 @@
+# Generated by Django 4.0 on 2026-10-19 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0030_users_manager"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RevokedRefreshToken",
+            fields=[
+                ("jti", models.TextField(editable=False, primary_key=True, serialize=False)),
+                ("expires_at", models.DateTimeField(db_index=True, editable=False)),
+            ],
+        ),
+    ]
@@ -0,0 +1,60 @@
+import json
+import uuid
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def __sitter_id__(data):
+    # the views stored the data JSON-encoded, i.e. as a JSON string
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return None
+    if not isinstance(data, dict):
+        return None
+    try:
+        return str(uuid.UUID(str(data.get("sitter_id"))))
+    except ValueError:
+        return None
+
+
+def backfill_recipients(apps, schema_editor):
+    # notifications created before they were addressed went to the sitter of their application
+    Notifications = apps.get_model("api", "Notifications")
+    Users = apps.get_model("api", "Users")
+    notifications = Notifications.objects.filter(recipient=None).only("id", "data").order_by("pk")
+
+    last_pk = None
+    while True:
+        batch = notifications if last_pk == None else notifications.filter(pk__gt=last_pk)
+        batch = list(batch[:BATCH_SIZE])
+        if len(batch) == 0:
+            break
+        last_pk = batch[-1].pk
+
+        sitter_ids = {notification.pk: __sitter_id__(notification.data) for notification in batch}
+        users = {
+            str(user_id)
+            for user_id in Users.objects.filter(
+                id__in=[sitter_id for sitter_id in sitter_ids.values() if sitter_id != None]
+            ).values_list("id", flat=True)
+        }
+        addressed = []
+        for notification in batch:
+            if sitter_ids[notification.pk] in users:
+                notification.recipient_id = sitter_ids[notification.pk]
+                addressed.append(notification)
+        Notifications.objects.bulk_update(addressed, ["recipient"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0031_revoked_refresh_tokens"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_recipients, migrations.RunPython.noop),
+    ]
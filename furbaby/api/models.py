@@ -1,9 +1,15 @@
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
 from django.contrib.postgres.fields import ArrayField
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.utils import timezone
 
 import uuid
 
+from .geocoding import GEOCODED_FIELDS, geocode
+from .utils import normalize_email
+
 """
 
 CREATE TYPE user_feature_access_type AS ENUM (
@@ -32,6 +38,15 @@ class UserTypes(models.TextChoices):
     PET_OWNER = "owner"
 
 
+class UsersManager(UserManager):
+    @classmethod
+    def normalize_email(cls, email):
+        # the whole address is lowercased (Django's only lowercases the domain), as the
+        # users_email_lowercase constraint requires. Used by create_user, create_superuser and
+        # `AbstractUser.clean` (the admin)
+        return normalize_email(email or "")
+
+
 class Users(AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     email = models.TextField(max_length=200, null=False, editable=True, unique=True)
@@ -43,15 +58,51 @@ class Users(AbstractUser):
     experience = models.TextField(editable=True, null=True)
     qualifications = models.TextField(editable=True, null=True)
     phone_number = models.TextField(editable=True, null=True)
+    # sha256 of the current profile picture, see api/pictures.py
+    picture_hash = models.TextField(editable=True, null=True, db_index=True)
+    # base64 data URI of a tiny version of the picture and its dominant colour ("#rrggbb")
+    picture_placeholder = models.TextField(editable=True, null=True)
+    picture_color = models.TextField(max_length=7, editable=True, null=True)
+    # whether a picture was uploaded, lets clients and the picture endpoint skip storage lookups
+    # for missing pictures. None for rows predating the column whose (legacy) picture hasn't been
+    # looked up yet, see the sync_picture_presence command
+    has_picture = models.BooleanField(editable=True, null=True, default=False)
+    # bumped on every upload/removal of the picture
+    picture_version = models.PositiveIntegerField(editable=True, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UsersManager()
+
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["password", "user_type"]
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # emails are looked up with a plain (indexed) equality, see utils.normalize_email
+            models.CheckConstraint(check=Q(email=Lower("email")), name="users_email_lowercase")
+        ]
+
     def __str__(self):
         return self.email
 
+    def get_session_auth_hash(self):
+        # users loaded by api/user_cache.py carry the hash instead of their password
+        cached_hash = getattr(self, "_cached_session_auth_hash", None)
+        if cached_hash != None and "password" in self.get_deferred_fields():
+            return cached_hash
+        return super().get_session_auth_hash()
+
+    def refresh_from_db(self, using=None, fields=None):
+        # the first access to a column a partially loaded user (see api/user_cache.py &
+        # api/authentication.py) lacks loads all the missing ones at once, instead of one query
+        # per column
+        deferred_fields = self.get_deferred_fields()
+        if getattr(self, "_partially_loaded", False) and fields != None:
+            if set(fields) <= deferred_fields:
+                fields = deferred_fields
+        super().refresh_from_db(using=using, fields=fields)
+
 
 """
 
@@ -68,6 +119,21 @@ CREATE TABLE locations (
 """
 
 
+class LocationsManager(models.Manager):
+    def default_for(self, user):
+        """the default location of a user (or None), a seek on `locations_one_default_per_user`"""
+        return self.filter(user_id=getattr(user, "pk", user), default_location=True).first()
+
+    def clear_default(self, user):
+        """
+        unsets the default location of a user, within the caller's transaction. The user row is
+        locked until it commits, so that concurrent changes of the default take turns
+        """
+        user_id = getattr(user, "pk", user)
+        list(Users.objects.select_for_update().filter(id=user_id).values_list("id"))
+        self.filter(user_id=user_id, default_location=True).update(default_location=False)
+
+
 class Locations(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(Users, on_delete=models.CASCADE, to_field="id")
@@ -76,16 +142,41 @@ class Locations(models.Model):
     country = models.TextField(editable=True, null=False)
     zipcode = models.TextField(editable=True, null=True)
     default_location = models.BooleanField(default=False, editable=True)
+    # derived from the address & zipcode on save, see api/geocoding.py
+    normalized_address = models.TextField(null=True)
+    borough = models.TextField(null=True)
+    latitude = models.FloatField(null=True)
+    longitude = models.FloatField(null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = LocationsManager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
                 fields=("address", "city", "country", "user_id"),
                 name="address_city_country_user_id_constraint",
-            )
+            ),
+            # a user has one default location at most, also the index of `default_for`
+            models.UniqueConstraint(
+                fields=("user",),
+                condition=Q(default_location=True),
+                name="locations_one_default_per_user",
+            ),
         ]
+        indexes = [
+            models.Index(fields=["latitude", "longitude"], name="locations_coordinates_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields == None or {"address", "zipcode"} & set(update_fields):
+            for name, value in geocode(self.address, self.zipcode).items():
+                setattr(self, name, value)
+            if update_fields != None:
+                kwargs["update_fields"] = set(update_fields) | set(GEOCODED_FIELDS)
+        super().save(*args, **kwargs)
 
 
 """
@@ -104,6 +195,29 @@ CREATE TABLE pets (
 """
 
 
+class Species(models.Model):
+    name = models.TextField(unique=True)
+    # other spellings matched to this species, e.g. "puppy" for dogs
+    aliases = ArrayField(models.TextField(), default=list, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Breeds(models.Model):
+    species = models.ForeignKey(Species, on_delete=models.PROTECT, related_name="breeds")
+    name = models.TextField()
+    aliases = ArrayField(models.TextField(), default=list, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=("species", "name"), name="breeds_species_name_unique")
+        ]
+
+    def __str__(self):
+        return self.name
+
+
 class Pets(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     owner = models.ForeignKey(Users, on_delete=models.CASCADE, to_field="id")
@@ -112,9 +226,28 @@ class Pets(models.Model):
     color = models.TextField(editable=True, null=True)
     height = models.TextField(editable=True, null=True)
     breed = models.TextField(editable=True, null=False)
+    # the taxonomy entries species & breed were matched to on save (None when they weren't),
+    # see api/taxonomy.py
+    species_taxon = models.ForeignKey(Species, on_delete=models.SET_NULL, null=True)
+    breed_taxon = models.ForeignKey(Breeds, on_delete=models.SET_NULL, null=True)
     weight = models.TextField(editable=True, null=False)
+    # weight & height parsed by PetSerializer, None when they aren't measurements (e.g. "medium"),
+    # see api/measurements.py
+    weight_grams = models.PositiveIntegerField(null=True)
+    height_cm = models.FloatField(null=True)
     chip_number = models.TextField(editable=True, null=True)
     health_requirements = models.TextField(editable=True, null=True)
+    # sha256 of the current pet picture, see api/pictures.py
+    picture_hash = models.TextField(editable=True, null=True, db_index=True)
+    # base64 data URI of a tiny version of the picture and its dominant colour ("#rrggbb")
+    picture_placeholder = models.TextField(editable=True, null=True)
+    picture_color = models.TextField(max_length=7, editable=True, null=True)
+    # whether a picture was uploaded, lets clients and the picture endpoint skip storage lookups
+    # for missing pictures. None for rows predating the column whose (legacy) picture hasn't been
+    # looked up yet, see the sync_picture_presence command
+    has_picture = models.BooleanField(editable=True, null=True, default=False)
+    # bumped on every upload/removal of the picture
+    picture_version = models.PositiveIntegerField(editable=True, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -122,6 +255,10 @@ class Pets(models.Model):
         constraints = [
             models.UniqueConstraint(fields=("name", "owner_id"), name="name_owner_id_constraint")
         ]
+        indexes = [
+            models.Index(fields=["weight_grams"], name="pets_weight_grams_idx"),
+            models.Index(fields=["height_cm"], name="pets_height_cm_idx"),
+        ]
 
 
 """
@@ -212,5 +349,61 @@ class Applications(models.Model):
 class Notifications(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     data = models.JSONField()
+    # null for notifications created before they were addressed
+    recipient = models.ForeignKey(Users, on_delete=models.CASCADE, to_field="id", null=True)
+    # set once the recipient fetched it, unread ones are sent in digests (see
+    # api/management/commands/send_notification_digests.py)
+    read_at = models.DateTimeField(null=True)
+    emailed_at = models.DateTimeField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["recipient"], condition=Q(read_at=None), name="notifications_unread_idx"
+            ),
+        ]
+
+
+class AccountDeletion(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # not a foreign key, the row outlives the user it describes
+    user_id = models.UUIDField(editable=False, unique=True)
+    # one of "pending", "running", "done" & "failed", see api/account_deletion.py
+    status = models.TextField(default="pending", editable=True)
+    # number of rows/objects deleted so far, by table (& "storage")
+    progress = models.JSONField(default=dict, editable=True)
+    error = models.TextField(editable=True, null=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class EmailOutbox(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # one of api.outbox.EMAIL_TEMPLATES, rendered with `context` when the email is sent
+    template = models.TextField(editable=False)
+    recipient = models.TextField(editable=False)
+    context = models.JSONField(default=dict, editable=False)
+    # one of "pending", "sending", "sent" & "failed", see api/outbox.py
+    status = models.TextField(default="pending", editable=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(editable=True, null=True)
+    sent_at = models.DateTimeField(null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="email_outbox_due_idx"),
+        ]
+
+
+class RevokedRefreshToken(models.Model):
+    # the id (`jti`) of a refresh token that was used (they are rotated) or revoked, kept until
+    # the token expires, see api/tokens.py
+    jti = models.TextField(primary_key=True, editable=False)
+    expires_at = models.DateTimeField(db_index=True, editable=False)
@@ -0,0 +1,221 @@
+"""
+Durable email outbox.
+
+Emails used to be rendered and sent over SMTP inside the request that triggered them (e.g. a
+password reset), tying its latency to Gmail and opening a TLS connection per message. Now
+`queue_email` only writes an `EmailOutbox` row (inside the request transaction, so nothing is
+sent for a request that failed) and `send_outbox_batch` drains the outbox: due emails are
+claimed in batches (`select_for_update(skip_locked=True)` in a short transaction, so several
+senders can run, and leased for EMAIL_OUTBOX_CLAIM_TIMEOUT seconds), the templates are loaded
+once per batch, all emails go over a single SMTP connection (outside of any transaction) and
+each one is saved once sent. Failed sends are retried with an exponential backoff, up to
+`EMAIL_OUTBOX_MAX_ATTEMPTS` times. With `EMAIL_OUTBOX_MAX_RATE` set, a sender doesn't go over
+that many emails per second (the SMTP relay rejects bursts, e.g. of notification digests).
+
+The outbox is drained by `manage.py send_outbox_emails` (`--loop` for a worker). Under DEBUG,
+where usually no worker runs, `EMAIL_OUTBOX_SEND_ON_COMMIT` also drains it in a background thread
+started once the request queueing an email has committed (it is off by default otherwise, the
+web workers shouldn't be sending the whole outbox over SMTP).
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+PENDING = "pending"
+# claimed by a sender, see `__claim__`
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+EMAIL_TEMPLATES = {
+    "password_reset": {
+        "subject": "Password Reset instructions for FurBaby",
+        "from_email": "sak9791@nyu.edu",
+        "text": "email/password_reset_email.txt",
+        "html": "email/password_reset_email.html",
+    },
+    "notification_digest": {
+        "subject": "Your unread FurBaby notifications",
+        "from_email": "sak9791@nyu.edu",
+        "text": "email/notification_digest.txt",
+        "html": "email/notification_digest.html",
+    },
+}
+
+# a single sender drains the outbox in the background of a process at a time
+_drain_lock = threading.Lock()
+
+
+def queue_email(template, recipient, context):
+    if template not in EMAIL_TEMPLATES:
+        raise ValueError("unknown email template: {}".format(template))
+    email = EmailOutbox.objects.create(template=template, recipient=recipient, context=context)
+    if getattr(settings, "EMAIL_OUTBOX_SEND_ON_COMMIT", settings.DEBUG):
+        transaction.on_commit(start_outbox_drain)
+    return email
+
+
+def start_outbox_drain():
+    thread = threading.Thread(target=__drain_in_thread__, name="email-outbox", daemon=True)
+    thread.start()
+    return thread
+
+
+def __drain_in_thread__():
+    if not _drain_lock.acquire(blocking=False):
+        # the running drain picks the new email up
+        return
+    try:
+        while send_outbox_batch()["claimed"] > 0:
+            pass
+    finally:
+        _drain_lock.release()
+        # threads get their own database connection, which Django won't close for them
+        connection.close()
+
+
+def __load_templates__(names):
+    """the (compiled) templates of a batch, each one loaded once"""
+    templates = {}
+    for name in names:
+        definition = EMAIL_TEMPLATES[name]
+        templates[name] = (
+            definition,
+            get_template(definition["text"]),
+            get_template(definition["html"]) if definition.get("html") else None,
+        )
+    return templates
+
+
+def __build_message__(email, templates, smtp_connection):
+    definition, text_template, html_template = templates[email.template]
+    message = EmailMultiAlternatives(
+        definition["subject"],
+        text_template.render(email.context),
+        definition["from_email"],
+        [email.recipient],
+        connection=smtp_connection,
+    )
+    if html_template is not None:
+        message.attach_alternative(html_template.render(email.context), "text/html")
+    return message
+
+
+def __backoff__(attempts):
+    base = getattr(settings, "EMAIL_OUTBOX_RETRY_BACKOFF", 30)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 60 * 60))
+
+
+def __record_failure__(email, error, now):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5):
+        email.status = FAILED
+    else:
+        email.next_attempt_at = now + __backoff__(email.attempts)
+
+
+def __throttle__(rate, sent, started):
+    """waits until sending one more email keeps the batch at `rate` emails per second"""
+    if rate:
+        delay = started + sent / rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def __claim__(batch_size):
+    """
+    Claims up to `batch_size` due emails, in a transaction of its own: they're "sending" until
+    their lease ends, after which emails left unsent by a sender that went away are due again
+    """
+    lease = timedelta(seconds=getattr(settings, "EMAIL_OUTBOX_CLAIM_TIMEOUT", 10 * 60))
+    with transaction.atomic():
+        now = timezone.now()
+        emails = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[PENDING, SENDING], next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        EmailOutbox.objects.filter(id__in=[email.id for email in emails]).update(
+            status=SENDING, next_attempt_at=now + lease, updated_at=now
+        )
+    return emails
+
+
+def __record_outcome__(email):
+    # right after the send, a later crash doesn't get the email sent again
+    email.save(
+        update_fields=[
+            "status",
+            "attempts",
+            "next_attempt_at",
+            "last_error",
+            "sent_at",
+            "updated_at",
+        ]
+    )
+
+
+def send_outbox_batch(batch_size=None, smtp_connection=None, rate=None):
+    """
+    Sends up to `batch_size` due emails over one connection, at most `rate` (defaults to
+    EMAIL_OUTBOX_MAX_RATE, 0 for no limit) per second. Returns how many emails were claimed,
+    sent, scheduled for a retry & failed for good.
+
+    Emails are claimed in a short transaction and sent outside of any, each one saved once sent.
+    A connection the caller already opened is left open, so that it's reused across batches.
+    """
+    batch_size = batch_size or getattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 100)
+    rate = rate if rate != None else getattr(settings, "EMAIL_OUTBOX_MAX_RATE", None)
+    smtp_connection = smtp_connection or get_connection()
+    counts = {"claimed": 0, "sent": 0, "retried": 0, "failed": 0}
+
+    emails = __claim__(batch_size)
+    counts["claimed"] = len(emails)
+    if len(emails) == 0:
+        return counts
+
+    templates = __load_templates__({email.template for email in emails})
+    connection_error = None
+    new_connection = False
+    try:
+        new_connection = smtp_connection.open()
+    except Exception as e:
+        connection_error = e
+
+    started = time.monotonic()
+    for sent, email in enumerate(emails):
+        email.status = PENDING
+        if connection_error is not None:
+            __record_failure__(email, connection_error, timezone.now())
+        else:
+            __throttle__(rate, sent, started)
+            try:
+                __build_message__(email, templates, smtp_connection).send()
+            except Exception as e:
+                __record_failure__(email, e, timezone.now())
+                # the connection might be broken, the next emails get a new one
+                smtp_connection.close()
+                try:
+                    smtp_connection.open()
+                except Exception as open_error:
+                    connection_error = open_error
+            else:
+                email.status = SENT
+                email.attempts += 1
+                email.sent_at = timezone.now()
+                email.last_error = None
+        __record_outcome__(email)
+        counts[{SENT: "sent", FAILED: "failed"}.get(email.status, "retried")] += 1
+    if new_connection or connection_error is not None:
+        smtp_connection.close()
+    return counts
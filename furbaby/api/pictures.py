@@ -0,0 +1,174 @@
+"""
+Content-addressed picture storage.
+
+Uploaded pictures are stored under the SHA-256 of their content (`<assets>/pictures/<hash>`),
+the current hash is recorded on the owning `Users`/`Pets` row. An object never changes once
+written, so identical uploads share one object and the URLs embedding the hash can be cached
+forever by clients.
+
+NOTE: objects that are no longer referenced are not deleted while serving requests (another
+upload of the same content could be pointing a record at them concurrently), the
+`reconcile_pictures` command deletes them once they haven't been written for a grace period. An
+upload whose content is stored already touches the object instead, so that it isn't deleted while
+the record pointing at it is being saved.
+"""
+
+import base64
+import hashlib
+import io
+import re
+
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+
+from .singleflight import SingleFlight
+from .storage import ObjectNotFound
+from .uploads import StreamedPicture
+from .utils import make_s3_path
+
+PICTURE_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# the content behind a hash never changes, so it can be cached for a year without revalidation
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# pictures served through the owner/pet endpoints change on upload, clients need to revalidate
+MUTABLE_CACHE_CONTROL = "private, no-cache"
+
+# longest side (in pixels) of the low quality placeholder stored with each picture
+PLACEHOLDER_SIZE = 16
+
+# coalesces concurrent reads of the same picture (see `read_picture`), its stats are reported by
+# the heartbeat (api.checkers.picture_reads)
+picture_reads = SingleFlight()
+
+
+def is_picture_hash(value):
+    return value is not None and PICTURE_HASH_PATTERN.match(value) is not None
+
+
+def picture_key(picture_hash):
+    return make_s3_path(getattr(settings, "ASSETS_PATH"), "pictures", picture_hash)
+
+
+def hash_picture(picture):
+    """returns the SHA-256 hex digest of an uploaded file, rewinding it for the next reader"""
+    digest = hashlib.sha256()
+    for chunk in picture.chunks():
+        digest.update(chunk)
+    picture.seek(0)
+    return digest.hexdigest()
+
+
+def store_picture(storage, picture, content_type="image/jpeg"):
+    """
+    Stores an uploaded picture under its content hash and returns the hash,
+    the upload is skipped when an identical picture has already been stored
+    """
+    if isinstance(picture, StreamedPicture):
+        return __store_streamed_picture__(storage, picture)
+    picture_hash = hash_picture(picture)
+    key = picture_key(picture_hash)
+    if not __touch__(storage, key):
+        storage.put(key, picture, content_type=content_type)
+    return picture_hash
+
+
+def __touch__(storage, key):
+    """refreshes the last modified time of a stored picture, returns False if there is none"""
+    try:
+        storage.touch(key)
+        return True
+    except ObjectNotFound:
+        return False
+
+
+def __store_streamed_picture__(storage, picture):
+    # the picture is in storage already (under a temporary key), hashed while it was received
+    key = picture_key(picture.picture_hash)
+    if not __touch__(storage, key):
+        storage.copy(picture.upload_key, key)
+    picture.stored = True
+    storage.delete(picture.upload_key)
+    return picture.picture_hash
+
+
+def read_picture(storage, key, max_bytes):
+    """
+    Reads a whole picture into memory, sharing the read with concurrent requests for the same
+    picture (see `picture_reads`), returns the `StoredObject` and the content. The content is
+    None for pictures larger than `max_bytes`: the caller streams the body of the `StoredObject`,
+    which is left open (the one the storage call opened when the caller made it, a new one
+    otherwise)
+    """
+    opened = []
+
+    def read():
+        picture = storage.stream(key)
+        if picture.content_length > max_bytes:
+            # not read again by this request to stream it
+            opened.append(picture)
+            return picture, None
+        try:
+            return picture, picture.body.read()
+        finally:
+            picture.body.close()
+
+    picture, content = picture_reads.do(key, read)
+    if content is None and not opened:
+        # the body opened by the request that made the storage call is that request's to stream
+        picture = storage.stream(key)
+    return picture, content
+
+
+async def read_picture_async(storage, key, max_bytes):
+    """`read_picture` for an `api.storage.AsyncStorage`"""
+    opened = []
+
+    async def read():
+        picture, content = await storage.read(key, max_bytes=max_bytes)
+        if content is None:
+            opened.append(picture)
+        return picture, content
+
+    picture, content = await picture_reads.do_async(key, read)
+    if content is None and not opened:
+        picture, content = await storage.read(key, max_bytes=max_bytes)
+    return picture, content
+
+
+def picture_etag(picture_hash):
+    return '"{}"'.format(picture_hash)
+
+
+def etag_matches(request, picture_hash):
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH")
+    if not if_none_match:
+        return False
+    etags = [etag.strip() for etag in if_none_match.split(",")]
+    return "*" in etags or picture_etag(picture_hash) in etags
+
+
+def picture_placeholder(picture):
+    """
+    Returns a tiny base64 JPEG data URI (LQIP) and the dominant colour ("#rrggbb") of an uploaded
+    picture, these are stored with the record so clients can paint something before the picture
+    itself is fetched. (None, None) is returned for files that can't be decoded as an image
+    """
+    try:
+        with Image.open(picture) as image:
+            # let the JPEG decoder downscale while decoding instead of decoding the full picture
+            image.draft("RGB", (PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4))
+            image = image.convert("RGB")
+            image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            red, green, blue = image.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0))
+            thumbnail = io.BytesIO()
+            image.save(thumbnail, format="JPEG", quality=50, optimize=True)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        # e.g. a tiny file declaring billions of pixels
+        return None, None
+    finally:
+        picture.seek(0)
+
+    return (
+        "data:image/jpeg;base64,{}".format(base64.b64encode(thumbnail.getvalue()).decode("ascii")),
+        "#{:02x}{:02x}{:02x}".format(red, green, blue),
+    )
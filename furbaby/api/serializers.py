@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from .models import Notifications, Users, Locations, Pets, Jobs, Applications
-from django.contrib.auth.hashers import make_password
+from .hashing import make_password
+from .measurements import ImplausibleMeasurement, parse_height, parse_weight
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from .utils import normalize_email
 
 
 class RegistrationSerializer(serializers.ModelSerializer):
@@ -15,6 +18,8 @@ class RegistrationSerializer(serializers.ModelSerializer):
     )
     password = serializers.CharField(min_length=8, write_only=True, trim_whitespace=True)
     email = serializers.EmailField(allow_blank=False, trim_whitespace=True)
+    # bulk imports check a whole chunk of emails at once (see the import_users command)
+    check_duplicate_email = True
 
     class Meta:
         model = Users
@@ -24,12 +29,16 @@ class RegistrationSerializer(serializers.ModelSerializer):
             "user_type",
         ]
 
+    def validate_email(self, value):
+        # stored lowercased, so that lookups can use the unique index on email
+        return normalize_email(value)
+
     def validate(self, data):
         user_type = data.get("user_type", [])
-        email = data.get("email", "").lower()  # Convert email to lowercase for case insensitivity
+        email = data.get("email", "")
 
         # Check if the email already exists in the database
-        if Users.objects.filter(email__iexact=email).exists():
+        if self.check_duplicate_email and Users.objects.filter(email=email).exists():
             raise serializers.ValidationError("Email already exists")
 
         if "sitter" in user_type and not email.endswith("nyu.edu"):
@@ -47,6 +56,16 @@ class RegistrationSerializer(serializers.ModelSerializer):
         return Users.objects.create(**validated_data)
 
 
+class UserImportSerializer(RegistrationSerializer):
+    first_name = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    last_name = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    phone_number = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+    check_duplicate_email = False
+
+    class Meta(RegistrationSerializer.Meta):
+        fields = RegistrationSerializer.Meta.fields + ["first_name", "last_name", "phone_number"]
+
+
 class UserLoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
     password = serializers.CharField(min_length=8, write_only=True)
@@ -71,7 +90,6 @@ class UserLocationSerializer(serializers.Serializer):
             "default_location",
         ]
 
-    # TODO: There should be only one default address per user
     def validate(self, data):
         city = data.get("city", "")
         city = str(city).lower()
@@ -93,20 +111,24 @@ class UserLocationSerializer(serializers.Serializer):
             raise ValidationError("Users must be located in the United States of America/USA")
         return data
 
+    # the previous default is unset in the same transaction, a user has a single default location
+    # (see the locations_one_default_per_user constraint)
     def create(self, validated_data):
-        return Locations.objects.create(**validated_data)
+        with transaction.atomic():
+            if validated_data.get("default_location"):
+                Locations.objects.clear_default(validated_data["user"])
+            return Locations.objects.create(**validated_data)
 
     def update(self, instance, validated_data):
         instance.address = validated_data.get("address", instance.address)
         instance.city = validated_data.get("city", instance.city)
         instance.country = validated_data.get("country", instance.country)
         instance.zipcode = validated_data.get("zipcode", instance.zipcode)
-        if validated_data.get("default_location"):
-            Locations.objects.filter(user=instance.user).update(default_location=False)
-            instance.default_location = True
-        if not validated_data.get("default_location"):
-            instance.default_location = False
-        instance.save()
+        with transaction.atomic():
+            if validated_data.get("default_location") and not instance.default_location:
+                Locations.objects.clear_default(instance.user_id)
+            instance.default_location = bool(validated_data.get("default_location"))
+            instance.save()
         return instance
 
 
@@ -116,6 +138,31 @@ class PetSerializer(serializers.ModelSerializer):
     class Meta:
         model = Pets
         exclude = ()
+        read_only_fields = (
+            "picture_hash",
+            "picture_placeholder",
+            "picture_color",
+            "has_picture",
+            "picture_version",
+            # matched from species & breed, see api/taxonomy.py
+            "species_taxon",
+            "breed_taxon",
+            # parsed from weight & height
+            "weight_grams",
+            "height_cm",
+        )
+
+    def validate(self, data):
+        for field, parse, parsed_field in (
+            ("weight", parse_weight, "weight_grams"),
+            ("height", parse_height, "height_cm"),
+        ):
+            if field in data:
+                try:
+                    data[parsed_field] = parse(data[field])
+                except ImplausibleMeasurement as e:
+                    raise serializers.ValidationError({field: str(e)})
+        return data
 
 
 class JobSerializer(serializers.ModelSerializer):
@@ -127,6 +174,18 @@ class JobSerializer(serializers.ModelSerializer):
         model = Jobs
         fields = "__all__"
 
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        # NOTE: querysets serialized here should use select_related("pet")
+        representation["pet_picture"] = {
+            "hash": instance.pet.picture_hash,
+            "placeholder": instance.pet.picture_placeholder,
+            "color": instance.pet.picture_color,
+            "has_picture": instance.pet.has_picture,
+            "version": instance.pet.picture_version,
+        }
+        return representation
+
 
 class UserSerializer(serializers.Serializer):
     id = serializers.UUIDField()
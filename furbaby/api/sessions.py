@@ -0,0 +1,42 @@
+"""
+Cached, database-backed sessions (the default `SESSION_ENGINE`).
+
+Sessions are read from the cache and only from `django_session` on a miss, so an authenticated
+request usually doesn't touch the database for its session. Unlike Django's `cached_db` engine,
+the cache entries are kept at most `SESSION_CACHE_MAX_AGE` seconds: with a cache per process
+(no shared cache configured) a session ended in one worker (logout, account deletion) would
+otherwise stay valid in the caches of the other workers until it expires.
+"""
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+
+class BoundedTimeoutCache:
+    """a cache whose entries are set for at most `max_timeout` seconds"""
+
+    def __init__(self, cache, max_timeout):
+        self.cache = cache
+        self.max_timeout = max_timeout
+
+    def get(self, key, default=None):
+        return self.cache.get(key, default)
+
+    def set(self, key, value, timeout=None):
+        if timeout is None or timeout > self.max_timeout:
+            timeout = self.max_timeout
+        return self.cache.set(key, value, timeout)
+
+    def delete(self, key):
+        return self.cache.delete(key)
+
+    def __contains__(self, key):
+        return key in self.cache
+
+
+class SessionStore(CachedDBStore):
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        max_age = getattr(settings, "SESSION_CACHE_MAX_AGE", None)
+        if max_age != None:
+            self._cache = BoundedTimeoutCache(self._cache, max_age)
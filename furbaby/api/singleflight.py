@@ -0,0 +1,98 @@
+"""
+Request coalescing ("singleflight") for identical concurrent calls.
+
+When many requests ask for the same key at the same time (e.g. a popular job shown to many
+sitters renders the same pet picture), only the first one performs the call and the others wait
+for its outcome instead of issuing their own. Nothing is cached: once the in-flight call
+completes, the next request for the key performs a new call.
+
+Calls are coalesced within a worker process only.
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.tasks = {}
+        # number of calls actually performed and of callers that shared an in-flight call
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Returns the result of `function(*args, **kwargs)`, sharing the outcome (result or
+        exception) of the call already in flight for `key` in another thread, if any
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key, function, *args, **kwargs):
+        """
+        Async version of `do`, `function` is a coroutine function. The call runs in its own
+        task so that a cancelled caller (e.g. a client disconnecting) doesn't cancel it for the
+        other callers waiting on it
+        """
+        loop = asyncio.get_running_loop()
+        # tasks can only be awaited from the loop running them
+        flight_key = (id(loop), key)
+        with self.lock:
+            task = self.tasks.get(flight_key)
+            if task is None:
+                task = loop.create_task(function(*args, **kwargs))
+                task.add_done_callback(lambda done: self.__forget__(flight_key, done))
+                self.tasks[flight_key] = task
+                self.executed += 1
+            else:
+                self.shared += 1
+        return await asyncio.shield(task)
+
+    def __forget__(self, flight_key, task):
+        with self.lock:
+            if self.tasks.get(flight_key) is task:
+                del self.tasks[flight_key]
+        if not task.cancelled():
+            # mark the exception as retrieved, every waiter may have been cancelled already
+            task.exception()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "calls": self.executed + self.shared,
+                "executed": self.executed,
+                "saved": self.shared,
+                "in_flight": len(self.calls) + len(self.tasks),
+            }
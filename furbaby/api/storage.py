@@ -0,0 +1,860 @@
+"""
+Storage backends for user uploaded assets (profile & pet pictures).
+
+The picture views only talk to the interface defined by `BaseStorage`, the backend in use is
+picked from the `PICTURE_STORAGE` setting:
+
+    PICTURE_STORAGE = {
+        "BACKEND": "api.storage.S3Storage",
+        "OPTIONS": {"bucket_name": "...", "config": S3_CONFIG},
+    }
+
+`S3Storage` is used when deployed, `LocalFileSystemStorage` and `InMemoryStorage` allow the
+picture endpoints to be exercised (tests, benchmarks, offline development) without AWS.
+
+Unless `PICTURE_STORAGE_CIRCUIT_BREAKER` is None, the backend is wrapped in a
+`CircuitBreakerStorage` that fails fast (`StorageUnavailable`) while the backend is degraded.
+"""
+
+import asyncio
+import functools
+import io
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import boto3
+from botocore.exceptions import (
+    BotoCoreError,
+    ClientError,
+    ConnectTimeoutError,
+    ReadTimeoutError,
+)
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .circuit_breaker import CircuitBreaker, CircuitOpen
+from .utils import BYTE_RANGE_PATTERN
+
+
+class StorageError(Exception):
+    pass
+
+
+class ObjectNotFound(StorageError):
+    pass
+
+
+class InvalidRange(StorageError):
+    pass
+
+
+class StorageTimeout(StorageError):
+    pass
+
+
+class StorageUnavailable(StorageError):
+    """raised without calling the backend while its circuit breaker is open"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ObjectInfo:
+    def __init__(self, key, size, content_type=None, last_modified=None):
+        self.key = key
+        self.size = size
+        self.content_type = content_type
+        # timezone aware datetime, when the backend reports it
+        self.last_modified = last_modified
+
+
+class StoredObject:
+    """
+    An open object returned by `BaseStorage.stream`; `body` is a file-like object that
+    must be read in chunks and closed by the caller
+    """
+
+    def __init__(self, body, content_length, content_range=None, content_type=None):
+        self.body = body
+        self.content_length = content_length
+        self.content_range = content_range
+        self.content_type = content_type
+
+
+def resolve_byte_range(byte_range, size):
+    """
+    Translates a normalized byte range ("bytes=<start>-<end>", see `utils.parse_range_header`)
+    into inclusive (start, end) offsets for an object of `size` bytes
+    """
+    match = BYTE_RANGE_PATTERN.match(byte_range)
+    if match is None:
+        raise InvalidRange(byte_range)
+    start, end = match.groups()
+    if start == "":
+        # suffix range, i.e. the last N bytes of the object
+        length = int(end)
+        if length == 0:
+            raise InvalidRange(byte_range)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = size - 1 if end == "" else min(int(end), size - 1)
+    if start >= size or end < start:
+        raise InvalidRange(byte_range)
+    return start, end
+
+
+def content_range_header(start, end, size):
+    return "bytes {}-{}/{}".format(start, end, size)
+
+
+class BaseStorage:
+    def get(self, key):
+        """returns the full content of the object stored under `key` as bytes"""
+        raise NotImplementedError
+
+    def put(self, key, body, content_type=None):
+        """stores `body` (bytes or a file-like object) under `key`, overwriting any object"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """deletes the object stored under `key`, deleting a missing object is not an error"""
+        raise NotImplementedError
+
+    def delete_many(self, keys):
+        """deletes all `keys` and returns the number of keys handed to the backend"""
+        for key in keys:
+            self.delete(key)
+        return len(keys)
+
+    def head(self, key):
+        """returns an `ObjectInfo` for the object stored under `key`"""
+        raise NotImplementedError
+
+    def exists(self, key):
+        try:
+            self.head(key)
+            return True
+        except ObjectNotFound:
+            return False
+
+    def presign(self, key, expires_in=3600):
+        """returns a URL through which the object can be fetched without going through the API"""
+        raise NotImplementedError
+
+    def stream(self, key, byte_range=None):
+        """returns a `StoredObject` for the whole object or only for `byte_range` of it"""
+        raise NotImplementedError
+
+    def open_upload(self, key, content_type=None):
+        """returns an `Upload` through which an object is written under `key` chunk by chunk"""
+        raise NotImplementedError
+
+    def list_objects(self, prefix="", page_size=1000):
+        """yields the objects whose key starts with `prefix`, in pages (lists) of `ObjectInfo`"""
+        raise NotImplementedError
+
+    def copy(self, source_key, key):
+        """copies the object stored under `source_key` to `key`, overwriting any object"""
+        raise NotImplementedError
+
+    def touch(self, key):
+        """sets the last modified time of the object stored under `key` to now"""
+        raise NotImplementedError
+
+
+class Upload:
+    """
+    An object being written chunk by chunk (see `BaseStorage.open_upload`), it only becomes
+    visible under its key once `complete` is called, `abort` discards what was written
+    """
+
+    def write(self, chunk):
+        raise NotImplementedError
+
+    def complete(self):
+        raise NotImplementedError
+
+    def abort(self):
+        raise NotImplementedError
+
+
+class S3Storage(BaseStorage):
+    def __init__(self, bucket_name, config=None, client=None, multipart_part_size=8 * 1024 * 1024):
+        self.bucket_name = bucket_name
+        self.client = client if client is not None else boto3.client("s3", config=config)
+        # NOTE: S3 requires every part but the last one of a multipart upload to be >= 5 MiB
+        self.multipart_part_size = max(multipart_part_size, 5 * 1024 * 1024)
+
+    def __raise_storage_error__(self, key, error):
+        if isinstance(error, (ConnectTimeoutError, ReadTimeoutError)):
+            raise StorageTimeout(str(error)) from error
+        if isinstance(error, BotoCoreError):
+            # connection failures, i.e. no response from S3 at all
+            raise StorageError(str(error)) from error
+        code = error.response.get("Error", {}).get("Code")
+        if code in ("NoSuchKey", "404", "NotFound"):
+            raise ObjectNotFound(key) from error
+        if code == "InvalidRange":
+            raise InvalidRange(key) from error
+        raise StorageError(str(error)) from error
+
+    def get(self, key):
+        try:
+            s3_object = self.client.get_object(Bucket=self.bucket_name, Key=key)
+        except (ClientError, BotoCoreError) as e:
+            self.__raise_storage_error__(key, e)
+        body = s3_object["Body"]
+        try:
+            return body.read()
+        finally:
+            body.close()
+
+    def put(self, key, body, content_type=None):
+        put_object_args = {"Bucket": self.bucket_name, "Key": key, "Body": body}
+        if content_type is not None:
+            put_object_args["ContentType"] = content_type
+        try:
+            self.client.put_object(**put_object_args)
+        except (ClientError, BotoCoreError) as e:
+            self.__raise_storage_error__(key, e)
+
+    def delete(self, key):
+        try:
+            self.client.delete_object(Bucket=self.bucket_name, Key=key)
+        except (ClientError, BotoCoreError) as e:
+            self.__raise_storage_error__(key, e)
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        # NOTE: S3 accepts at most 1000 keys per DeleteObjects call
+        for offset in range(0, len(keys), 1000):
+            batch = keys[offset : offset + 1000]
+            try:
+                self.client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+                )
+            except (ClientError, BotoCoreError) as e:
+                self.__raise_storage_error__(batch[0], e)
+        return len(keys)
+
+    def head(self, key):
+        try:
+            s3_object = self.client.head_object(Bucket=self.bucket_name, Key=key)
+        except (ClientError, BotoCoreError) as e:
+            self.__raise_storage_error__(key, e)
+        return ObjectInfo(
+            key,
+            s3_object["ContentLength"],
+            s3_object.get("ContentType"),
+            s3_object.get("LastModified"),
+        )
+
+    def presign(self, key, expires_in=3600):
+        try:
+            return self.client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": self.bucket_name, "Key": key},
+                ExpiresIn=expires_in,
+            )
+        except (ClientError, BotoCoreError) as e:
+            self.__raise_storage_error__(key, e)
+
+    def stream(self, key, byte_range=None):
+        get_object_args = {"Bucket": self.bucket_name, "Key": key}
+        if byte_range is not None:
+            get_object_args["Range"] = byte_range
+        try:
+            s3_object = self.client.get_object(**get_object_args)
+        except (ClientError, BotoCoreError) as e:
+            self.__raise_storage_error__(key, e)
+        return StoredObject(
+            s3_object["Body"],
+            s3_object["ContentLength"],
+            content_range=s3_object.get("ContentRange"),
+            content_type=s3_object.get("ContentType"),
+        )
+
+    def open_upload(self, key, content_type=None):
+        return S3Upload(self, key, content_type)
+
+    def list_objects(self, prefix="", page_size=1000):
+        pages = self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket_name, Prefix=prefix, PaginationConfig={"PageSize": page_size}
+        )
+        try:
+            for page in pages:
+                yield [
+                    ObjectInfo(s3_object["Key"], s3_object["Size"], None, s3_object["LastModified"])
+                    for s3_object in page.get("Contents", [])
+                ]
+        except (ClientError, BotoCoreError) as e:
+            self.__raise_storage_error__(prefix, e)
+
+    def copy(self, source_key, key):
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket_name,
+                Key=key,
+                CopySource={"Bucket": self.bucket_name, "Key": source_key},
+            )
+        except (ClientError, BotoCoreError) as e:
+            self.__raise_storage_error__(source_key, e)
+
+    def touch(self, key):
+        # S3 only accepts copying an object onto itself when its metadata is replaced
+        stored_object = self.head(key)
+        copy_object_args = {
+            "Bucket": self.bucket_name,
+            "Key": key,
+            "CopySource": {"Bucket": self.bucket_name, "Key": key},
+            "MetadataDirective": "REPLACE",
+        }
+        if stored_object.content_type is not None:
+            copy_object_args["ContentType"] = stored_object.content_type
+        try:
+            self.client.copy_object(**copy_object_args)
+        except (ClientError, BotoCoreError) as e:
+            self.__raise_storage_error__(key, e)
+
+
+class S3Upload(Upload):
+    """
+    Buffers at most one part (`S3Storage.multipart_part_size`) in memory, larger objects are
+    sent as a multipart upload which is only started once the first part is full, smaller ones
+    are sent with a single PutObject when the upload completes
+    """
+
+    def __init__(self, storage, key, content_type=None):
+        self.storage = storage
+        self.key = key
+        self.content_type = content_type
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+
+    def __upload_part__(self):
+        client, bucket_name = self.storage.client, self.storage.bucket_name
+        try:
+            if self.upload_id is None:
+                create_args = {"Bucket": bucket_name, "Key": self.key}
+                if self.content_type is not None:
+                    create_args["ContentType"] = self.content_type
+                self.upload_id = client.create_multipart_upload(**create_args)["UploadId"]
+            part_number = len(self.parts) + 1
+            part = client.upload_part(
+                Bucket=bucket_name,
+                Key=self.key,
+                UploadId=self.upload_id,
+                PartNumber=part_number,
+                Body=bytes(self.buffer),
+            )
+        except (ClientError, BotoCoreError) as e:
+            self.storage.__raise_storage_error__(self.key, e)
+        self.parts.append({"ETag": part["ETag"], "PartNumber": part_number})
+        self.buffer = bytearray()
+
+    def write(self, chunk):
+        self.buffer += chunk
+        if len(self.buffer) >= self.storage.multipart_part_size:
+            self.__upload_part__()
+
+    def complete(self):
+        if self.upload_id is None:
+            self.storage.put(self.key, bytes(self.buffer), self.content_type)
+            self.buffer = bytearray()
+            return
+        if len(self.buffer) > 0:
+            self.__upload_part__()
+        try:
+            self.storage.client.complete_multipart_upload(
+                Bucket=self.storage.bucket_name,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": self.parts},
+            )
+        except (ClientError, BotoCoreError) as e:
+            self.storage.__raise_storage_error__(self.key, e)
+
+    def abort(self):
+        self.buffer = bytearray()
+        if self.upload_id is None:
+            return
+        try:
+            self.storage.client.abort_multipart_upload(
+                Bucket=self.storage.bucket_name, Key=self.key, UploadId=self.upload_id
+            )
+        except (ClientError, BotoCoreError) as e:
+            self.storage.__raise_storage_error__(self.key, e)
+
+
+class LocalFileSystemStorage(BaseStorage):
+    def __init__(self, location, base_url=None):
+        self.location = Path(location)
+        self.base_url = base_url
+
+    def __path__(self, key):
+        path = (self.location / key).resolve()
+        if self.location.resolve() not in path.parents:
+            raise StorageError("key {} resolves outside of the storage location".format(key))
+        return path
+
+    def get(self, key):
+        try:
+            return self.__path__(key).read_bytes()
+        except FileNotFoundError as e:
+            raise ObjectNotFound(key) from e
+
+    def put(self, key, body, content_type=None):
+        path = self.__path__(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a sibling file first so readers never observe a partially written object
+        temporary_path = path.with_name("{}.{}.tmp".format(path.name, threading.get_ident()))
+        with open(temporary_path, "wb") as destination:
+            if isinstance(body, (bytes, bytearray)):
+                destination.write(body)
+            else:
+                for chunk in iter(lambda: body.read(64 * 1024), b""):
+                    destination.write(chunk)
+        os.replace(temporary_path, path)
+
+    def delete(self, key):
+        try:
+            self.__path__(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def head(self, key):
+        try:
+            return self.__object_info__(key, self.__path__(key).stat())
+        except FileNotFoundError as e:
+            raise ObjectNotFound(key) from e
+
+    def __object_info__(self, key, stat):
+        return ObjectInfo(
+            key,
+            stat.st_size,
+            last_modified=datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+        )
+
+    def presign(self, key, expires_in=3600):
+        if self.base_url is None:
+            return self.__path__(key).as_uri()
+        return "{}/{}".format(self.base_url.rstrip("/"), key)
+
+    def stream(self, key, byte_range=None):
+        path = self.__path__(key)
+        try:
+            body = open(path, "rb")
+        except FileNotFoundError as e:
+            raise ObjectNotFound(key) from e
+        size = os.fstat(body.fileno()).st_size
+        if byte_range is None:
+            return StoredObject(body, size)
+        try:
+            start, end = resolve_byte_range(byte_range, size)
+        except InvalidRange:
+            body.close()
+            raise
+        body.seek(start)
+        return StoredObject(
+            LimitedReader(body, end - start + 1),
+            end - start + 1,
+            content_range=content_range_header(start, end, size),
+        )
+
+    def open_upload(self, key, content_type=None):
+        path = self.__path__(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return LocalFileUpload(path)
+
+    def list_objects(self, prefix="", page_size=1000):
+        page = []
+        for directory, directories, files in os.walk(self.location):
+            directories.sort()
+            for name in sorted(files):
+                if name.endswith(".tmp"):
+                    # objects being written
+                    continue
+                path = Path(directory) / name
+                key = path.relative_to(self.location).as_posix()
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    page.append(self.__object_info__(key, path.stat()))
+                except FileNotFoundError:
+                    continue
+                if len(page) == page_size:
+                    yield page
+                    page = []
+        if len(page) > 0:
+            yield page
+
+    def copy(self, source_key, key):
+        source, path = self.__path__(source_key), self.__path__(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_name("{}.{}.tmp".format(path.name, threading.get_ident()))
+        try:
+            shutil.copyfile(source, temporary_path)
+        except FileNotFoundError as e:
+            raise ObjectNotFound(source_key) from e
+        os.replace(temporary_path, path)
+
+    def touch(self, key):
+        try:
+            os.utime(self.__path__(key))
+        except FileNotFoundError as e:
+            raise ObjectNotFound(key) from e
+
+
+class LocalFileUpload(Upload):
+    """writes to a temporary sibling file which replaces the object once complete"""
+
+    def __init__(self, path):
+        self.path = path
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=path.parent, prefix=path.name, suffix=".tmp"
+        )
+        self.temporary_path = Path(temporary_path)
+        self.file = os.fdopen(file_descriptor, "wb")
+
+    def write(self, chunk):
+        self.file.write(chunk)
+
+    def complete(self):
+        self.file.close()
+        os.replace(self.temporary_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        self.temporary_path.unlink(missing_ok=True)
+
+
+class LimitedReader:
+    """file-like wrapper that stops reading after `limit` bytes of the wrapped stream"""
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.remaining = limit
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        chunk = self.stream.read(size)
+        self.remaining -= len(chunk)
+        return chunk
+
+    def close(self):
+        self.stream.close()
+
+
+class InMemoryStorage(BaseStorage):
+    def __init__(self):
+        self.objects = {}
+        self.last_modified = {}
+        self.lock = threading.Lock()
+
+    def __read__(self, key):
+        with self.lock:
+            try:
+                return self.objects[key]
+            except KeyError as e:
+                raise ObjectNotFound(key) from e
+
+    def get(self, key):
+        return self.__read__(key)[0]
+
+    def put(self, key, body, content_type=None):
+        if not isinstance(body, (bytes, bytearray)):
+            body = body.read()
+        with self.lock:
+            self.objects[key] = (bytes(body), content_type)
+            self.last_modified[key] = datetime.now(timezone.utc)
+
+    def delete(self, key):
+        with self.lock:
+            self.objects.pop(key, None)
+            self.last_modified.pop(key, None)
+
+    def head(self, key):
+        content, content_type = self.__read__(key)
+        return ObjectInfo(key, len(content), content_type, self.last_modified.get(key))
+
+    def list_objects(self, prefix="", page_size=1000):
+        with self.lock:
+            keys = sorted(key for key in self.objects if key.startswith(prefix))
+        for offset in range(0, len(keys), page_size):
+            page = []
+            for key in keys[offset : offset + page_size]:
+                try:
+                    page.append(self.head(key))
+                except ObjectNotFound:
+                    continue
+            yield page
+
+    def presign(self, key, expires_in=3600):
+        return "memory://{}".format(key)
+
+    def stream(self, key, byte_range=None):
+        content, content_type = self.__read__(key)
+        if byte_range is None:
+            return StoredObject(io.BytesIO(content), len(content), content_type=content_type)
+        start, end = resolve_byte_range(byte_range, len(content))
+        return StoredObject(
+            io.BytesIO(content[start : end + 1]),
+            end - start + 1,
+            content_range=content_range_header(start, end, len(content)),
+            content_type=content_type,
+        )
+
+    def open_upload(self, key, content_type=None):
+        return InMemoryUpload(self, key, content_type)
+
+    def copy(self, source_key, key):
+        stored_object = self.__read__(source_key)
+        with self.lock:
+            self.objects[key] = stored_object
+            self.last_modified[key] = datetime.now(timezone.utc)
+
+    def touch(self, key):
+        with self.lock:
+            if key not in self.objects:
+                raise ObjectNotFound(key)
+            self.last_modified[key] = datetime.now(timezone.utc)
+
+
+class InMemoryUpload(Upload):
+    def __init__(self, storage, key, content_type=None):
+        self.storage = storage
+        self.key = key
+        self.content_type = content_type
+        self.buffer = io.BytesIO()
+
+    def write(self, chunk):
+        self.buffer.write(chunk)
+
+    def complete(self):
+        self.storage.put(self.key, self.buffer.getvalue(), self.content_type)
+
+    def abort(self):
+        self.buffer = io.BytesIO()
+
+
+def is_backend_failure(error):
+    # missing objects and unsatisfiable ranges are answers from a healthy backend
+    return not isinstance(error, (ObjectNotFound, InvalidRange))
+
+
+class CircuitBreakerStorage(BaseStorage):
+    """
+    Passes calls through to `storage` via a `CircuitBreaker`, once too many of them fail the
+    calls are rejected with `StorageUnavailable` (instead of waiting on a degraded backend)
+    until probe calls succeed again
+    """
+
+    def __init__(self, storage, breaker):
+        self.storage = storage
+        self.breaker = breaker
+
+    def __call__(self, function, *args, **kwargs):
+        try:
+            return self.breaker.call(function, *args, **kwargs)
+        except CircuitOpen as e:
+            raise StorageUnavailable(str(e), e.retry_after) from e
+
+    def get(self, key):
+        return self(self.storage.get, key)
+
+    def put(self, key, body, content_type=None):
+        return self(self.storage.put, key, body, content_type)
+
+    def delete(self, key):
+        return self(self.storage.delete, key)
+
+    def delete_many(self, keys):
+        return self(self.storage.delete_many, keys)
+
+    def head(self, key):
+        return self(self.storage.head, key)
+
+    def presign(self, key, expires_in=3600):
+        # signing happens locally, it doesn't depend on the backend being available
+        return self.storage.presign(key, expires_in)
+
+    def stream(self, key, byte_range=None):
+        return self(self.storage.stream, key, byte_range)
+
+    def open_upload(self, key, content_type=None):
+        return CircuitBreakerUpload(self, self(self.storage.open_upload, key, content_type))
+
+    def copy(self, source_key, key):
+        return self(self.storage.copy, source_key, key)
+
+    def touch(self, key):
+        return self(self.storage.touch, key)
+
+    def list_objects(self, prefix="", page_size=1000):
+        # only used by maintenance commands, which should see the errors of the backend
+        return self.storage.list_objects(prefix, page_size)
+
+
+class CircuitBreakerUpload(Upload):
+    # only completing counts as a call, most writes just fill a buffer
+    def __init__(self, storage, upload):
+        self.storage = storage
+        self.upload = upload
+
+    def write(self, chunk):
+        self.upload.write(chunk)
+
+    def complete(self):
+        return self.storage(self.upload.complete)
+
+    def abort(self):
+        self.upload.abort()
+
+
+class AsyncStorage:
+    """
+    Runs the calls of a (blocking) storage backend on a dedicated, bounded thread pool so that
+    async views never block the event loop, each call is given at most `timeout` seconds
+    (including the time spent waiting for a free worker)
+    """
+
+    def __init__(self, storage, max_workers=16, timeout=10):
+        self.storage = storage
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="picture-storage"
+        )
+
+    async def run(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(function, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError as e:
+            raise StorageTimeout(
+                "storage call did not complete within {}s".format(self.timeout)
+            ) from e
+
+    def __read__(self, key, byte_range, max_bytes):
+        stored_object = self.storage.stream(key, byte_range=byte_range)
+        if max_bytes is not None and stored_object.content_length > max_bytes:
+            return stored_object, None
+        try:
+            return stored_object, stored_object.body.read()
+        finally:
+            stored_object.body.close()
+
+    async def read(self, key, byte_range=None, max_bytes=None):
+        """
+        returns the `StoredObject` and the content of (the range of) an object. The content is
+        None when it's larger than `max_bytes`, the body of the `StoredObject` is then left open
+        for the caller to stream (and close)
+        """
+        return await self.run(self.__read__, key, byte_range, max_bytes)
+
+    @staticmethod
+    def __read_body__(stored_object, chunk_size):
+        chunks = []
+        try:
+            while True:
+                chunk = stored_object.body.read(chunk_size)
+                if not chunk:
+                    return b"".join(chunks)
+                chunks.append(chunk)
+        finally:
+            stored_object.body.close()
+
+    async def read_body(self, stored_object, chunk_size=64 * 1024):
+        """reads (in chunks) & closes the body of a `StoredObject` left open by `read`"""
+        return await self.run(self.__read_body__, stored_object, chunk_size)
+
+    async def put(self, key, body, content_type=None):
+        return await self.run(self.storage.put, key, body, content_type)
+
+    async def delete(self, key):
+        return await self.run(self.storage.delete, key)
+
+    async def head(self, key):
+        return await self.run(self.storage.head, key)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+_storage = None
+_async_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """returns the (per-process) storage backend configured through `PICTURE_STORAGE`"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                storage_settings = getattr(settings, "PICTURE_STORAGE", None)
+                if storage_settings is None:
+                    storage_settings = {
+                        "BACKEND": "api.storage.S3Storage",
+                        "OPTIONS": {
+                            "bucket_name": getattr(settings, "AWS_BUCKET_NAME", ""),
+                            "config": getattr(settings, "S3_CONFIG", None),
+                        },
+                    }
+                backend = import_string(storage_settings["BACKEND"])
+                storage = backend(**storage_settings.get("OPTIONS", {}))
+                breaker_settings = getattr(settings, "PICTURE_STORAGE_CIRCUIT_BREAKER", None)
+                if breaker_settings is not None:
+                    storage = CircuitBreakerStorage(
+                        storage,
+                        CircuitBreaker(
+                            name="picture storage",
+                            is_failure=is_backend_failure,
+                            **breaker_settings,
+                        ),
+                    )
+                _storage = storage
+    return _storage
+
+
+def get_async_storage():
+    """returns the configured storage backend wrapped in an (per-process) `AsyncStorage`"""
+    global _async_storage
+    if _async_storage is None:
+        storage = get_storage()
+        with _storage_lock:
+            if _async_storage is None:
+                _async_storage = AsyncStorage(
+                    storage,
+                    max_workers=getattr(settings, "PICTURE_STORAGE_EXECUTOR_WORKERS", 16),
+                    timeout=getattr(settings, "PICTURE_STORAGE_TIMEOUT", 10),
+                )
+    return _async_storage
+
+
+@receiver(setting_changed)
+def reset_storage(*, setting, **kwargs):
+    global _storage, _async_storage
+    if setting in (
+        "PICTURE_STORAGE",
+        "PICTURE_STORAGE_CIRCUIT_BREAKER",
+        "PICTURE_STORAGE_EXECUTOR_WORKERS",
+        "PICTURE_STORAGE_TIMEOUT",
+    ):
+        if _async_storage is not None:
+            _async_storage.close()
+        _storage = None
+        _async_storage = None
@@ -0,0 +1,142 @@
+"""
+Species & breeds taxonomy.
+
+`Pets.species` & `Pets.breed` are typed freely, so the same breed came in many spellings and
+filtering jobs by breed meant an unindexed `ILIKE`. Pets are now linked on save to the `Species`
+& `Breeds` their text matches (by name or alias), so job filters compare the (indexed) ids.
+
+The taxonomy is small & rarely changes, so each process keeps it in memory: every word suffix of
+every name & alias ("golden retriever", "retriever") in a sorted list, a prefix is then a
+bisect away. It's rebuilt after TAXONOMY_CACHE_TIMEOUT seconds and right after a change made by
+the process.
+"""
+
+import bisect
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Breeds, Pets, Species
+
+
+def normalize_name(name):
+    # e.g. "Jack-Russell Terrier" -> "jack russell terrier"
+    return " ".join(re.sub(r"[^\w]+", " ", (name or "").lower()).split())
+
+
+class TaxonomyIndex:
+    def __init__(self, species, breeds):
+        # species are (id, name, aliases) & breeds (id, species id, name, aliases)
+        self.species = {pk: name for pk, name, _ in species}
+        self.breeds = {pk: (species_id, name) for pk, species_id, name, _ in breeds}
+        # exact (normalized) names & aliases, used to link pets
+        self.species_by_name = {}
+        self.breeds_by_name = {}
+        # (word suffix, kind, name, id), sorted for the prefix search
+        entries = []
+        names = [("species", pk, name, aliases) for pk, name, aliases in species]
+        names += [("breed", pk, name, aliases) for pk, _, name, aliases in breeds]
+        for kind, pk, name, aliases in names:
+            for text in [name] + list(aliases):
+                normalized = normalize_name(text)
+                if kind == "species":
+                    self.species_by_name.setdefault(normalized, pk)
+                else:
+                    self.breeds_by_name.setdefault(normalized, []).append(pk)
+                words = normalized.split()
+                for start in range(len(words)):
+                    entries.append((" ".join(words[start:]), kind, name, pk))
+        entries.sort()
+        self.keys = [entry[0] for entry in entries]
+        self.entries = [entry[1:] for entry in entries]
+
+    @classmethod
+    def load(cls):
+        return cls(
+            list(Species.objects.values_list("id", "name", "aliases")),
+            list(Breeds.objects.values_list("id", "species_id", "name", "aliases")),
+        )
+
+    def resolve_species(self, text):
+        return self.species_by_name.get(normalize_name(text))
+
+    def resolve_breed(self, text, species_id=None):
+        """the id of the breed named `text` (of `species_id` when given), None if there's none"""
+        for pk in self.breeds_by_name.get(normalize_name(text), []):
+            if species_id == None or self.breeds[pk][0] == species_id:
+                return pk
+        return None
+
+    def autocomplete(self, prefix, species_id=None, limit=10):
+        """the species & breeds with a word starting with `prefix`, shorter names first"""
+        prefix = normalize_name(prefix)
+        if prefix == "":
+            return {"species": [], "breeds": []}
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_right(self.keys, prefix + "\uffff", lo=start)
+        found = {"species": {}, "breed": {}}
+        for kind, name, pk in self.entries[start:end]:
+            if kind == "breed" and species_id != None and self.breeds[pk][0] != species_id:
+                continue
+            found[kind][pk] = name
+
+        def ranked(matches):
+            return sorted(matches.items(), key=lambda match: (len(match[1]), match[1]))[:limit]
+
+        return {
+            "species": [{"id": pk, "name": name} for pk, name in ranked(found["species"])],
+            "breeds": [
+                {
+                    "id": pk,
+                    "name": name,
+                    "species_id": self.breeds[pk][0],
+                    "species": self.species[self.breeds[pk][0]],
+                }
+                for pk, name in ranked(found["breed"])
+            ],
+        }
+
+
+_index = None
+_loaded_at = 0
+_index_lock = threading.Lock()
+
+
+def get_taxonomy():
+    global _index, _loaded_at
+    with _index_lock:
+        timeout = getattr(settings, "TAXONOMY_CACHE_TIMEOUT", 300)
+        if _index is None or time.monotonic() - _loaded_at > timeout:
+            _index = TaxonomyIndex.load()
+            _loaded_at = time.monotonic()
+        return _index
+
+
+@receiver(post_save, sender=Species)
+@receiver(post_delete, sender=Species)
+@receiver(post_save, sender=Breeds)
+@receiver(post_delete, sender=Breeds)
+def reset_taxonomy(**kwargs):
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def link_pet(pet):
+    """sets the taxonomy entries of a pet from its species & breed"""
+    taxonomy = get_taxonomy()
+    pet.species_taxon_id = taxonomy.resolve_species(pet.species)
+    pet.breed_taxon_id = taxonomy.resolve_breed(pet.breed, pet.species_taxon_id)
+    if pet.species_taxon_id == None and pet.breed_taxon_id != None:
+        pet.species_taxon_id = taxonomy.breeds[pet.breed_taxon_id][0]
+
+
+@receiver(pre_save, sender=Pets)
+def __link_pet_on_save__(sender, instance, update_fields=None, **kwargs):
+    # saves listing their fields have to list the taxon fields too for the link to be kept
+    if update_fields == None or {"species", "breed"} & set(update_fields):
+        link_pet(instance)
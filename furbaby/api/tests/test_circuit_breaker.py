@@ -0,0 +1,93 @@
+from django.test import SimpleTestCase
+from ..circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from ..storage import (
+    CircuitBreakerStorage,
+    InMemoryStorage,
+    ObjectNotFound,
+    StorageError,
+    StorageUnavailable,
+    is_backend_failure,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            failure_rate_threshold=0.5,
+            minimum_calls=4,
+            window_size=10,
+            reset_timeout=30,
+            half_open_max_calls=2,
+            clock=self.clock,
+        )
+
+    def succeed(self):
+        return self.breaker.call(lambda: "ok")
+
+    def fail(self):
+        def failing():
+            raise StorageError("storage is down")
+
+        with self.assertRaises(StorageError):
+            self.breaker.call(failing)
+
+    def test_opens_once_failure_rate_reaches_threshold(self):
+        self.succeed()
+        self.succeed()
+        self.fail()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.fail()
+        self.assertEqual(self.breaker.state, OPEN)
+
+        with self.assertRaises(CircuitOpen) as raised:
+            self.succeed()
+        self.assertEqual(raised.exception.retry_after, 30)
+
+    def test_half_open_probes_close_the_circuit(self):
+        for _ in range(4):
+            self.fail()
+        self.clock.now = 31
+
+        self.assertEqual(self.succeed(), "ok")
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.succeed()
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_probe_reopens_the_circuit(self):
+        for _ in range(4):
+            self.fail()
+        self.clock.now = 31
+
+        self.fail()
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpen):
+            self.succeed()
+
+
+class CircuitBreakerStorageTests(SimpleTestCase):
+    def test_missing_objects_are_not_failures(self):
+        storage = CircuitBreakerStorage(
+            InMemoryStorage(),
+            CircuitBreaker(minimum_calls=2, is_failure=is_backend_failure),
+        )
+        for _ in range(5):
+            with self.assertRaises(ObjectNotFound):
+                storage.get("assets/missing")
+        self.assertEqual(storage.breaker.state, CLOSED)
+
+    def test_open_circuit_raises_storage_unavailable(self):
+        storage = CircuitBreakerStorage(InMemoryStorage(), CircuitBreaker(minimum_calls=1))
+        with self.assertRaises(ZeroDivisionError):
+            storage.breaker.call(lambda: 1 / 0)
+        with self.assertRaises(StorageUnavailable) as raised:
+            storage.get("assets/picture")
+        self.assertEqual(raised.exception.retry_after, 30)
@@ -0,0 +1,317 @@
+import hashlib
+import io
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ..account_deletion import DONE, run_account_deletion
+from ..models import AccountDeletion, Applications, Jobs, Locations, Pets, Users
+from ..pictures import picture_key, store_picture
+from ..storage import get_storage
+from ..utils import make_s3_path
+
+
+@override_settings(
+    PICTURE_STORAGE={"BACKEND": "api.storage.InMemoryStorage"},
+    PICTURE_STORAGE_CIRCUIT_BREAKER=None,
+)
+class ReconcilePicturesCommandTest(TestCase):
+    def setUp(self):
+        self.user = Users.objects.create(
+            email="test_reconcile@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner"],
+            username="test_reconcile@gmail.com",
+        )
+        self.pet = Pets.objects.create(
+            owner=self.user, name="Fluffy", breed="Golden Retriever", weight="50"
+        )
+        self.storage = get_storage()
+        self.storage.objects.clear()
+
+    def put(self, *path, age=timedelta(days=2)):
+        key = make_s3_path(settings.ASSETS_PATH, *path)
+        self.storage.put(key, b"picture")
+        self.storage.last_modified[key] = datetime.now(timezone.utc) - age
+        return key
+
+    def reconcile(self, *args):
+        call_command("reconcile_pictures", *args, stdout=io.StringIO())
+
+    def test_reconcile_pictures(self):
+        deleted_user, deleted_pet = "9d1e4b8e-4d7c-4c5e-9a43-3f1d0c2a6b71", str(self.pet.id)
+        live_profile = self.put(str(self.user.id), "profile-picture", "picture")
+        live_pet = self.put(str(self.user.id), "pets", str(self.pet.id))
+        orphans = [
+            self.put(deleted_user, "profile-picture", "picture"),
+            self.put(deleted_user, "pets", deleted_pet),
+            self.put("pictures", "b" * 64),
+            self.put("uploads", "0123456789abcdef"),
+        ]
+        self.pet.picture_hash = "a" * 64
+        self.pet.save()
+        referenced = self.put("pictures", "a" * 64)
+        recent = self.put("pictures", "c" * 64, age=timedelta(minutes=5))
+        # the pet picture was replaced by a content hash one
+        orphans.append(live_pet)
+
+        self.reconcile("--dry-run")
+        self.assertEqual(len(self.storage.objects), 8)
+
+        self.reconcile("--page-size", "3")
+        self.assertEqual(sorted(self.storage.objects), sorted([live_profile, referenced, recent]))
+
+    def test_reconcile_rechecks_content_hashes_before_deleting(self):
+        touched = self.put("pictures", "a" * 64)
+        referenced = self.put("pictures", "b" * 64)
+        orphan = self.put("pictures", "c" * 64)
+        list_objects = self.storage.list_objects
+
+        def list_objects_then_upload(*args, **kwargs):
+            for page in list_objects(*args, **kwargs):
+                yield page
+            # uploads of the same content while the listing is being reconciled
+            self.storage.touch(touched)
+            self.pet.picture_hash = "b" * 64
+            self.pet.save()
+
+        self.storage.list_objects = list_objects_then_upload
+        self.addCleanup(delattr, self.storage, "list_objects")
+        self.reconcile()
+        self.assertEqual(sorted(self.storage.objects), sorted([touched, referenced]))
+        self.assertNotIn(orphan, self.storage.objects)
+
+    def test_store_picture_touches_the_stored_object(self):
+        key = self.put("pictures", hashlib.sha256(b"picture").hexdigest())
+        store_picture(self.storage, SimpleUploadedFile("picture.jpg", b"picture"))
+        self.reconcile()
+        self.assertIn(key, self.storage.objects)
+
+
+@override_settings(
+    PICTURE_STORAGE={"BACKEND": "api.storage.InMemoryStorage"},
+    PICTURE_STORAGE_CIRCUIT_BREAKER=None,
+    ACCOUNT_DELETION_BATCH_SIZE=2,
+)
+class AccountDeletionTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = Users.objects.create(
+            email="test_delete@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner", "sitter"],
+            username="test_delete@gmail.com",
+        )
+        self.other_user = Users.objects.create(
+            email="test_keep@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner", "sitter"],
+            username="test_keep@gmail.com",
+        )
+        self.location = Locations.objects.create(
+            user=self.user,
+            address="123 Main St",
+            city="New York City",
+            country="USA",
+            zipcode="12345",
+            default_location=True,
+        )
+        other_location = Locations.objects.create(
+            user=self.other_user,
+            address="456 Main St",
+            city="New York City",
+            country="USA",
+            zipcode="12345",
+            default_location=True,
+        )
+        pets = [
+            Pets.objects.create(owner=self.user, name=name, breed="Golden Retriever", weight="50")
+            for name in ("Fluffy", "Buddy", "Max")
+        ]
+        other_pet = Pets.objects.create(
+            owner=self.other_user, name="Rex", breed="Beagle", weight="20"
+        )
+        jobs = [
+            Jobs.objects.create(
+                pet=pet,
+                location=self.location,
+                user=self.user,
+                pay="100",
+                start="2030-01-01T10:00Z",
+                end="2030-01-01T12:00Z",
+                status="open",
+            )
+            for pet in pets
+        ]
+        self.other_job = Jobs.objects.create(
+            pet=other_pet,
+            location=other_location,
+            user=self.other_user,
+            pay="100",
+            start="2030-01-01T10:00Z",
+            end="2030-01-01T12:00Z",
+            status="open",
+        )
+        for job in jobs:
+            Applications.objects.create(user=self.other_user, job=job, status="applied", details={})
+        # the user's application to a job of somebody else
+        Applications.objects.create(
+            user=self.user, job=self.other_job, status="applied", details={}
+        )
+
+        self.storage = get_storage()
+        self.storage.objects.clear()
+        self.storage.put(
+            make_s3_path(settings.ASSETS_PATH, str(self.user.id), "profile-picture", "picture"),
+            b"picture",
+        )
+        self.storage.put(
+            make_s3_path(settings.ASSETS_PATH, str(self.user.id), "pets", str(pets[0].id)),
+            b"picture",
+        )
+        self.kept_picture = make_s3_path(
+            settings.ASSETS_PATH, str(self.other_user.id), "profile-picture", "picture"
+        )
+        self.storage.put(self.kept_picture, b"picture")
+
+    def delete_account(self):
+        self.client.post(
+            reverse("user-login"),
+            {"email": self.user.email, "password": "testpassword"},
+            format="json",
+        )
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.delete(reverse("user-info"))
+        return response, callbacks
+
+    def test_delete_user_disables_the_account(self):
+        response, callbacks = self.delete_account()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(len(callbacks), 1)
+
+        deletion = AccountDeletion.objects.get(user_id=self.user.id)
+        self.assertEqual(str(deletion.id), response.json()["data"]["deletion_id"])
+        self.assertFalse(Users.objects.get(id=self.user.id).is_active)
+
+        response = self.client.post(
+            reverse("user-login"),
+            {"email": self.user.email, "password": "testpassword"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_run_account_deletion(self):
+        with override_settings(ACCOUNT_DELETION_IN_BACKGROUND=False):
+            self.delete_account()
+        deletion = AccountDeletion.objects.get(user_id=self.user.id)
+
+        deletion = run_account_deletion(deletion.id)
+        self.assertEqual(deletion.status, DONE)
+        self.assertEqual(deletion.progress["applications"], 4)
+        self.assertEqual(deletion.progress["jobs"], 3)
+        self.assertEqual(deletion.progress["pets"], 3)
+        self.assertEqual(deletion.progress["locations"], 1)
+        self.assertEqual(deletion.progress["storage"], 2)
+        self.assertEqual(deletion.progress["users"], 1)
+
+        self.assertFalse(Users.objects.filter(id=self.user.id).exists())
+        self.assertEqual(Pets.objects.filter(owner=self.user.id).count(), 0)
+        self.assertEqual(list(Jobs.objects.all()), [self.other_job])
+        self.assertEqual(Applications.objects.count(), 0)
+        self.assertEqual(list(self.storage.objects), [self.kept_picture])
+        # a finished deletion isn't run again
+        self.assertIsNone(run_account_deletion(deletion.id))
+
+    def test_process_account_deletions(self):
+        with override_settings(ACCOUNT_DELETION_IN_BACKGROUND=False):
+            self.delete_account()
+
+        out = io.StringIO()
+        call_command("process_account_deletions", stdout=out)
+        self.assertIn("deleted user {}".format(self.user.id), out.getvalue())
+        self.assertEqual(AccountDeletion.objects.get(user_id=self.user.id).status, DONE)
+        self.assertFalse(Users.objects.filter(id=self.user.id).exists())
+
+
+class ImportUsersCommandTest(TestCase):
+    def setUp(self):
+        Users.objects.create(
+            email="existing@nyu.edu",
+            password=make_password("testpassword"),
+            user_type=["owner"],
+            username="existing@nyu.edu",
+        )
+
+    def __import__(self, content, suffix):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_users", file.name, chunk_size=2, workers=0, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_csv(self):
+        out, err = self.__import__(
+            "email,password,user_type,first_name\n"
+            "Sitter1@NYU.edu,testpassword,owner;sitter,Jane\n"
+            "existing@nyu.edu,testpassword,owner,\n"
+            "sitter2@gmail.com,testpassword,sitter,\n"
+            "owner@gmail.com,short,owner,\n"
+            "owner@gmail.com,testpassword,owner,\n"
+            "sitter1@nyu.edu,testpassword,sitter,\n",
+            ".csv",
+        )
+        self.assertIn("2 users created, 2 duplicates & 2 invalid rows skipped out of 6", out)
+        self.assertIn("line 3: existing@nyu.edu already exists", err)
+        self.assertIn("line 4:", err)
+
+        user = Users.objects.get(email="sitter1@nyu.edu")
+        self.assertEqual(user.user_type, ["owner", "sitter"])
+        self.assertEqual((user.username, user.first_name), ("sitter1@nyu.edu", "Jane"))
+        self.assertTrue(user.check_password("testpassword"))
+        self.assertTrue(Users.objects.get(email="owner@gmail.com").check_password("testpassword"))
+
+    def test_import_jsonl(self):
+        out, err = self.__import__(
+            '{"email": "owner1@gmail.com", "password": "testpassword", "user_type": "owner"}\n'
+            "\n"
+            '{"email": "owner2@gmail.com", "password": "testpassword", "user_type": ["owner"]}\n'
+            '{"email": "owner3@gmail.com", "password": "short", "user_type": ["owner"]}\n'
+            '{"email": "owner4@gmail.com",\n'
+            '{"email": "owner5@gmail.com", "password": "testpassword", "user_type": "owner"}\n',
+            ".jsonl",
+        )
+        self.assertIn("3 users created, 0 duplicates & 2 invalid rows skipped", out)
+        # blank lines are counted
+        self.assertIn("line 4:", err)
+        self.assertIn("line 5: invalid JSON", err)
+        self.assertEqual(Users.objects.filter(email__startswith="owner").count(), 3)
+
+    def test_import_skips_users_created_concurrently(self):
+        # e.g. registered between the duplicates lookup and the insert
+        def register(*args, **kwargs):
+            if not Users.objects.filter(email="owner1@gmail.com").exists():
+                Users.objects.create(
+                    email="owner1@gmail.com", password="", user_type=["owner"], username="owner1"
+                )
+            return make_password(*args, **kwargs)
+
+        hashers.make_password = register
+        self.addCleanup(setattr, hashers, "make_password", make_password)
+        out, err = self.__import__(
+            '{"email": "owner1@gmail.com", "password": "testpassword", "user_type": "owner"}\n'
+            '{"email": "owner2@gmail.com", "password": "testpassword", "user_type": "owner"}\n',
+            ".jsonl",
+        )
+        self.assertIn("1 users created, 1 duplicates", out)
+        self.assertIn("line 1: owner1@gmail.com already exists", err)
+        self.assertTrue(Users.objects.filter(email="owner2@gmail.com").exists())
@@ -0,0 +1,49 @@
+import inspect
+
+from django.conf import settings
+from django.middleware import csrf as django_csrf
+from django.middleware.csrf import _get_new_csrf_string
+from django.test import RequestFactory, SimpleTestCase
+
+from ..csrf import HeaderCsrfCheck
+
+
+class HeaderCsrfCheckTest(SimpleTestCase):
+    def test_django_internals(self):
+        # api/csrf.py relies on these private parts of Django 4.0's CSRF middleware
+        def parameters(function):
+            return list(inspect.signature(function).parameters)
+
+        self.assertEqual(parameters(django_csrf._sanitize_token), ["token"])
+        self.assertEqual(
+            parameters(django_csrf._does_token_match), ["request_csrf_token", "csrf_token"]
+        )
+        self.assertEqual(parameters(django_csrf.CsrfViewMiddleware._get_token), ["self", "request"])
+        self.assertEqual(
+            parameters(django_csrf.CsrfViewMiddleware._bad_token_message),
+            ["self", "reason", "token_source"],
+        )
+        self.assertEqual(
+            parameters(django_csrf.CsrfViewMiddleware._check_token), ["self", "request"]
+        )
+        self.assertEqual(django_csrf.RejectRequest("reason").reason, "reason")
+        self.assertEqual(django_csrf.InvalidTokenFormat("reason").reason, "reason")
+
+    def __request__(self, token=None, **extra):
+        request = RequestFactory().post("/", **extra)
+        if token is not None:
+            request.COOKIES[settings.CSRF_COOKIE_NAME] = token
+        return request
+
+    def test_header_token(self):
+        token = _get_new_csrf_string()
+        request = self.__request__(token, **{settings.CSRF_HEADER_NAME: token})
+        self.assertIsNone(HeaderCsrfCheck().process_view(request, None, (), {}))
+
+        for request in (
+            self.__request__(token),
+            self.__request__(token, **{settings.CSRF_HEADER_NAME: _get_new_csrf_string()}),
+            self.__request__(**{settings.CSRF_HEADER_NAME: token}),
+        ):
+            response = HeaderCsrfCheck().process_view(request, None, (), {})
+            self.assertEqual(response.status_code, 403)
@@ -0,0 +1,66 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connection
+from django.test import TestCase
+
+from ..db.base import DatabaseWrapper, close_pools
+
+
+class DatabaseBackendTest(TestCase):
+    def __connection__(self, alias, conn_max_age, pool=None):
+        """a connection of its own to the test database"""
+        settings_dict = {
+            **connection.settings_dict,
+            "CONN_MAX_AGE": conn_max_age,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {"pool": pool} if pool != None else {},
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias=alias)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def __backend_pid__(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute("SELECT pg_backend_pid()")
+            return cursor.fetchone()[0]
+
+    def setUp(self):
+        self.addCleanup(close_pools)
+
+    def test_health_check_replaces_dropped_connection(self):
+        wrapper = self.__connection__("persistent", 600)
+        pid = self.__backend_pid__(wrapper)
+        # the end of a request keeps the connection
+        wrapper.close_if_unusable_or_obsolete()
+        self.assertEqual(self.__backend_pid__(wrapper), pid)
+
+        wrapper.close_if_unusable_or_obsolete()
+        # e.g. dropped by the server between requests
+        wrapper.connection.close()
+        self.assertNotEqual(self.__backend_pid__(wrapper), pid)
+
+    def test_pool_reuses_connections(self):
+        wrapper = self.__connection__("pooled", 0, {"min_size": 1, "max_size": 2})
+        pid = self.__backend_pid__(wrapper)
+        # the end of a request returns the connection to the pool
+        wrapper.close_if_unusable_or_obsolete()
+        self.assertEqual(wrapper.connection, None)
+        self.assertEqual(self.__backend_pid__(wrapper), pid)
+
+    def test_pool_timeout(self):
+        pool = {"min_size": 1, "max_size": 1, "timeout": 0.1}
+        first = self.__connection__("pooled", 0, pool)
+        second = self.__connection__("pooled", 0, pool)
+        pid = self.__backend_pid__(first)
+        with self.assertRaises(OperationalError):
+            second.ensure_connection()
+        first.close()
+        self.assertEqual(self.__backend_pid__(second), pid)
+
+    def test_pool_needs_conn_max_age_0(self):
+        wrapper = self.__connection__("pooled", 600, {"max_size": 2})
+        with self.assertRaises(ImproperlyConfigured):
+            wrapper.ensure_connection()
+        # a max_size of 0 disables the pool
+        wrapper = self.__connection__("persistent", 600, {"max_size": 0})
+        self.assertEqual(wrapper.pool_options, None)
+        wrapper.ensure_connection()
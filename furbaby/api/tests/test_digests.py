@@ -0,0 +1,128 @@
+import importlib
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..digests import queue_notification_digests
+from ..models import EmailOutbox, Notifications, Users
+from ..outbox import send_outbox_batch
+
+
+class NotificationDigestTest(TestCase):
+    def setUp(self):
+        self.users = [
+            Users.objects.create(
+                email="test_digest{}@gmail.com".format(n),
+                password=make_password("testpassword"),
+                user_type=["sitter"],
+                username="test_digest{}@gmail.com".format(n),
+                first_name="Sitter{}".format(n),
+            )
+            for n in range(2)
+        ]
+
+    def __notify__(self, user, title, age=timedelta(hours=2)):
+        notification = Notifications.objects.create(
+            recipient=user,
+            data=json.dumps(
+                {"sitter_id": str(user.id), "content": {"title": title, "message": "call me"}}
+            ),
+        )
+        # created_at is auto_now_add
+        Notifications.objects.filter(id=notification.id).update(created_at=timezone.now() - age)
+        return notification
+
+    def test_digest_per_recipient(self):
+        for n in range(3):
+            self.__notify__(self.users[0], "accepted {}".format(n))
+        self.__notify__(self.users[1], "accepted")
+        # too recent, the recipient may still see it in the app
+        self.__notify__(self.users[1], "recent", age=timedelta(seconds=0))
+
+        with self.assertNumQueries(5):
+            # grouped query, bulk insert & update in a savepoint
+            self.assertEqual(queue_notification_digests(min_age=60, max_items=2), 2)
+
+        emails = {email.recipient: email for email in EmailOutbox.objects.all()}
+        context = emails[self.users[0].email].context
+        self.assertEqual(context["count"], 3)
+        self.assertEqual(context["more"], 1)
+        self.assertEqual(
+            [n["title"] for n in context["notifications"]], ["accepted 2", "accepted 1"]
+        )
+        self.assertEqual(emails[self.users[1].email].context["count"], 1)
+        self.assertEqual(Notifications.objects.filter(emailed_at=None).count(), 1)
+
+        # notifications are emailed once
+        self.assertEqual(queue_notification_digests(min_age=60), 0)
+
+    def test_read_notifications_are_left_out(self):
+        self.__notify__(self.users[0], "accepted")
+        self.__notify__(self.users[1], "accepted")
+
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        response = client.get(reverse("notifications-view"))
+        self.assertEqual(response.status_code, 200)
+        # only the notifications of the caller are returned (& marked read)
+        self.assertEqual(len(response.json()["data"]["notifications"]), 1)
+        self.assertEqual(Notifications.objects.filter(read_at=None).count(), 1)
+        # nothing is written when everything was read already
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse("notifications-view"))
+        self.assertFalse([query for query in queries if query["sql"].startswith("UPDATE")])
+
+        self.assertEqual(queue_notification_digests(min_age=0), 1)
+        self.assertEqual(EmailOutbox.objects.get().recipient, self.users[1].email)
+
+    def test_send_notification_digests_command(self):
+        for user in self.users:
+            self.__notify__(user, "accepted")
+        out = StringIO()
+        call_command("send_notification_digests", stdout=out)
+
+        self.assertIn("2 digests queued", out.getvalue())
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn("accepted", mail.outbox[0].body)
+        self.assertIn("1 unread notification on FurBaby", mail.outbox[0].body)
+
+    @override_settings(EMAIL_OUTBOX_MAX_RATE=20)
+    def test_sends_are_throttled(self):
+        for user in self.users:
+            self.__notify__(user, "accepted")
+        queue_notification_digests()
+
+        started = timezone.now()
+        self.assertEqual(send_outbox_batch()["sent"], 2)
+        # the 2nd email waits for 1/20s
+        self.assertGreaterEqual(timezone.now() - started, timedelta(seconds=0.05))
+
+    def test_recipients_of_earlier_notifications_are_backfilled(self):
+        migration = importlib.import_module("api.migrations.0032_backfill_notification_recipients")
+        earlier = [
+            Notifications.objects.create(
+                data=json.dumps({"sitter_id": str(self.users[0].id), "content": {}})
+            ),
+            Notifications.objects.create(data={"sitter_id": str(self.users[1].id)}),
+            Notifications.objects.create(data=json.dumps({"sitter_id": "not an id"})),
+            Notifications.objects.create(data="{not json"),
+        ]
+        migration.backfill_recipients(apps, None)
+        self.assertEqual(
+            [
+                Notifications.objects.get(pk=notification.pk).recipient_id
+                for notification in earlier
+            ],
+            [self.users[0].id, self.users[1].id, None, None],
+        )
@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from ..geocoding import ZipcodeIndex, geocode, normalize_address, normalize_zipcode, zipcodes
+from ..models import Locations, Users
+
+
+class GeocodingTest(SimpleTestCase):
+    def test_normalize_address(self):
+        for address, normalized in [
+            ("123 west 45 street, apt. 4b", "123 W 45th St Apt 4B"),
+            ("350 Fifth Avenue", "350 5th Ave"),
+            ("37-12 junction blvd", "37-12 Junction Blvd"),
+            ("12 St. Marks Place #3", "12 St Marks Pl # 3"),
+            ("1 avenue of the americas", "1 Avenue of the Americas"),
+            ("  ", ""),
+        ]:
+            self.assertEqual(normalize_address(address), normalized)
+
+    def test_zipcodes(self):
+        self.assertEqual(normalize_zipcode(" 10001-1234"), "10001")
+        self.assertEqual(normalize_zipcode("1000"), None)
+        self.assertEqual(zipcodes.lookup("11211")[0], "Brooklyn")
+        self.assertEqual(zipcodes.lookup("12345"), None)
+        self.assertEqual(zipcodes.lookup("99999"), None)
+
+        index = ZipcodeIndex(
+            [("10301", "Staten Island", 40.6, -74.1), ("10001", "Manhattan", 1, 2)]
+        )
+        self.assertEqual(index.zipcodes, ["10001", "10301"])
+        self.assertEqual(index.lookup("10001"), ("Manhattan", 1.0, 2.0))
+
+    def test_geocode(self):
+        location = geocode("1 main st", "10451")
+        self.assertEqual(location["borough"], "Bronx")
+        self.assertAlmostEqual(location["latitude"], 40.82, places=1)
+        self.assertEqual(geocode("1 main st", None)["latitude"], None)
+
+
+class LocationGeocodingTest(TestCase):
+    def setUp(self):
+        self.user = Users.objects.create(
+            email="test_geocoding@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner"],
+            username="test_geocoding@gmail.com",
+        )
+
+    def test_geocoded_on_save(self):
+        location = Locations.objects.create(
+            user=self.user, address="1 e 2nd street", city="NYC", country="US", zipcode="10003"
+        )
+        location.refresh_from_db()
+        self.assertEqual(location.normalized_address, "1 E 2nd St")
+        self.assertEqual(location.borough, "Manhattan")
+
+        location.zipcode = "11201"
+        location.save(update_fields=["zipcode"])
+        location.refresh_from_db()
+        self.assertEqual(location.borough, "Brooklyn")
+
+    def test_geocode_locations_command(self):
+        Locations.objects.bulk_create(
+            [
+                Locations(
+                    user=self.user,
+                    address="{} broadway".format(n),
+                    city="NYC",
+                    country="US",
+                    zipcode=zipcode,
+                )
+                for n, zipcode in enumerate(["10001", "10002", "12345"])
+            ]
+        )
+        out = StringIO()
+        call_command("geocode_locations", batch_size=2, stdout=out)
+        self.assertIn("3 locations processed, 2 geocoded", out.getvalue())
+        self.assertEqual(Locations.objects.filter(normalized_address=None).count(), 0)
+        self.assertEqual(Locations.objects.filter(borough="Manhattan").count(), 2)
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import threading
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import hashers
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .. import async_views
+from ..hashing import HashingOverloaded, HashingPool, check_password_async
+from ..models import Users
+
+
+class HashingPoolTests(SimpleTestCase):
+    def test_inline(self):
+        pool = HashingPool(0, 1)
+        encoded = pool.submit(hashers.make_password, "testpassword").result()
+        self.assertTrue(pool.submit(hashers.check_password, "testpassword", encoded).result())
+        self.assertEqual(pool.stats()["pending"], 0)
+
+    def test_overloaded(self):
+        pool = HashingPool(0, 1)
+        # the second hash is submitted while the first one is still pending
+        nested = lambda: pool.submit(hashers.make_password, "testpassword").result()
+        with self.assertRaises(HashingOverloaded):
+            pool.submit(nested).result()
+        self.assertEqual(pool.stats()["pending"], 0)
+
+    def test_process_pool(self):
+        pool = HashingPool(1, 4)
+        try:
+            encoded = make_password("testpassword")
+            self.assertTrue(pool.submit(hashers.check_password, "testpassword", encoded).result())
+            self.assertFalse(pool.submit(hashers.check_password, "wrong", encoded).result())
+        finally:
+            pool.shutdown()
+        self.assertEqual(pool.stats()["pending"], 0)
+
+    def test_async_inline_hashing_leaves_the_event_loop(self):
+        threads = []
+
+        def check_password(password, encoded):
+            threads.append(threading.get_ident())
+            return True
+
+        async def check():
+            threads.append(threading.get_ident())
+            return await check_password_async("testpassword", "encoded")
+
+        hashers.check_password, original = check_password, hashers.check_password
+        self.addCleanup(setattr, hashers, "check_password", original)
+        with override_settings(PASSWORD_HASHING_WORKERS=0):
+            self.assertTrue(asyncio.run(check()))
+        self.assertNotEqual(threads[0], threads[1])
+
+    def test_shutdown_cancels_queued_hashes(self):
+        pool = HashingPool(1, 4)
+        encoded = make_password("testpassword")
+        futures = [pool.submit(hashers.check_password, "testpassword", encoded) for _ in range(4)]
+        pool.shutdown()
+        for future in futures:
+            self.assertTrue(future.cancelled() or future.result())
+
+
+class LoginLoadSheddingTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = Users.objects.create(
+            email="test_hashing@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner"],
+            username="test_hashing@gmail.com",
+        )
+        self.factory = RequestFactory()
+
+    @override_settings(PASSWORD_HASHING_MAX_PENDING=0)
+    def test_login_and_registration_are_shed(self):
+        response = self.client.post(
+            reverse("user-login"),
+            {"email": self.user.email, "password": "testpassword"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response["Retry-After"], "1")
+
+        response = self.client.post(
+            reverse("user-registration"),
+            {"email": "test_new@gmail.com", "password": "testpassword", "user_type": ["owner"]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertFalse(Users.objects.filter(email="test_new@gmail.com").exists())
+
+    def async_login(self, password):
+        request = self.factory.post(
+            reverse("user-login"),
+            json.dumps({"email": self.user.email, "password": password}),
+            content_type="application/json",
+        )
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        return request, async_to_sync(async_views.login_view)(request)
+
+    def test_async_login(self):
+        request, response = self.async_login("testpassword")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(request.session["_auth_user_id"], str(self.user.id))
+
+        _, response = self.async_login("wrong_password")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        with override_settings(PASSWORD_HASHING_MAX_PENDING=0):
+            _, response = self.async_login("testpassword")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
@@ -0,0 +1,124 @@
+import json
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..measurements import ImplausibleMeasurement, parse_height, parse_weight
+from ..models import Jobs, Locations, Pets, Users
+
+
+class MeasurementsTest(SimpleTestCase):
+    def test_parse_weight(self):
+        self.assertEqual(parse_weight("12 lbs"), 5443)
+        self.assertEqual(parse_weight("12"), 5443)
+        self.assertEqual(parse_weight("5.5kg"), 5500)
+        self.assertEqual(parse_weight("1 lb 4 oz"), 567)
+        self.assertEqual(parse_weight("10-15 lb"), 5670)
+        # the comma is a decimal separator
+        self.assertEqual(parse_weight("12,5 kg"), 12500)
+        for text in ("medium", "", None, "3 years", "0 lb"):
+            self.assertEqual(parse_weight(text), None, text)
+        for text in ("-5 lb", "99999999 kg"):
+            with self.assertRaises(ImplausibleMeasurement):
+                parse_weight(text)
+
+    def test_parse_height(self):
+        self.assertEqual(parse_height("20 in"), 50.8)
+        self.assertEqual(parse_height("2'3\""), 68.6)
+        self.assertEqual(parse_height("50cm"), 50)
+        self.assertEqual(parse_height("0.5 m"), 50)
+        self.assertEqual(parse_height("tall"), None)
+
+
+class PetMeasurementsTest(TestCase):
+    def setUp(self):
+        self.owner = Users.objects.create(
+            email="test_owner_measurements@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner"],
+            username="test_owner_measurements@gmail.com",
+        )
+        self.sitter = Users.objects.create(
+            email="test_sitter_measurements@nyu.edu",
+            password=make_password("testpassword"),
+            user_type=["sitter"],
+            username="test_sitter_measurements@nyu.edu",
+        )
+        self.location = Locations.objects.create(
+            user=self.owner, address="1 Main St", city="NYC", country="US", zipcode="10001"
+        )
+        self.client = APIClient()
+
+    def __pet__(self, name, weight, height=None):
+        self.client.force_authenticate(self.owner)
+        response = self.client.post(
+            reverse("pet-list-create"),
+            {"name": name, "species": "dog", "breed": "lab", "weight": weight, "height": height},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return Pets.objects.get(id=json.loads(response.content)["id"])
+
+    def test_measurements_are_parsed_on_save(self):
+        pet = self.__pet__("Fluffy", "12 lbs", "20 in")
+        self.assertEqual((pet.weight_grams, pet.height_cm), (5443, 50.8))
+
+        response = self.client.patch(
+            reverse("pet-retrieve-update-delete", args=[pet.id]),
+            {"weight": "medium", "weight_grams": 1},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        pet.refresh_from_db()
+        self.assertEqual((pet.weight_grams, pet.height_cm), (None, 50.8))
+
+    def test_implausible_measurements_are_rejected(self):
+        self.client.force_authenticate(self.owner)
+        for weight, height in (("99999999 kg", None), ("-5 lb", None), ("10 lb", "40 ft")):
+            response = self.client.post(
+                reverse("pet-list-create"),
+                {"name": "Rex", "species": "dog", "weight": weight, "height": height},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 400, weight)
+        self.assertFalse(Pets.objects.exists())
+
+    def test_job_feed_weight_filter(self):
+        for name, weight, height in (("Fluffy", "8 lb", "10 in"), ("Rex", "30kg", "2 ft")):
+            Jobs.objects.create(
+                pet=self.__pet__(name, weight, height),
+                location=self.location,
+                user=self.owner,
+                pay="50",
+                start=datetime.now(timezone.utc) + timedelta(days=1),
+                end=datetime.now(timezone.utc) + timedelta(days=2),
+                status="open",
+            )
+        self.client.force_authenticate(self.sitter)
+
+        def feed(**params):
+            response = self.client.get(reverse("custom-job-view"), params)
+            self.assertEqual(response.status_code, 200)
+            pets = Pets.objects.in_bulk([job["pet"] for job in response.json()["sitter_jobs"]])
+            return sorted(pet.name for pet in pets.values())
+
+        self.assertEqual(feed(weight_max="20lb"), ["Fluffy"])
+        self.assertEqual(feed(weight_min="20 lb", weight_max="40kg"), ["Rex"])
+        self.assertEqual(feed(height_min="30cm"), ["Rex"])
+        self.assertEqual(feed(height_max="1 ft"), ["Fluffy"])
+        response = self.client.get(reverse("custom-job-view"), {"weight_min": "heavy"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_parse_pet_measurements_command(self):
+        pet = self.__pet__("Fluffy", "5.5kg")
+        Pets.objects.filter(id=pet.id).update(weight_grams=None)
+        out = StringIO()
+        call_command("parse_pet_measurements", stdout=out)
+        self.assertIn("1 pets processed, 1 with a weight or height", out.getvalue())
+        pet.refresh_from_db()
+        self.assertEqual(pet.weight_grams, 5500)
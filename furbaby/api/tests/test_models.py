@@ -1,3 +1,4 @@
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -97,3 +98,34 @@ class ModelTests(TestCase):
         )
         self.assertEqual(Applications.objects.count(), 1)
         self.assertEqual(application.status, "accepted")
+
+    def test_emails_must_be_lowercase(self):
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Users.objects.create(
+                    email="Other@example.com",
+                    username="other@example.com",
+                    password="test1234",
+                    user_type=["owner"],
+                )
+
+    def test_manager_lowercases_emails(self):
+        user = Users.objects.create_user(
+            "Other@Example.com",
+            email=" Other@Example.com",
+            password="test1234",
+            user_type=["owner"],
+        )
+        self.assertEqual(user.email, "other@example.com")
+
+        # e.g. the admin forms
+        user = Users(email="Third@Example.com", username="third@example.com", user_type=["owner"])
+        user.clean()
+        self.assertEqual(user.email, "third@example.com")
+
+    def test_one_default_location_per_user(self):
+        location = {"city": "New York City", "country": "USA", "default_location": True}
+        Locations.objects.create(user=self.user, address="123 Main St", **location)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Locations.objects.create(user=self.user, address="456 Main St", **location)
@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend as LocMemEmailBackend
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ..models import EmailOutbox, Users
+from ..outbox import FAILED, PENDING, SENDING, SENT, queue_email, send_outbox_batch
+
+
+class FailingEmailBackend(LocMemEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionError("smtp server went away")
+
+
+class StatusRecordingEmailBackend(LocMemEmailBackend):
+    """records the outbox statuses (in the database) when each email is sent"""
+
+    statuses = []
+
+    def send_messages(self, messages):
+        self.statuses.append(sorted(EmailOutbox.objects.values_list("status", flat=True)))
+        return super().send_messages(messages)
+
+
+class EmailOutboxTest(TestCase):
+    def setUp(self):
+        self.user = Users.objects.create(
+            email="test_outbox@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner"],
+            username="test_outbox@gmail.com",
+        )
+        self.context = {
+            "username": self.user.username,
+            "email": self.user.email,
+            "reset_password_url": "http://localhost:3000/forgot-password?token=abc",
+        }
+
+    def test_password_reset_queues_the_email(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            APIClient().post(
+                reverse("password_reset:reset-password-request"),
+                {"email": self.user.email},
+                format="json",
+            )
+        email = EmailOutbox.objects.get()
+        self.assertEqual((email.template, email.recipient), ("password_reset", self.user.email))
+        self.assertEqual(len(callbacks), 1)
+        # nothing is sent by the request itself
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(DEBUG=False)
+    def test_web_workers_only_drain_the_outbox_under_debug(self):
+        del settings.EMAIL_OUTBOX_SEND_ON_COMMIT
+        with self.captureOnCommitCallbacks() as callbacks:
+            queue_email("password_reset", self.user.email, self.context)
+        self.assertEqual(len(callbacks), 0)
+        self.assertEqual(EmailOutbox.objects.get().status, PENDING)
+
+    def test_send_outbox_batch(self):
+        for _ in range(3):
+            queue_email("password_reset", self.user.email, self.context)
+
+        counts = send_outbox_batch(batch_size=2)
+        self.assertEqual(counts, {"claimed": 2, "sent": 2, "retried": 0, "failed": 0})
+        self.assertEqual(send_outbox_batch(batch_size=2)["sent"], 1)
+        self.assertEqual(send_outbox_batch(batch_size=2)["claimed"], 0)
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertIn(self.context["reset_password_url"], mail.outbox[0].body)
+        self.assertEqual(mail.outbox[0].to, [self.user.email])
+        self.assertEqual(EmailOutbox.objects.filter(status=SENT).count(), 3)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_sends_are_retried_with_backoff(self):
+        email = queue_email("password_reset", self.user.email, self.context)
+
+        counts = send_outbox_batch(smtp_connection=FailingEmailBackend())
+        self.assertEqual(counts["retried"], 1)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (PENDING, 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn("smtp server went away", email.last_error)
+        # not due yet
+        self.assertEqual(send_outbox_batch()["claimed"], 0)
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_outbox_batch(smtp_connection=FailingEmailBackend())["failed"], 1)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (FAILED, 2))
+
+    def test_emails_are_claimed_and_saved_one_by_one(self):
+        for _ in range(2):
+            queue_email("password_reset", self.user.email, self.context)
+        StatusRecordingEmailBackend.statuses = []
+        send_outbox_batch(smtp_connection=StatusRecordingEmailBackend())
+        self.assertEqual(
+            StatusRecordingEmailBackend.statuses, [[SENDING, SENDING], [SENDING, SENT]]
+        )
+
+    @override_settings(EMAIL_OUTBOX_CLAIM_TIMEOUT=60)
+    def test_claims_of_a_sender_that_went_away_expire(self):
+        email = queue_email("password_reset", self.user.email, self.context)
+        EmailOutbox.objects.update(
+            status=SENDING, next_attempt_at=timezone.now() + timedelta(seconds=60)
+        )
+        self.assertEqual(send_outbox_batch()["claimed"], 0)
+
+        EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_outbox_batch()["sent"], 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, SENT)
@@ -0,0 +1,59 @@
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import Users
+from ..sessions import BoundedTimeoutCache, SessionStore
+
+
+class BoundedTimeoutCacheTests(SimpleTestCase):
+    class RecordingCache(dict):
+        def set(self, key, value, timeout):
+            self[key] = (value, timeout)
+
+    def test_timeouts_are_capped(self):
+        cache = self.RecordingCache()
+        bounded = BoundedTimeoutCache(cache, 60)
+        bounded.set("short", 1, 30)
+        bounded.set("long", 2, 3600)
+        bounded.set("forever", 3, None)
+        self.assertEqual(cache, {"short": (1, 30), "long": (2, 60), "forever": (3, 60)})
+
+
+@override_settings(SESSION_ENGINE="api.sessions", SESSION_CACHE_MAX_AGE=60)
+class SessionStoreTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Users.objects.create(
+            email="test_session@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner"],
+            username="test_session@gmail.com",
+        )
+        self.client.post(
+            reverse("user-login"),
+            {"email": "test_session@gmail.com", "password": "testpassword"},
+            format="json",
+        )
+
+    def test_sessions_are_read_from_the_cache(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user-whoami"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries if "django_session" in query["sql"]])
+
+    def test_cache_misses_fall_back_to_the_database(self):
+        caches["default"].delete(SessionStore.cache_key_prefix + self.client.session.session_key)
+        response = self.client.get(reverse("user-whoami"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_logout_ends_the_cached_session(self):
+        session_key = self.client.session.session_key
+        self.client.post(reverse("user-logout"))
+        self.assertNotIn(SessionStore.cache_key_prefix + session_key, caches["default"])
+        self.assertFalse(SessionStore().exists(session_key))
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+from ..pictures import read_picture, read_picture_async
+from ..singleflight import SingleFlight
+from ..storage import AsyncStorage, InMemoryStorage
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+        self.release = threading.Event()
+
+    def fetch(self):
+        self.calls += 1
+        self.release.wait(5)
+        return b"picture"
+
+    def test_concurrent_calls_share_one_execution(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(self.flight.do, "key", self.fetch) for _ in range(8)]
+            while self.flight.stats()["calls"] < 8:
+                pass
+            self.release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(results, [b"picture"] * 8)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(
+            self.flight.stats(), {"calls": 8, "executed": 1, "saved": 7, "in_flight": 0}
+        )
+
+    def test_sequential_calls_are_not_cached(self):
+        self.release.set()
+        self.flight.do("key", self.fetch)
+        self.flight.do("key", self.fetch)
+        self.assertEqual(self.calls, 2)
+
+    def test_errors_are_shared_and_forgotten(self):
+        def fail():
+            raise KeyError("key")
+
+        with self.assertRaises(KeyError):
+            self.flight.do("key", fail)
+        self.release.set()
+        self.assertEqual(self.flight.do("key", self.fetch), b"picture")
+
+    def test_async_calls_share_one_execution(self):
+        async def fetch():
+            self.calls += 1
+            await asyncio.sleep(0.05)
+            return b"picture"
+
+        async def hammer():
+            return await asyncio.gather(*(self.flight.do_async("key", fetch) for _ in range(8)))
+
+        self.assertEqual(asyncio.run(hammer()), [b"picture"] * 8)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.flight.stats()["saved"], 7)
+
+
+class ReadPictureTests(SimpleTestCase):
+    def test_read_picture(self):
+        storage = InMemoryStorage()
+        storage.put("assets/picture", b"0123456789")
+
+        picture, content = read_picture(storage, "assets/picture", max_bytes=10)
+        self.assertEqual(content, b"0123456789")
+        self.assertEqual(picture.content_length, 10)
+
+        # larger pictures are left for each request to stream, from the object already opened
+        opened = []
+        stream = storage.stream
+        storage.stream = lambda *args, **kwargs: opened.append(args) or stream(*args, **kwargs)
+        picture, content = read_picture(storage, "assets/picture", max_bytes=9)
+        self.assertIsNone(content)
+        self.assertEqual(picture.body.read(), b"0123456789")
+        self.assertEqual(len(opened), 1)
+
+    def test_read_picture_async(self):
+        storage = AsyncStorage(InMemoryStorage())
+        self.addCleanup(storage.close)
+        storage.storage.put("assets/picture", b"0123456789")
+
+        picture, content = asyncio.run(read_picture_async(storage, "assets/picture", max_bytes=10))
+        self.assertEqual(content, b"0123456789")
+
+        # larger pictures aren't read into memory
+        picture, content = asyncio.run(read_picture_async(storage, "assets/picture", max_bytes=9))
+        self.assertIsNone(content)
+        self.assertEqual(picture.body.read(), b"0123456789")
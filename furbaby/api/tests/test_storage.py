@@ -0,0 +1,112 @@
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from django.test import SimpleTestCase
+from ..storage import (
+    InMemoryStorage,
+    InvalidRange,
+    LocalFileSystemStorage,
+    ObjectNotFound,
+    StorageError,
+    resolve_byte_range,
+)
+
+
+class ByteRangeTests(SimpleTestCase):
+    def test_resolve_byte_range(self):
+        self.assertEqual(resolve_byte_range("bytes=0-9", 100), (0, 9))
+        self.assertEqual(resolve_byte_range("bytes=90-", 100), (90, 99))
+        self.assertEqual(resolve_byte_range("bytes=-10", 100), (90, 99))
+        self.assertEqual(resolve_byte_range("bytes=50-500", 100), (50, 99))
+
+    def test_resolve_byte_range_unsatisfiable(self):
+        with self.assertRaises(InvalidRange):
+            resolve_byte_range("bytes=100-", 100)
+        with self.assertRaises(InvalidRange):
+            resolve_byte_range("bytes=-0", 100)
+
+
+class StorageBackendTestsMixin:
+    def get_storage(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.storage = self.get_storage()
+
+    def test_put_get_head(self):
+        self.storage.put("assets/user/pets/pet", b"picture-bytes", "image/jpeg")
+        self.assertEqual(self.storage.get("assets/user/pets/pet"), b"picture-bytes")
+        self.assertEqual(self.storage.head("assets/user/pets/pet").size, 13)
+        self.assertTrue(self.storage.exists("assets/user/pets/pet"))
+
+    def test_missing_object(self):
+        with self.assertRaises(ObjectNotFound):
+            self.storage.get("assets/missing")
+        with self.assertRaises(ObjectNotFound):
+            self.storage.stream("assets/missing")
+        self.assertFalse(self.storage.exists("assets/missing"))
+
+    def test_stream_full_and_range(self):
+        self.storage.put("assets/picture", b"0123456789")
+        picture = self.storage.stream("assets/picture")
+        self.assertEqual(picture.body.read(), b"0123456789")
+        self.assertEqual(picture.content_length, 10)
+        self.assertIsNone(picture.content_range)
+        picture.body.close()
+
+        picture = self.storage.stream("assets/picture", byte_range="bytes=2-5")
+        self.assertEqual(picture.body.read(), b"2345")
+        self.assertEqual(picture.content_length, 4)
+        self.assertEqual(picture.content_range, "bytes 2-5/10")
+        picture.body.close()
+
+    def test_delete_and_delete_many(self):
+        for index in range(3):
+            self.storage.put("assets/{}".format(index), b"x")
+        self.storage.delete("assets/0")
+        self.storage.delete("assets/0")
+        self.assertEqual(self.storage.delete_many(["assets/1", "assets/2"]), 2)
+        for index in range(3):
+            self.assertFalse(self.storage.exists("assets/{}".format(index)))
+
+    def test_upload_in_chunks_and_copy(self):
+        upload = self.storage.open_upload("assets/uploads/1", "image/jpeg")
+        upload.write(b"01234")
+        self.assertFalse(self.storage.exists("assets/uploads/1"))
+        upload.write(b"56789")
+        upload.complete()
+        self.assertEqual(self.storage.get("assets/uploads/1"), b"0123456789")
+
+        self.storage.copy("assets/uploads/1", "assets/pictures/1")
+        self.assertEqual(self.storage.get("assets/pictures/1"), b"0123456789")
+
+    def test_touch(self):
+        self.storage.put("assets/pictures/2", b"picture-bytes", "image/jpeg")
+        touched_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        self.storage.touch("assets/pictures/2")
+        self.assertGreaterEqual(self.storage.head("assets/pictures/2").last_modified, touched_at)
+        self.assertEqual(self.storage.get("assets/pictures/2"), b"picture-bytes")
+        with self.assertRaises(ObjectNotFound):
+            self.storage.touch("assets/missing")
+
+    def test_aborted_upload(self):
+        upload = self.storage.open_upload("assets/uploads/2")
+        upload.write(b"01234")
+        upload.abort()
+        self.assertFalse(self.storage.exists("assets/uploads/2"))
+
+
+class InMemoryStorageTests(StorageBackendTestsMixin, SimpleTestCase):
+    def get_storage(self):
+        return InMemoryStorage()
+
+
+class LocalFileSystemStorageTests(StorageBackendTestsMixin, SimpleTestCase):
+    def get_storage(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        return LocalFileSystemStorage(self.directory.name)
+
+    def test_keys_cannot_escape_location(self):
+        with self.assertRaises(StorageError):
+            self.storage.put("../outside", b"x")
@@ -0,0 +1,134 @@
+import json
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from ..models import Breeds, Jobs, Locations, Pets, Species, Users
+from ..taxonomy import TaxonomyIndex, get_taxonomy, reset_taxonomy
+
+
+class TaxonomyIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.taxonomy = TaxonomyIndex(
+            [(1, "Dog", ["puppy"]), (2, "Cat", ["kitten"])],
+            [
+                (10, 1, "Golden Retriever", ["golden"]),
+                (11, 1, "Labrador Retriever", ["lab"]),
+                (12, 1, "Jack Russell Terrier", []),
+                (20, 2, "Domestic Shorthair", ["mixed"]),
+                (13, 1, "Mixed Breed", ["mixed"]),
+            ],
+        )
+
+    def test_autocomplete(self):
+        matches = self.taxonomy.autocomplete("retr")
+        self.assertEqual(
+            [breed["name"] for breed in matches["breeds"]],
+            ["Golden Retriever", "Labrador Retriever"],
+        )
+        self.assertEqual(matches["breeds"][0]["species"], "Dog")
+        self.assertEqual(self.taxonomy.autocomplete("LA")["breeds"][0]["id"], 11)
+        self.assertEqual(self.taxonomy.autocomplete("pup")["species"], [{"id": 1, "name": "Dog"}])
+        self.assertEqual(self.taxonomy.autocomplete("jack-russ")["breeds"][0]["id"], 12)
+        self.assertEqual(self.taxonomy.autocomplete("mix", species_id=2)["breeds"][0]["id"], 20)
+        self.assertEqual(self.taxonomy.autocomplete(" "), {"species": [], "breeds": []})
+
+    def test_resolve(self):
+        self.assertEqual(self.taxonomy.resolve_species(" KITTEN "), 2)
+        self.assertEqual(self.taxonomy.resolve_breed("golden  retriever"), 10)
+        self.assertEqual(self.taxonomy.resolve_breed("Mixed", species_id=2), 20)
+        self.assertEqual(self.taxonomy.resolve_breed("retriever"), None)
+
+
+class PetTaxonomyTest(TestCase):
+    def setUp(self):
+        # the rollback of the test doesn't reach the taxonomy kept in memory
+        self.addCleanup(reset_taxonomy)
+        self.dog = Species.objects.create(name="Dog", aliases=["puppy"])
+        self.golden = Breeds.objects.create(species=self.dog, name="Golden Retriever")
+        self.lab = Breeds.objects.create(
+            species=self.dog, name="Labrador Retriever", aliases=["lab"]
+        )
+        self.owner = Users.objects.create(
+            email="test_owner_taxonomy@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner"],
+            username="test_owner_taxonomy@gmail.com",
+        )
+        self.sitter = Users.objects.create(
+            email="test_sitter_taxonomy@nyu.edu",
+            password=make_password("testpassword"),
+            user_type=["sitter"],
+            username="test_sitter_taxonomy@nyu.edu",
+        )
+        self.location = Locations.objects.create(
+            user=self.owner, address="1 Main St", city="NYC", country="US", zipcode="10001"
+        )
+
+    def __pet__(self, name, species, breed):
+        return Pets.objects.create(
+            owner=self.owner, name=name, species=species, breed=breed, weight="50"
+        )
+
+    def test_pets_are_linked_on_save(self):
+        pet = self.__pet__("Fluffy", "puppy", "LAB")
+        self.assertEqual((pet.species_taxon_id, pet.breed_taxon_id), (self.dog.id, self.lab.id))
+
+        pet.breed = "golden retriever"
+        pet.save(update_fields=["breed", "breed_taxon"])
+        pet.refresh_from_db()
+        self.assertEqual(pet.breed_taxon_id, self.golden.id)
+
+        unknown = self.__pet__("Rex", "", "something else")
+        self.assertEqual((unknown.species_taxon_id, unknown.breed_taxon_id), (None, None))
+
+    def test_taxonomy_view(self):
+        client = APIClient()
+        response = client.get(reverse("pet-taxonomy"), {"q": "retr"})
+        self.assertEqual(response.status_code, 400)
+
+        client.force_authenticate(self.owner)
+        response = client.get(reverse("pet-taxonomy"), {"q": "retr"})
+        self.assertEqual(response.status_code, 200)
+        breeds = json.loads(response.content)["data"]["breeds"]
+        self.assertEqual([breed["id"] for breed in breeds], [self.golden.id, self.lab.id])
+
+    def test_job_feed_breed_filter(self):
+        for name, breed in (("Fluffy", "golden retriever"), ("Rex", "lab")):
+            Jobs.objects.create(
+                pet=self.__pet__(name, "dog", breed),
+                location=self.location,
+                user=self.owner,
+                pay="50",
+                start=datetime.now(timezone.utc) + timedelta(days=1),
+                end=datetime.now(timezone.utc) + timedelta(days=2),
+                status="open",
+            )
+        client = APIClient()
+        client.force_authenticate(self.sitter)
+        response = client.get(reverse("custom-job-view"), {"breed_id": self.lab.id})
+        jobs = json.loads(response.content)["sitter_jobs"]
+        self.assertEqual([job["pet"] for job in jobs], [str(Pets.objects.get(name="Rex").id)])
+
+        response = client.get(reverse("custom-job-view"), {"species_id": self.dog.id})
+        self.assertEqual(len(json.loads(response.content)["sitter_jobs"]), 2)
+        response = client.get(reverse("custom-job-view"), {"breed_id": "lab"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_link_pet_taxonomy_command(self):
+        pet = self.__pet__("Fluffy", "dog", "golden")
+        Pets.objects.filter(id=pet.id).update(species_taxon=None, breed_taxon=None)
+        Breeds.objects.filter(id=self.golden.id).update(aliases=["golden"])
+        # updates skip the receivers, the taxonomy is reloaded after TAXONOMY_CACHE_TIMEOUT
+        with self.settings(TAXONOMY_CACHE_TIMEOUT=0):
+            get_taxonomy()
+            out = StringIO()
+            call_command("link_pet_taxonomy", stdout=out)
+        self.assertIn("1 pets processed, 1 linked", out.getvalue())
+        pet.refresh_from_db()
+        self.assertEqual(pet.breed_taxon_id, self.golden.id)
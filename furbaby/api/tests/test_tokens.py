@@ -0,0 +1,173 @@
+import io
+import json
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..account_deletion import schedule_account_deletion
+from ..models import RevokedRefreshToken, Users
+
+
+class TokenAuthenticationTest(TestCase):
+    def setUp(self):
+        # CSRF is enforced like it is for browsers
+        self.client = APIClient(enforce_csrf_checks=True)
+        self.user = Users.objects.create(
+            email="test_token@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner"],
+            username="test_token@gmail.com",
+        )
+
+    def obtain_tokens(self):
+        response = self.client.post(
+            reverse("token"),
+            {"email": "Test_Token@gmail.com", "password": "testpassword"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content)["data"]
+
+    def bearer(self, token):
+        return {"HTTP_AUTHORIZATION": "Bearer {}".format(token)}
+
+    def test_invalid_credentials(self):
+        response = self.client.post(
+            reverse("token"),
+            {"email": self.user.email, "password": "wrong_password"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_access_token_authenticates_without_queries(self):
+        tokens = self.obtain_tokens()
+        # loads the user into the cache
+        self.client.get(reverse("user-whoami"), **self.bearer(tokens["access"]))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user-whoami"), **self.bearer(tokens["access"]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)["data"]["email"], self.user.email)
+        self.assertEqual([query["sql"] for query in queries if "SAVEPOINT" not in query["sql"]], [])
+
+    def test_bearer_requests_skip_csrf(self):
+        tokens = self.obtain_tokens()
+        data = {
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "date_of_birth": "1990-01-01",
+            "about": "5 years",
+            "qualifications": "None",
+            "phone_number": "1234567890",
+        }
+        response = self.client.put(
+            reverse("user-info"), data, format="json", **self.bearer(tokens["access"])
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Users.objects.get(id=self.user.id).first_name, "Jane")
+
+    def test_invalid_access_tokens_are_rejected(self):
+        tokens = self.obtain_tokens()
+        for token in (tokens["access"] + "x", tokens["refresh"]):
+            response = self.client.get(reverse("pet-list-create"), **self.bearer(token))
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        with override_settings(ACCESS_TOKEN_LIFETIME=-1):
+            response = self.client.get(reverse("pet-list-create"), **self.bearer(tokens["access"]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_refresh_tokens_are_rotated(self):
+        tokens = self.obtain_tokens()
+        response = self.client.post(
+            reverse("token-refresh"), {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        refreshed = json.loads(response.content)["data"]
+        self.assertNotEqual(refreshed["refresh"], tokens["refresh"])
+
+        response = self.client.post(
+            reverse("token-refresh"), {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_used_refresh_tokens_are_rejected_by_every_worker(self):
+        tokens = self.obtain_tokens()
+        response = self.client.post(
+            reverse("token-refresh"), {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # e.g. another worker, without a shared cache
+        cache.clear()
+        response = self.client.post(
+            reverse("token-refresh"), {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_clear_revoked_tokens(self):
+        RevokedRefreshToken.objects.create(
+            jti="expired", expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        RevokedRefreshToken.objects.create(
+            jti="valid", expires_at=timezone.now() + timedelta(days=1)
+        )
+        out = io.StringIO()
+        call_command("clear_revoked_tokens", stdout=out)
+        self.assertIn("1 expired refresh tokens cleared", out.getvalue())
+        self.assertEqual(list(RevokedRefreshToken.objects.values_list("jti", flat=True)), ["valid"])
+
+    def test_disabled_users_cannot_refresh(self):
+        tokens = self.obtain_tokens()
+        Users.objects.filter(id=self.user.id).update(is_active=False)
+        response = self.client.post(
+            reverse("token-refresh"), {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoke(self):
+        tokens = self.obtain_tokens()
+        response = self.client.post(reverse("token-revoke"), tokens, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(reverse("pet-list-create"), **self.bearer(tokens["access"]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post(
+            reverse("token-refresh"), {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tokens_of_disabled_users_are_rejected(self):
+        tokens = self.obtain_tokens()
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse("pet-list-create"), **self.bearer(tokens["access"]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_password_change_revokes_tokens(self):
+        tokens = self.obtain_tokens()
+        self.user.set_password("newpassword")
+        self.user.save()
+        response = self.client.get(reverse("pet-list-create"), **self.bearer(tokens["access"]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post(
+            reverse("token-refresh"), {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_account_deletion_revokes_tokens(self):
+        tokens = self.obtain_tokens()
+        with override_settings(ACCOUNT_DELETION_IN_BACKGROUND=False):
+            schedule_account_deletion(self.user)
+        # even once the account would be active again
+        Users.objects.filter(id=self.user.id).update(is_active=True)
+        response = self.client.post(
+            reverse("token-refresh"), {"refresh": tokens["refresh"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -27,3 +27,7 @@ class UrlTests(TestCase):
     def test_user_info_url_resolves(self):
         url = reverse("user-info")
         self.assertEqual(resolve(url).func, views.user_view)
+
+    def test_picture_url_resolves(self):
+        url = reverse("picture", args=["0" * 64])
+        self.assertEqual(resolve(url).kwargs, {"picture_hash": "0" * 64})
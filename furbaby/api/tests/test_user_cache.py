@@ -0,0 +1,73 @@
+import json
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from ..models import Users
+from ..user_cache import get_cached_user, invalidate_cached_user
+
+
+@override_settings(SESSION_ENGINE="api.sessions")
+class CachedUserTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = Users.objects.create(
+            email="test_cached_user@gmail.com",
+            password=make_password("testpassword"),
+            first_name="John",
+            last_name="Doe",
+            user_type=["owner"],
+            username="test_cached_user@gmail.com",
+            experience="5 years",
+        )
+        self.client.post(
+            reverse("user-login"),
+            {"email": self.user.email, "password": "testpassword"},
+            format="json",
+        )
+
+    def test_authenticated_requests_without_queries(self):
+        # warms the session & user caches up
+        self.client.get(reverse("user-whoami"))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user-session-view"))
+            self.client.get(reverse("user-whoami"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(response.content)["data"]["user"],
+            {
+                "id": str(self.user.id),
+                "email": self.user.email,
+                "user_type": ["owner"],
+                "name": "John Doe",
+            },
+        )
+        self.assertEqual([query["sql"] for query in queries if "SAVEPOINT" not in query["sql"]], [])
+
+    def test_saving_the_user_invalidates_the_cache(self):
+        self.client.get(reverse("user-session-view"))
+        self.user.first_name = "Jane"
+        self.user.save()
+        response = self.client.get(reverse("user-session-view"))
+        self.assertEqual(json.loads(response.content)["data"]["user"]["name"], "Jane Doe")
+
+    def test_disabled_users_are_logged_out(self):
+        self.client.get(reverse("user-session-view"))
+        Users.objects.filter(pk=self.user.pk).update(is_active=False)
+        invalidate_cached_user(self.user.pk)
+        response = self.client.get(reverse("user-session-view"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_other_columns_are_loaded_at_once(self):
+        user = get_cached_user(self.user.pk)
+        self.assertIn("experience", user.get_deferred_fields())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(user.experience, "5 years")
+            self.assertEqual(user.picture_version, 0)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(user.get_session_auth_hash(), self.user.get_session_auth_hash())
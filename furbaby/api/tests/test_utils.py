@@ -0,0 +1,38 @@
+import io
+
+from django.test import SimpleTestCase
+from ..utils import parse_range_header, iter_stream_chunks
+
+
+class RangeHeaderTests(SimpleTestCase):
+    def test_parse_range_header_missing(self):
+        self.assertIsNone(parse_range_header(None))
+        self.assertIsNone(parse_range_header(""))
+
+    def test_parse_range_header_closed_range(self):
+        self.assertEqual(parse_range_header("bytes=0-99"), "bytes=0-99")
+
+    def test_parse_range_header_open_and_suffix_ranges(self):
+        self.assertEqual(parse_range_header("bytes=100-"), "bytes=100-")
+        self.assertEqual(parse_range_header("bytes=-500"), "bytes=-500")
+
+    def test_parse_range_header_invalid_ranges_are_ignored(self):
+        self.assertIsNone(parse_range_header("bytes=-"))
+        self.assertIsNone(parse_range_header("bytes=10-5"))
+        self.assertIsNone(parse_range_header("bytes=0-1,5-9"))
+        self.assertIsNone(parse_range_header("items=0-10"))
+
+
+class StreamChunkTests(SimpleTestCase):
+    def test_iter_stream_chunks_fixed_size(self):
+        stream = io.BytesIO(b"a" * 10)
+        chunks = list(iter_stream_chunks(stream, 4))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+        self.assertTrue(stream.closed)
+
+    def test_iter_stream_chunks_closes_stream_on_early_exit(self):
+        stream = io.BytesIO(b"a" * 10)
+        chunks = iter_stream_chunks(stream, 4)
+        next(chunks)
+        chunks.close()
+        self.assertTrue(stream.closed)
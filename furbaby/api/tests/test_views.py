@@ -1,8 +1,12 @@
+import io
 import json
+import struct
+import time
 import uuid
 from datetime import datetime, timedelta
 
 from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 from django.urls import reverse
@@ -10,8 +14,20 @@ from django.utils import timezone
 from django_rest_passwordreset.signals import reset_password_token_created
 from rest_framework import status
 from ..models import Users, Locations, Pets, Applications, Jobs
+from .. import async_views, views
+from ..storage import get_storage, InMemoryStorage, StorageError
+from ..utils import make_s3_path
+from ..pictures import picture_key
+from ..tokens import issue_tokens
+from ..user_cache import get_cached_user
+from django.conf import settings
+from django.middleware.csrf import _get_new_csrf_string
 from rest_framework.test import APIClient
 from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from django.test import override_settings, RequestFactory
+from asgiref.sync import async_to_sync
 
 
 def get_current_date_time(delta):
@@ -92,6 +108,24 @@ class UserRegistrationViewTest(TestCase):
         self.assertEqual(Users.objects.count(), 1)
         self.assertEqual(Users.objects.get().email, "valid@nyu.edu")
 
+    def test_user_registration_email_is_lowercased(self):
+        client = APIClient()
+        url = reverse("user-registration")
+        data = {
+            "email": "Valid@Example.com",
+            "password": "test1231",
+            "user_type": ["owner"],
+        }
+        response = client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = Users.objects.get()
+        self.assertEqual((user.email, user.username), ("valid@example.com", "valid@example.com"))
+
+        data["email"] = "VALID@example.com"
+        response = client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Users.objects.count(), 1)
+
 
 class UserLoginViewTest(TestCase):
     def setUp(self):
@@ -111,6 +145,13 @@ class UserLoginViewTest(TestCase):
         response = client.post(url, data, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_user_login_ignores_email_case(self):
+        client = APIClient()
+        url = reverse("user-login")
+        data = {"email": "Test@EXAMPLE.com", "password": "test1234"}
+        response = client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_user_login_invalid_credentials(self):
         client = APIClient()
         url = reverse("user-login")
@@ -214,6 +255,53 @@ class UserViewTest(TestCase):
         self.assertEqual(data["data"]["first_name"], "Jane")
         self.assertEqual(data["data"]["last_name"], "Doe")
 
+    def test_user_partial_update_info(self):
+        user = Users.objects.create(
+            email="test_owner_sitter@nyu.edu",
+            password=make_password("testpasswordownersitter"),
+            first_name="John",
+            last_name="Doe",
+            phone_number="1234567890",
+            user_type=["owner", "sitter"],
+            username="test_owner_sitter@nyu.edu",
+        )
+        self.client.force_login(user)
+        url = reverse("user-info")
+        self.client.get(url)  # warms the cached user
+
+        # a single UPDATE ... RETURNING (within the request savepoint) after authentication
+        with self.assertNumQueries(3):
+            response = self.client.patch(url, {"about": "5 years"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(response.content)["data"]
+        self.assertEqual(data["about"], "5 years")
+        self.assertEqual(data["first_name"], "John")
+        self.assertEqual(data["user_type"], ["owner", "sitter"])
+
+        user.refresh_from_db()
+        self.assertEqual((user.experience, user.phone_number), ("5 years", "1234567890"))
+
+        # the cached user is invalidated
+        self.client.patch(url, {"first_name": "Jane"}, format="json")
+        self.assertEqual(get_cached_user(user.id).first_name, "Jane")
+
+        # without any field, the authenticated user is returned as is
+        response = self.client.patch(url, {}, format="json")
+        self.assertEqual(json.loads(response.content)["data"]["first_name"], "Jane")
+
+    def test_user_update_info_invalid_date(self):
+        user = Users.objects.create(
+            email="test_owner_sitter@nyu.edu",
+            password=make_password("testpasswordownersitter"),
+            user_type=["owner", "sitter"],
+            username="test_owner_sitter@nyu.edu",
+        )
+        self.client.force_login(user)
+        response = self.client.patch(
+            reverse("user-info"), {"date_of_birth": "01/01/1990"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_user_get_info_successful(self):
         user = Users.objects.create(
             email="test_owner_sitter@nyu.edu",
@@ -319,6 +407,39 @@ class JobViewTest(TestCase):
         self.assertEqual(len(data["sitter_jobs"]), 1)
         self.assertEqual(data["sitter_jobs"][0]["id"], str(job.id))
 
+    def test_fetch_all_jobs_feed_includes_pet_picture_placeholder(self):
+        self.pet.picture_hash = "0" * 64
+        self.pet.picture_placeholder = "data:image/jpeg;base64,AAAA"
+        self.pet.picture_color = "#aabbcc"
+        self.pet.has_picture = True
+        self.pet.picture_version = 1
+        self.pet.save()
+        _ = Jobs.objects.create(
+            pet=self.pet,
+            location=self.location,
+            user=self.user_owner,
+            pay="999",
+            start=get_current_date_time(5),
+            end=get_current_date_time(15),
+            status="open",
+        )
+        client = APIClient()
+        url_login = reverse("user-login")
+        data_login = {"email": self.user_sitter.email, "password": "testpasswordsitter"}
+        _ = client.post(url_login, data_login, format="json")
+        response = client.get(reverse("custom-job-view"))
+        data = json.loads(response.content)
+        self.assertEqual(
+            data["sitter_jobs"][0]["pet_picture"],
+            {
+                "hash": "0" * 64,
+                "placeholder": "data:image/jpeg;base64,AAAA",
+                "color": "#aabbcc",
+                "has_picture": True,
+                "version": 1,
+            },
+        )
+
     def test_fetch_all_jobs_owner(self):
         job = Jobs.objects.create(
             pet=self.pet,
@@ -1019,3 +1140,433 @@ class LocationViewTest(TestCase):
         self.assertEqual(data["data"]["message"], "location deleted successfully")
         self.assertEqual(Locations.objects.count(), 1)
         self.assertEqual(Locations.objects.get().address, "456 Main St")
+
+    def test_single_default_location(self):
+        client = APIClient()
+        client.force_login(self.user_owner)
+        url = reverse("user-location")
+        data = {"city": "New York City", "country": "USA", "zipcode": "10001"}
+        for address in ("123 Main St", "456 Main St"):
+            response = client.post(
+                url, dict(data, address=address, default_location=True), format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # creating a default location unsets the previous one
+        default = Locations.objects.default_for(self.user_owner)
+        self.assertEqual(default.address, "456 Main St")
+        self.assertEqual(Locations.objects.filter(default_location=True).count(), 1)
+
+        first = Locations.objects.get(address="123 Main St")
+        response = client.put(
+            url,
+            dict(data, id=first.id, address=first.address, default_location=True),
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Locations.objects.default_for(self.user_owner.id).id, first.id)
+        self.assertEqual(Locations.objects.filter(default_location=True).count(), 1)
+
+        response = client.get(url, {"default": "true"})
+        self.assertEqual(json.loads(response.content)["id"], str(first.id))
+
+
+@override_settings(PICTURE_STORAGE={"BACKEND": "api.storage.InMemoryStorage"})
+class PictureViewTest(TestCase):
+    def setUp(self):
+        self.user_owner = Users.objects.create(
+            email="test_owner_picture@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner"],
+            username="test_owner_picture@gmail.com",
+        )
+        self.pet = Pets.objects.create(
+            owner=self.user_owner, name="Fluffy", breed="Golden Retriever", weight="50"
+        )
+        self.client = APIClient()
+        data_login = {"email": self.user_owner.email, "password": "testpassword"}
+        _ = self.client.post(reverse("user-login"), data_login, format="json")
+        self.picture = b"\xff\xd8\xff\xe0" + b"0123456789" * 10
+        get_storage().storage.objects.clear()
+
+    def upload_pet_picture(self, content=None, content_type="image/jpeg"):
+        picture = SimpleUploadedFile(
+            "pet.jpg", self.picture if content is None else content, content_type=content_type
+        )
+        return self.client.post(
+            reverse("user-info-pet-pictures"),
+            {"pet_id": str(self.pet.id), "pet_picture": picture},
+            format="multipart",
+        )
+
+    def get_pet_picture(self, **extra):
+        return self.client.get(
+            reverse("user-info-pet-pictures"),
+            {"id": str(self.pet.id), "owner_id": str(self.user_owner.id)},
+            **extra,
+        )
+
+    def test_pet_picture_missing(self):
+        response = self.get_pet_picture()
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_pet_picture_upload_streamed_into_storage(self):
+        response = self.upload_pet_picture()
+        picture_hash = json.loads(response.content)["data"]["picture_hash"]
+        # the temporary upload object has been replaced by the content hash one
+        self.assertEqual(list(get_storage().storage.objects), [picture_key(picture_hash)])
+
+    def test_pet_picture_upload_rejects_non_jpeg_content(self):
+        response = self.upload_pet_picture(content=b"GIF89a" + b"0" * 100)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(get_storage().storage.objects, {})
+
+    @override_settings(PICTURE_UPLOAD_MAX_BYTES=64)
+    def test_pet_picture_upload_too_large(self):
+        response = self.upload_pet_picture()
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(get_storage().storage.objects, {})
+        self.pet.refresh_from_db()
+        self.assertFalse(self.pet.has_picture)
+
+    @override_settings(PICTURE_UPLOAD_MAX_BYTES=64)
+    def test_pet_picture_upload_declared_too_large(self):
+        # the request body is larger than the limit, it's rejected without being parsed
+        response = self.upload_pet_picture(content=self.picture * 1000)
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(get_storage().storage.objects, {})
+
+    def record_uploads(self):
+        """the keys of the uploads opened in storage"""
+        storage, keys = get_storage().storage, []
+
+        def open_upload(key, content_type=None):
+            keys.append(key)
+            return InMemoryStorage.open_upload(storage, key, content_type)
+
+        storage.open_upload = open_upload
+        self.addCleanup(delattr, storage, "open_upload")
+        return keys
+
+    def test_pet_picture_upload_of_refused_requests_not_stored(self):
+        uploads = self.record_uploads()
+        csrf_token = _get_new_csrf_string()
+        # anonymous & invalid bearer token (refused by DRF, its first authenticator is the session)
+        for expected_status, extra in (
+            (status.HTTP_401_UNAUTHORIZED, {"HTTP_X_CSRFTOKEN": csrf_token}),
+            (status.HTTP_403_FORBIDDEN, {"HTTP_AUTHORIZATION": "Bearer not-a-token"}),
+        ):
+            client = APIClient(enforce_csrf_checks=True)
+            client.cookies[settings.CSRF_COOKIE_NAME] = csrf_token
+            picture = SimpleUploadedFile("pet.jpg", self.picture, content_type="image/jpeg")
+            response = client.post(
+                reverse("user-info-pet-pictures"),
+                {"pet_id": str(self.pet.id), "pet_picture": picture},
+                format="multipart",
+                **extra,
+            )
+            self.assertEqual(response.status_code, expected_status)
+        self.assertEqual(uploads, [])
+
+    def test_pet_picture_upload_needs_csrf_header(self):
+        uploads = self.record_uploads()
+        client = APIClient(enforce_csrf_checks=True)
+        client.force_login(self.user_owner)
+        csrf_token = _get_new_csrf_string()
+        client.cookies[settings.CSRF_COOKIE_NAME] = csrf_token
+        picture = SimpleUploadedFile("pet.jpg", self.picture, content_type="image/jpeg")
+        # cross-site, & with the token in the body (which is the upload)
+        for fields in ({}, {"csrfmiddlewaretoken": csrf_token}):
+            picture.seek(0)
+            data = {"pet_id": str(self.pet.id), "pet_picture": picture, **fields}
+            response = client.post(reverse("user-info-pet-pictures"), data, format="multipart")
+            self.assertEqual((response.status_code, uploads), (status.HTTP_403_FORBIDDEN, []))
+
+        picture.seek(0)
+        response = client.post(
+            reverse("user-info-pet-pictures"),
+            {"pet_id": str(self.pet.id), "pet_picture": picture},
+            format="multipart",
+            HTTP_X_CSRFTOKEN=csrf_token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(uploads), 1)
+
+    def test_missing_pet_picture_answered_from_database(self):
+        # the pet is known to have no picture, storage isn't consulted
+        key = make_s3_path(settings.ASSETS_PATH, str(self.user_owner.id), "pets", str(self.pet.id))
+        get_storage().put(key, self.picture)
+        response = self.get_pet_picture()
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_legacy_pet_picture_presence_recorded_on_fetch(self):
+        Pets.objects.filter(id=self.pet.id).update(has_picture=None)
+        response = self.get_pet_picture()
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.pet.refresh_from_db()
+        self.assertEqual(self.pet.has_picture, False)
+
+        Pets.objects.filter(id=self.pet.id).update(has_picture=None)
+        key = make_s3_path(settings.ASSETS_PATH, str(self.user_owner.id), "pets", str(self.pet.id))
+        get_storage().put(key, self.picture)
+        response = self.get_pet_picture()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.pet.refresh_from_db()
+        self.assertEqual(self.pet.has_picture, True)
+
+    def test_pet_picture_presence_and_version(self):
+        response = self.upload_pet_picture()
+        self.assertEqual(json.loads(response.content)["data"]["picture_version"], 1)
+        self.pet.refresh_from_db()
+        self.assertEqual((self.pet.has_picture, self.pet.picture_version), (True, 1))
+
+        response = self.client.delete(
+            reverse("user-info-pet-pictures"), {"pet_id": self.pet.name}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.pet.refresh_from_db()
+        self.assertEqual((self.pet.has_picture, self.pet.picture_version), (False, 2))
+        response = self.get_pet_picture()
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_pet_picture_upload_and_stream(self):
+        response = self.upload_pet_picture()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.get_pet_picture()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Length"], str(len(self.picture)))
+        self.assertEqual(response.getvalue(), self.picture)
+
+    def test_pet_picture_range_request(self):
+        _ = self.upload_pet_picture()
+        response = self.get_pet_picture(HTTP_RANGE="bytes=4-13")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response["Content-Range"], "bytes 4-13/{}".format(len(self.picture)))
+        self.assertEqual(response.getvalue(), self.picture[4:14])
+
+        response = self.get_pet_picture(HTTP_RANGE="bytes=5000-")
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+    def test_pet_picture_upload_rejects_other_formats(self):
+        response = self.upload_pet_picture(content=b"GIF89a", content_type="image/gif")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pet_picture_stored_by_content_hash(self):
+        response = self.upload_pet_picture()
+        picture_hash = json.loads(response.content)["data"]["picture_hash"]
+        self.pet.refresh_from_db()
+        self.assertEqual(self.pet.picture_hash, picture_hash)
+        self.assertEqual(get_storage().get(picture_key(picture_hash)), self.picture)
+
+        response = self.get_pet_picture()
+        self.assertEqual(response["ETag"], '"{}"'.format(picture_hash))
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        response = self.get_pet_picture(HTTP_IF_NONE_MATCH='"{}"'.format(picture_hash))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_pet_picture_placeholder_computed_on_upload(self):
+        image = io.BytesIO()
+        Image.new("RGB", (320, 240), color=(200, 40, 40)).save(image, format="JPEG")
+        response = self.upload_pet_picture(content=image.getvalue())
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(reverse("pet-retrieve-update-delete", args=[self.pet.id]))
+        data = json.loads(response.content)
+        self.assertTrue(data["picture_placeholder"].startswith("data:image/jpeg;base64,"))
+        self.assertEqual(data["picture_color"][0], "#")
+        red, green, blue = (int(data["picture_color"][i : i + 2], 16) for i in (1, 3, 5))
+        self.assertGreater(red, 150)
+        self.assertLess(green, 100)
+        self.assertLess(blue, 100)
+
+    def test_pet_picture_decompression_bomb_has_no_placeholder(self):
+        # a JPEG header declaring 20000x20000 pixels, without any pixel data
+        segment = lambda marker, data: b"\xff" + marker + struct.pack(">H", len(data) + 2) + data
+        frame = struct.pack(">BHHB", 8, 20000, 20000, 3) + b"\x01\x11\x00\x02\x11\x00\x03\x11\x00"
+        scan = b"\x03\x01\x00\x02\x00\x03\x00\x00\x3f\x00"
+        content = b"\xff\xd8" + segment(b"\xc0", frame) + segment(b"\xda", scan) + b"\xff\xd9"
+        response = self.upload_pet_picture(content=content)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.pet.refresh_from_db()
+        self.assertEqual((self.pet.picture_placeholder, self.pet.picture_color), (None, None))
+
+    def test_identical_pet_pictures_are_deduplicated(self):
+        other_pet = Pets.objects.create(
+            owner=self.user_owner, name="Rex", breed="Beagle", weight="20"
+        )
+        _ = self.upload_pet_picture()
+        picture = SimpleUploadedFile("rex.jpg", self.picture, content_type="image/jpeg")
+        _ = self.client.post(
+            reverse("user-info-pet-pictures"),
+            {"pet_id": str(other_pet.id), "pet_picture": picture},
+            format="multipart",
+        )
+        self.pet.refresh_from_db()
+        other_pet.refresh_from_db()
+        self.assertIsNotNone(self.pet.picture_hash)
+        self.assertEqual(self.pet.picture_hash, other_pet.picture_hash)
+        self.assertEqual(len(get_storage().storage.objects), 1)
+
+    def test_picture_served_by_hash_is_immutable(self):
+        response = self.upload_pet_picture()
+        picture_hash = json.loads(response.content)["data"]["picture_hash"]
+        url = reverse("picture", args=[picture_hash])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Cache-Control"], "private, max-age=31536000, immutable")
+        self.assertEqual(response.getvalue(), self.picture)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"{}"'.format(picture_hash))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(reverse("picture", args=["0" * 64]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse("picture", args=["not-a-hash"]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_profile_picture_upload_and_stream(self):
+        url = reverse("user-info-profile-picture")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        picture = SimpleUploadedFile("me.jpg", self.picture, content_type="image/jpeg")
+        response = self.client.post(url, {"profile_picture": picture}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.getvalue(), self.picture)
+
+
+class UnavailableStorage(InMemoryStorage):
+    def stream(self, key, byte_range=None):
+        raise StorageError("connection refused")
+
+
+@override_settings(
+    PICTURE_STORAGE={"BACKEND": "api.tests.test_views.UnavailableStorage"},
+    PICTURE_STORAGE_CIRCUIT_BREAKER={"minimum_calls": 2, "reset_timeout": 30},
+)
+class PictureStorageUnavailableViewTest(TestCase):
+    def setUp(self):
+        self.user_owner = Users.objects.create(
+            email="test_owner_unavailable@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner"],
+            username="test_owner_unavailable@gmail.com",
+        )
+        self.client = APIClient()
+        data_login = {"email": self.user_owner.email, "password": "testpassword"}
+        _ = self.client.post(reverse("user-login"), data_login, format="json")
+
+    def test_open_circuit_fails_fast(self):
+        picture_url = reverse("picture", args=["a" * 64])
+        for _ in range(2):
+            response = self.client.get(picture_url)
+            self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        response = self.client.get(picture_url)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "30")
+
+
+class SlowInMemoryStorage(InMemoryStorage):
+    def stream(self, key, byte_range=None):
+        time.sleep(0.5)
+        return super().stream(key, byte_range=byte_range)
+
+
+@override_settings(PICTURE_STORAGE={"BACKEND": "api.storage.InMemoryStorage"})
+class AsyncPictureViewTest(TestCase):
+    def setUp(self):
+        self.user_owner = Users.objects.create(
+            email="test_owner_async_picture@gmail.com",
+            password=make_password("testpassword"),
+            user_type=["owner"],
+            username="test_owner_async_picture@gmail.com",
+        )
+        # a pet predating `has_picture`, its (legacy) picture is looked up in storage
+        self.pet = Pets.objects.create(
+            owner=self.user_owner,
+            name="Fluffy",
+            breed="Golden Retriever",
+            weight="50",
+            has_picture=None,
+        )
+        self.factory = RequestFactory()
+        self.picture = b"\xff\xd8\xff\xe0" + b"0123456789" * 10
+
+    def get_pet_picture(self, user, **extra):
+        request = self.factory.get(
+            reverse("user-info-pet-pictures"),
+            {"id": str(self.pet.id), "owner_id": str(self.user_owner.id)},
+            **extra,
+        )
+        request.user = user
+        return async_to_sync(async_views.handle_pet_pictures)(request)
+
+    def test_async_pet_picture_unauthenticated(self):
+        response = self.get_pet_picture(AnonymousUser())
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_async_pet_picture_bearer_token(self):
+        tokens = issue_tokens(self.user_owner)
+        response = self.get_pet_picture(
+            AnonymousUser(), HTTP_AUTHORIZATION="Bearer {}".format(tokens["access"])
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.get_pet_picture(
+            AnonymousUser(), HTTP_AUTHORIZATION="Bearer {}".format(tokens["refresh"])
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_async_pet_picture_missing(self):
+        response = self.get_pet_picture(self.user_owner)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_pet_picture_full_and_range(self):
+        key = make_s3_path(settings.ASSETS_PATH, str(self.user_owner.id), "pets", str(self.pet.id))
+        get_storage().put(key, self.picture)
+
+        response = self.get_pet_picture(self.user_owner)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, self.picture)
+
+        response = self.get_pet_picture(self.user_owner, HTTP_RANGE="bytes=0-3")
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response.content, self.picture[:4])
+
+    def test_async_pet_picture_large(self):
+        key = make_s3_path(settings.ASSETS_PATH, str(self.user_owner.id), "pets", str(self.pet.id))
+        get_storage().put(key, self.picture)
+        # read in chunks by the request, without sharing it
+        views.pictureCoalesceMaxBytes, coalesce_max_bytes = 10, views.pictureCoalesceMaxBytes
+        views.pictureStreamChunkSize, chunk_size = 16, views.pictureStreamChunkSize
+        self.addCleanup(setattr, views, "pictureCoalesceMaxBytes", coalesce_max_bytes)
+        self.addCleanup(setattr, views, "pictureStreamChunkSize", chunk_size)
+        response = self.get_pet_picture(self.user_owner)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, self.picture)
+
+    def test_async_pet_picture_uses_the_cached_user(self):
+        request = self.factory.get(reverse("user-info-pet-pictures"))
+        request.user = get_cached_user(self.user_owner.id)
+        with self.assertNumQueries(0):
+            user = async_views.__load_authenticated_user__(request)
+        self.assertEqual(user.id, self.user_owner.id)
+        # the profile picture needs the whole row
+        user = async_views.__load_authenticated_user__(request, full=True)
+        self.assertEqual(user.get_deferred_fields(), set())
+
+    @override_settings(
+        PICTURE_STORAGE={"BACKEND": "api.tests.test_views.SlowInMemoryStorage"},
+        PICTURE_STORAGE_TIMEOUT=0.05,
+    )
+    def test_async_pet_picture_storage_timeout(self):
+        key = make_s3_path(settings.ASSETS_PATH, str(self.user_owner.id), "pets", str(self.pet.id))
+        get_storage().put(key, self.picture)
+        response = self.get_pet_picture(self.user_owner)
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
@@ -0,0 +1,163 @@
+"""
+Signed access & refresh tokens for API clients that don't keep a session (mobile apps,
+scripts), see `authentication.BearerTokenAuthentication`.
+
+Tokens are `django.core.signing` payloads: HMAC-signed with the SECRET_KEY and timestamped, so an
+access token is verified without any lookup. It carries the user's id, email and `user_type`, and
+a version (`ver`) derived from the password like the session auth hash: the user a token is used
+for (cached, see api/user_cache.py) has to be active and of the same version, so changing the
+password invalidates the tokens like it does the sessions. Access tokens live
+`ACCESS_TOKEN_LIFETIME` seconds, refresh tokens `REFRESH_TOKEN_LIFETIME` seconds and are rotated
+on every use.
+
+Used & revoked refresh tokens are recorded by their id (`jti`) in the database
+(`RevokedRefreshToken`, see `revoke_refresh_token`), which the refresh already queries: a refresh
+token can't be used again in any worker. Revoked access tokens are remembered by their id in
+`revoked_tokens` until they would have expired anyway, and all the tokens of a user issued until
+a time (e.g. when the account is scheduled for deletion) by the id of the user. This deny-list
+lives in the default cache: in memory of the worker without REDIS_URL (the short access token
+lifetime bounds what the other workers miss), shared otherwise. The refresh itself checks that
+the user is still active.
+"""
+
+import secrets
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import RevokedRefreshToken
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def __lifetime__(kind):
+    if kind == ACCESS:
+        return getattr(settings, "ACCESS_TOKEN_LIFETIME", 15 * 60)
+    return getattr(settings, "REFRESH_TOKEN_LIFETIME", 14 * 24 * 60 * 60)
+
+
+def __salt__(kind):
+    return "api.tokens.{}".format(kind)
+
+
+class DenyList:
+    """ids of revoked tokens, each kept until the token would have expired"""
+
+    key_prefix = "api.tokens.revoked."
+
+    def add(self, jti, expires_at):
+        remaining = int(expires_at - time.time()) + 1
+        if remaining > 0:
+            cache.set(self.key_prefix + jti, True, remaining)
+
+    def add_user(self, user_id):
+        """revokes every token issued to the user until now"""
+        cache.set(self.key_prefix + "user." + str(user_id), time.time(), __lifetime__(REFRESH))
+
+    def is_revoked(self, payload):
+        # a single cache lookup for both
+        jti_key, user_key = (
+            self.key_prefix + payload["jti"],
+            self.key_prefix + "user." + payload["sub"],
+        )
+        revoked = cache.get_many([jti_key, user_key])
+        if jti_key in revoked:
+            return True
+        return user_key in revoked and payload["iat"] <= revoked[user_key]
+
+    def __contains__(self, jti):
+        return self.key_prefix + jti in cache
+
+
+revoked_tokens = DenyList()
+
+
+def token_version(user):
+    """changes with the password of the user, like the session auth hash it's derived from"""
+    return salted_hmac("api.tokens.version", user.get_session_auth_hash()).hexdigest()[:16]
+
+
+def is_current_version(payload, user):
+    return constant_time_compare(payload["ver"], token_version(user))
+
+
+def issue_token(user, kind):
+    issued_at = time.time()
+    payload = {
+        "sub": str(user.pk),
+        "email": user.email,
+        "type": user.user_type,
+        "ver": token_version(user),
+        "jti": secrets.token_urlsafe(12),
+        "iat": issued_at,
+        "exp": int(issued_at) + __lifetime__(kind),
+    }
+    return signing.dumps(payload, salt=__salt__(kind), compress=True)
+
+
+def issue_tokens(user):
+    return {
+        "access": issue_token(user, ACCESS),
+        "refresh": issue_token(user, REFRESH),
+        "token_type": "Bearer",
+        "expires_in": __lifetime__(ACCESS),
+    }
+
+
+def verify_token(token, kind):
+    """returns the payload of a valid token of `kind`, raises InvalidToken otherwise"""
+    try:
+        payload = signing.loads(token, salt=__salt__(kind), max_age=__lifetime__(kind))
+    except signing.SignatureExpired:
+        raise InvalidToken("token has expired")
+    except signing.BadSignature:
+        raise InvalidToken("invalid token")
+    if "ver" not in payload:
+        # issued before tokens were versioned
+        raise InvalidToken("invalid token")
+    if revoked_tokens.is_revoked(payload):
+        raise InvalidToken("token has been revoked")
+    return payload
+
+
+def revoke_token(payload):
+    revoked_tokens.add(payload["jti"], payload["exp"])
+
+
+def revoke_refresh_token(payload):
+    """
+    records a refresh token as used in the database, False when it already was (used or revoked
+    before, possibly by a concurrent request)
+    """
+    try:
+        # its own savepoint, the conflict doesn't break the transaction of the request
+        with transaction.atomic():
+            RevokedRefreshToken.objects.create(
+                jti=payload["jti"],
+                expires_at=datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def clear_revoked_refresh_tokens():
+    """deletes the records of the refresh tokens that expired since, returns their number"""
+    deleted, _ = RevokedRefreshToken.objects.filter(
+        expires_at__lt=datetime.now(timezone.utc)
+    ).delete()
+    return deleted
+
+
+def revoke_user_tokens(user_id):
+    revoked_tokens.add_user(user_id)
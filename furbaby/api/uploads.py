@@ -0,0 +1,251 @@
+"""
+Streaming picture uploads.
+
+Django's default upload handlers buffer a whole upload (in memory or in a temporary file)
+before the view gets to store it. The picture endpoints instead use `PictureUploadHandler`,
+which checks the JPEG signature on the first bytes, enforces `PICTURE_UPLOAD_MAX_BYTES` while
+the request body is being read and writes the chunks straight into storage (an S3 multipart
+upload) under a temporary key. Rejected uploads stop reading the request body right away, and
+uploads of requests the view would refuse (unauthenticated, or failing the CSRF check of session
+requests) aren't read at all.
+
+The views then find a `StreamedPicture` in `request.FILES`, see `pictures.store_picture` for how
+it is moved to its content hash key.
+"""
+
+import functools
+import hashlib
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+
+from .authentication import get_bearer_token
+from .csrf import HeaderCsrfCheck
+from .storage import get_storage, StorageError
+from .tokens import ACCESS, InvalidToken, verify_token
+from .utils import make_s3_path
+
+JPEG_MAGIC_BYTES = b"\xff\xd8\xff"
+
+# allowance for the multipart boundaries & headers and the other fields of a picture upload
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadRejected:
+    def __init__(self, status, error, message):
+        self.status = status
+        self.error = error
+        self.message = message
+
+
+class StreamedPicture(UploadedFile):
+    """
+    A picture already written to storage under `upload_key`, `file` is a local spool of it
+    (only used to compute the placeholder)
+    """
+
+    def __init__(self, file, name, content_type, size, charset, upload_key, picture_hash):
+        super().__init__(file, name, content_type, size, charset)
+        self.upload_key = upload_key
+        self.picture_hash = picture_hash
+        self.stored = False
+
+
+def upload_too_large(max_bytes):
+    return UploadRejected(
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        "uploaded file is too large",
+        "pictures can be at most {} bytes".format(max_bytes),
+    )
+
+
+def incorrect_file_format():
+    return UploadRejected(
+        status.HTTP_400_BAD_REQUEST,
+        "incorrect file format uploaded",
+        'only file type of "jpeg" is accepted',
+    )
+
+
+def unauthenticated_upload():
+    return UploadRejected(
+        status.HTTP_401_UNAUTHORIZED,
+        "unauthenticated request. rejected",
+        "log in to upload pictures",
+    )
+
+
+def __check_uploader__(request):
+    """the rejection of the upload of a request the view would refuse, None if there's none"""
+    token = get_bearer_token(request)
+    if token is not None:
+        try:
+            verify_token(token, ACCESS)
+        except InvalidToken:
+            return unauthenticated_upload()
+        # browsers don't attach bearer tokens on their own, no CSRF check (see csrf_protect_session)
+        return None
+
+    if not request.user.is_authenticated:
+        return unauthenticated_upload()
+    response = HeaderCsrfCheck().process_view(request, None, (), {})
+    if response is not None:
+        return UploadRejected(
+            status.HTTP_403_FORBIDDEN,
+            "CSRF verification failed",
+            "uploads need the CSRF token in the {} header".format(settings.CSRF_HEADER_NAME),
+        )
+    return None
+
+
+class PictureUploadHandler(FileUploadHandler):
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = getattr(settings, "PICTURE_UPLOAD_MAX_BYTES", 10 * 1024 * 1024)
+        self.storage = get_storage()
+        self.upload = None
+        self.spool = None
+
+    def __reject__(self, rejection):
+        # the outcome is picked up by the view (see `rejected_upload`)
+        self.request.rejected_upload = rejection
+        self.__discard__()
+        raise StopUpload(connection_reset=True)
+
+    def __discard__(self):
+        if self.spool is not None:
+            self.spool.close()
+            self.spool = None
+        if self.upload is not None:
+            upload, self.upload = self.upload, None
+            try:
+                upload.abort()
+            except StorageError:
+                # the temporary object is cleaned up by the reconciliation
+                pass
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # nothing is written to storage for requests the view would refuse anyway
+        rejection = __check_uploader__(self.request)
+        if rejection is None and content_length > self.max_bytes + MULTIPART_OVERHEAD_BYTES:
+            # the declared body is too large already, it isn't read at all
+            rejection = upload_too_large(self.max_bytes)
+        if rejection is not None:
+            self.request.rejected_upload = rejection
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.content_length is not None and self.content_length > self.max_bytes:
+            self.__reject__(upload_too_large(self.max_bytes))
+
+        self.upload_key = make_s3_path(
+            getattr(settings, "ASSETS_PATH"), "uploads", uuid.uuid4().hex
+        )
+        self.digest = hashlib.sha256()
+        self.signature = b""
+        self.size = 0
+        self.spool = tempfile.SpooledTemporaryFile(
+            max_size=getattr(settings, "FILE_UPLOAD_MAX_MEMORY_SIZE", 2621440)
+        )
+        try:
+            self.upload = self.storage.open_upload(self.upload_key, self.content_type)
+        except StorageError as e:
+            self.__reject__(e)
+
+    def receive_data_chunk(self, raw_data, start):
+        if len(self.signature) < len(JPEG_MAGIC_BYTES):
+            self.signature = (self.signature + raw_data)[: len(JPEG_MAGIC_BYTES)]
+            if not JPEG_MAGIC_BYTES.startswith(self.signature):
+                self.__reject__(incorrect_file_format())
+
+        self.size += len(raw_data)
+        if self.size > self.max_bytes:
+            self.__reject__(upload_too_large(self.max_bytes))
+
+        try:
+            self.upload.write(raw_data)
+        except StorageError as e:
+            self.__reject__(e)
+        self.digest.update(raw_data)
+        self.spool.write(raw_data)
+        # the chunk is consumed here, no other handler gets to see it
+        return None
+
+    def file_complete(self, file_size):
+        if len(self.signature) < len(JPEG_MAGIC_BYTES):
+            self.request.rejected_upload = incorrect_file_format()
+            self.__discard__()
+            return None
+
+        upload, self.upload = self.upload, None
+        try:
+            upload.complete()
+        except StorageError as e:
+            self.request.rejected_upload = e
+            self.upload = upload
+            self.__discard__()
+            return None
+
+        spool, self.spool = self.spool, None
+        spool.seek(0)
+        return StreamedPicture(
+            spool,
+            self.file_name,
+            self.content_type,
+            file_size,
+            self.charset,
+            self.upload_key,
+            self.digest.hexdigest(),
+        )
+
+    def upload_interrupted(self):
+        # the client went away before the upload was complete
+        self.__discard__()
+
+
+def __discard_streamed_picture__(picture):
+    picture.close()
+    if picture.stored:
+        return
+    try:
+        get_storage().delete(picture.upload_key)
+    except StorageError:
+        # left for the reconciliation to clean up
+        pass
+
+
+def stream_picture_uploads(view):
+    """
+    Makes `view` receive its uploads through `PictureUploadHandler`, deleting the temporary
+    objects of pictures it didn't store.
+
+    NOTE: this has to wrap `csrf_protect_session`, which reads the request body (with the upload
+    handlers installed at that point) to look for the CSRF token
+    """
+
+    @csrf_exempt
+    @functools.wraps(view)
+    def wrapped_view(request, *args, **kwargs):
+        if request.method not in ("POST", "PUT"):
+            return view(request, *args, **kwargs)
+
+        request.upload_handlers = [PictureUploadHandler(request)]
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            # request._files only exists when the body has been parsed
+            for _, pictures in getattr(request, "_files", MultiValueDict()).lists():
+                for picture in pictures:
+                    if isinstance(picture, StreamedPicture):
+                        __discard_streamed_picture__(picture)
+
+    return wrapped_view
@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.urls import path, include
 
-from . import views
+from . import async_views, views
 from .views import (
     UserRegistrationView,
     UserLoginView,
@@ -14,6 +15,9 @@ from .views import (
 # NOTE: We might have to use the decorator csrf_protect to ensure that
 # the endpoints that need the csrf token always get it
 
+# when served through ASGI the picture endpoints use non-blocking handlers (see api/async_views.py)
+picture_views = async_views if getattr(settings, "ASYNC_PICTURE_VIEWS", False) else views
+
 urlpatterns = [
     path("", views.index, name="index"),
     path(
@@ -21,9 +25,20 @@ urlpatterns = [
         UserRegistrationView.as_view(),
         name="user-registration",
     ),
-    path("auth/login", UserLoginView.as_view(), name="user-login"),
+    path(
+        "auth/login",
+        (
+            async_views.login_view
+            if getattr(settings, "ASYNC_LOGIN_VIEW", False)
+            else UserLoginView.as_view()
+        ),
+        name="user-login",
+    ),
     path("auth/logout", views.logout_view, name="user-logout"),
     path("auth/session", views.session_view, name="user-session-view"),
+    path("auth/token", views.token_view, name="token"),
+    path("auth/token/refresh", views.token_refresh_view, name="token-refresh"),
+    path("auth/token/revoke", views.token_revoke_view, name="token-revoke"),
     path("auth/whoami", views.whoami_view, name="user-whoami"),
     path(
         "auth/password_reset/",
@@ -32,16 +47,22 @@ urlpatterns = [
     path("api/user", views.user_view, name="user-info"),
     path(
         "api/user/profile_picture",
-        views.handle_profile_picture,
+        picture_views.handle_profile_picture,
         name="user-info-profile-picture",
     ),
     path(
         "api/user/pet/pictures",
-        views.handle_pet_pictures,
+        picture_views.handle_pet_pictures,
         name="user-info-pet-pictures",
     ),
+    path(
+        "api/pictures/<str:picture_hash>",
+        picture_views.serve_picture,
+        name="picture",
+    ),
     path("api/user/locations", views.user_location_view, name="user-location"),
     path("pets/", PetListCreateView.as_view(), name="pet-list-create"),
+    path("pets/taxonomy", views.taxonomy_view, name="pet-taxonomy"),
     path(
         "pets/<uuid:pk>/",
         PetRetrieveUpdateDeleteView.as_view(),
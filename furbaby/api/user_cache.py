@@ -0,0 +1,76 @@
+"""
+Cached loading of the authenticated user.
+
+Every authenticated request used to load the whole `Users` row although views mostly check
+`id`, `email` & `user_type`. `get_cached_user` (used by `EmailBackend.get_user`) instead loads
+only `AUTH_FIELDS` and caches them for `USER_CACHE_TIMEOUT` seconds. The user it returns is a
+regular `Users` instance with the other columns deferred, the first access to one of them loads
+all the missing ones in a single query (see `Users.refresh_from_db`).
+
+The cache entry is dropped whenever the user is saved or deleted, updates through querysets
+(`Users.objects.filter(...).update(...)`) of any of `AUTH_FIELDS` have to call
+`invalidate_cached_user` themselves.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Users
+
+AUTH_FIELDS = (
+    "id",
+    "email",
+    "username",
+    "first_name",
+    "last_name",
+    "user_type",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+)
+
+# the columns of `AUTH_FIELDS` in the order `Model.from_db` expects them
+__field_names__ = [f.attname for f in Users._meta.concrete_fields if f.attname in AUTH_FIELDS]
+
+
+def __cache_key__(user_id):
+    return "api.user_cache.{}".format(user_id)
+
+
+def __load_values__(user_id):
+    values = Users.objects.filter(pk=user_id).values(*__field_names__, "password").first()
+    if values == None:
+        return None
+    # sessions are checked against a hash of the password, the password itself isn't cached
+    values["session_auth_hash"] = Users(password=values.pop("password")).get_session_auth_hash()
+    return values
+
+
+def get_cached_user(user_id):
+    """returns the user with only `AUTH_FIELDS` loaded, None when there is no such user"""
+    key = __cache_key__(user_id)
+    values = cache.get(key)
+    if values is None:
+        values = __load_values__(user_id)
+        if values is None:
+            return None
+        cache.set(key, values, getattr(settings, "USER_CACHE_TIMEOUT", 60))
+
+    user = Users.from_db(
+        Users.objects.db, __field_names__, [values[name] for name in __field_names__]
+    )
+    user._cached_session_auth_hash = values["session_auth_hash"]
+    user._partially_loaded = True
+    return user
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(__cache_key__(user_id))
+
+
+@receiver(post_save, sender=Users)
+@receiver(post_delete, sender=Users)
+def __invalidate_on_change__(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
@@ -1,6 +1,10 @@
 import json
+import re
+
 from django.http import JsonResponse
 
+BYTE_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
 
 def make_s3_path(*args: str):
     return "/".join(args)
@@ -11,7 +15,47 @@ def read_request_body(request):
     return json.loads(body_unicode)
 
 
+def normalize_email(email):
+    # emails are stored lowercased (see the Users constraints), lookups compare them as is
+    if email == None:
+        return None
+    return email.strip().lower()
+
+
 def json_response(data=None, status=None, safe=True, include_data=True):
     if include_data == False:
         return JsonResponse(data=data, status=status, safe=safe)
     return JsonResponse(data={"data": data}, status=status, safe=safe)
+
+
+def parse_range_header(value):
+    """
+    Returns a normalized single byte range ("bytes=<start>-<end>") from a Range header value,
+    or None when the header is missing, malformed or asks for multiple ranges (in which case
+    the full object should be served, as allowed by RFC 9110)
+    """
+    if not value:
+        return None
+    match = BYTE_RANGE_PATTERN.match(value.strip())
+    if match is None:
+        return None
+    start, end = match.groups()
+    if start == "" and end == "":
+        return None
+    if start != "" and end != "" and int(end) < int(start):
+        return None
+    return "bytes={}-{}".format(start, end)
+
+
+def iter_stream_chunks(stream, chunk_size):
+    # reads a file-like stream in fixed-size chunks so that at most one chunk
+    # is held in memory at a time; the stream is closed once exhausted or when
+    # the consumer (e.g. a StreamingHttpResponse) closes the generator early
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        stream.close()
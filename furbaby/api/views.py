@@ -2,7 +2,12 @@ import json
 import os
 from datetime import datetime, timezone, timedelta
 
-from django.http import JsonResponse, HttpResponse
+from django.http import (
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.contrib.auth import login, logout
 from drf_standardized_errors.handler import exception_handler
 from rest_framework import status
@@ -13,10 +18,10 @@ from rest_framework.generics import (
     RetrieveUpdateDestroyAPIView,
 )
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
-from .utils import json_response, make_s3_path
+from rest_framework.exceptions import ParseError, PermissionDenied
+from .utils import json_response, make_s3_path, parse_range_header, iter_stream_chunks
 from django.conf import settings
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, authentication_classes
 from rest_framework.response import Response
 
 from .models import Locations, Notifications
@@ -34,22 +39,60 @@ from .serializers import (
     ApplicationSerializer,
 )
 
-from django.core.mail import EmailMultiAlternatives
 from django.dispatch import receiver
-from django.template.loader import render_to_string
 from django_rest_passwordreset.signals import reset_password_token_created
 from django.core.exceptions import ValidationError
 
-from django.views.decorators.csrf import csrf_protect
+from .authentication import csrf_protect_session
 from django.core.serializers import serialize
 
-import boto3
-from botocore.exceptions import ClientError
+from .storage import (
+    get_storage,
+    InvalidRange,
+    ObjectNotFound,
+    StorageError,
+    StorageUnavailable,
+)
+from .pictures import (
+    IMMUTABLE_CACHE_CONTROL,
+    MUTABLE_CACHE_CONTROL,
+    etag_matches,
+    is_picture_hash,
+    picture_etag,
+    picture_key,
+    picture_placeholder,
+    read_picture,
+    store_picture,
+)
+from .hashing import HashingOverloaded
+from .outbox import queue_email
+from .tokens import (
+    ACCESS,
+    InvalidToken,
+    REFRESH,
+    is_current_version,
+    issue_tokens,
+    revoke_refresh_token,
+    revoke_token,
+    verify_token,
+)
+from .taxonomy import get_taxonomy
+from .measurements import ImplausibleMeasurement, parse_height, parse_weight
+from .uploads import stream_picture_uploads
 
-s3Config = getattr(settings, "S3_CONFIG", None)
-s3Client = boto3.client("s3", config=s3Config)
 s3AssetsFolder = getattr(settings, "ASSETS_PATH")
-s3BucketName = getattr(settings, "AWS_BUCKET_NAME")
+pictureStreamChunkSize = getattr(settings, "PICTURE_STREAM_CHUNK_SIZE", 64 * 1024)
+pictureCoalesceMaxBytes = getattr(settings, "PICTURE_COALESCE_MAX_BYTES", 1024 * 1024)
+
+# fields of `Users`/`Pets` updated whenever their picture changes
+RECORD_PICTURE_FIELDS = [
+    "picture_hash",
+    "picture_placeholder",
+    "picture_color",
+    "has_picture",
+    "picture_version",
+    "updated_at",
+]
 
 
 def update_job_status(job):
@@ -63,6 +106,19 @@ def update_job_status(job):
     job.save()
 
 
+def __hashing_overloaded_response__(error):
+    # too many logins/registrations are being processed, see api/hashing.py
+    response = json_response(
+        data={
+            "error": str(error),
+            "message": "too many requests, please try again in a moment",
+        },
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+    response["Retry-After"] = str(error.retry_after)
+    return response
+
+
 class UserRegistrationView(GenericAPIView):
     # the next line is to disable CORS for that endpoint/view
     authentication_classes = []
@@ -84,7 +140,10 @@ class UserRegistrationView(GenericAPIView):
         if not serializer.is_valid():
             return json_response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer.save()
+        try:
+            serializer.save()
+        except HashingOverloaded as e:
+            return __hashing_overloaded_response__(e)
         return json_response(data=serializer.data, status=status.HTTP_201_CREATED)
 
 
@@ -108,7 +167,10 @@ class UserLoginView(APIView):
             email = serializer.validated_data["email"]  # type: ignore
             password = serializer.validated_data["password"]  # type: ignore
             email_backend = EmailBackend()
-            user = email_backend.authenticate(request, email=email, password=password)
+            try:
+                user = email_backend.authenticate(request, email=email, password=password)
+            except HashingOverloaded as e:
+                return __hashing_overloaded_response__(e)
             if user is not None:
                 login(request, user)
                 return json_response(
@@ -122,7 +184,7 @@ class UserLoginView(APIView):
         return json_response(data=serializer.errors, status=status.HTTP_401_UNAUTHORIZED)
 
 
-@csrf_protect
+@csrf_protect_session
 @api_view(["GET", "OPTIONS", "POST"])
 def logout_view(request):
     if not request.user.is_authenticated:
@@ -134,14 +196,88 @@ def logout_view(request):
     return json_response({"detail": "Successfully logged out."}, status=status.HTTP_200_OK)
 
 
-@csrf_protect
+# the token endpoints don't rely on cookies, hence neither on the session nor on CSRF tokens
+@api_view(["POST", "OPTIONS"])
+@authentication_classes([])
+def token_view(request):
+    serializer = UserLoginSerializer(data=request.data)
+    if not serializer.is_valid():
+        return json_response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user = EmailBackend().authenticate(
+            request,
+            email=serializer.validated_data["email"],  # type: ignore
+            password=serializer.validated_data["password"],  # type: ignore
+        )
+    except HashingOverloaded as e:
+        return __hashing_overloaded_response__(e)
+    if user is None:
+        return json_response(
+            data={"message": "User is not found"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    return json_response(issue_tokens(user), status=status.HTTP_200_OK)
+
+
+def __verify_refresh_token__(request):
+    token = request.data.get("refresh") if isinstance(request.data, dict) else None
+    if not token:
+        raise InvalidToken('"refresh" token is missing')
+    return verify_token(token, REFRESH)
+
+
+@api_view(["POST", "OPTIONS"])
+@authentication_classes([])
+def token_refresh_view(request):
+    try:
+        payload = __verify_refresh_token__(request)
+    except InvalidToken as e:
+        return json_response(data={"error": str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+
+    # picks up changes to the user (e.g. a disabled account or a new password)
+    user = Users.objects.filter(id=payload["sub"], is_active=True).first()
+    if user == None:
+        return json_response(data={"error": "user not found"}, status=status.HTTP_401_UNAUTHORIZED)
+    if not is_current_version(payload, user):
+        return json_response(
+            data={"error": "token has been revoked"}, status=status.HTTP_401_UNAUTHORIZED
+        )
+    # refresh tokens are rotated, each one can only be used once (in any worker)
+    if not revoke_refresh_token(payload):
+        return json_response(
+            data={"error": "token has been revoked"}, status=status.HTTP_401_UNAUTHORIZED
+        )
+    return json_response(issue_tokens(user), status=status.HTTP_200_OK)
+
+
+@api_view(["POST", "OPTIONS"])
+@authentication_classes([])
+def token_revoke_view(request):
+    try:
+        payload = __verify_refresh_token__(request)
+    except InvalidToken as e:
+        return json_response(data={"error": str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+
+    revoke_refresh_token(payload)
+    access_token = request.data.get("access")
+    if access_token:
+        try:
+            revoke_token(verify_token(access_token, ACCESS))
+        except InvalidToken:
+            pass
+    return json_response({"detail": "Tokens revoked."}, status=status.HTTP_200_OK)
+
+
+@csrf_protect_session
 @api_view(["GET", "OPTIONS", "POST"])
 def session_view(request):
-    current_user = Users.objects.filter(id=request.user.id).first()
-
-    if not request.user.is_authenticated or current_user == None:
+    if not request.user.is_authenticated:
         return json_response({"isAuthenticated": False}, status=status.HTTP_401_UNAUTHORIZED)
 
+    # only uses the columns loaded by the authentication (see api/user_cache.py)
+    current_user = request.user
+
     user_response_body = {
         "id": current_user.id,
         "email": current_user.email.lower(),
@@ -164,7 +300,7 @@ def session_view(request):
     )
 
 
-@csrf_protect
+@csrf_protect_session
 @api_view(["GET", "OPTIONS", "POST"])
 def whoami_view(request):
     if not request.user.is_authenticated:
@@ -173,7 +309,7 @@ def whoami_view(request):
     return json_response({"email": request.user.email}, status=status.HTTP_200_OK)
 
 
-@csrf_protect
+@csrf_protect_session
 @api_view(["GET", "OPTIONS", "PUT", "PATCH", "DELETE"])
 def user_view(request):
     if not request.user.is_authenticated:
@@ -245,27 +381,14 @@ def password_reset_token_created(
         ),
     }
 
-    # render email text
-    email_html_message = render_to_string("email/password_reset_email.html", context)
-    email_plaintext_message = render_to_string("email/password_reset_email.txt", context)
-
-    msg = EmailMultiAlternatives(
-        # title:
-        "Password Reset instructions for {title}".format(title="FurBaby"),
-        # message:
-        email_plaintext_message,
-        # from:
-        "sak9791@nyu.edu",
-        # to:
-        [reset_password_token.user.email],
-    )
-    msg.attach_alternative(email_html_message, "text/html")
-    msg.send()
+    # sent by the outbox once the request has committed, see api/outbox.py
+    queue_email("password_reset", reset_password_token.user.email, context)
 
 
-@csrf_protect
+@stream_picture_uploads
+@csrf_protect_session
 @api_view(["GET", "POST", "OPTIONS"])
-def handle_profile_picture(request):  # pragma: no cover
+def handle_profile_picture(request):
     if not request.user.is_authenticated:
         return json_response(
             data={"error": "unauthenticated request. rejected"},
@@ -287,28 +410,32 @@ def handle_profile_picture(request):  # pragma: no cover
     )
 
 
-def __get_user_profile_picture__(request):  # pragma: no cover
-    profile_picture_path = make_s3_path(
-        s3AssetsFolder, str(request.user.id), "profile-picture", "picture"
-    )
+def __get_user_profile_picture__(request):
+    picture_hash = request.user.picture_hash
+    if picture_hash is None:
+        # pictures uploaded before they were stored by content hash
+        profile_picture_path = make_s3_path(
+            s3AssetsFolder, str(request.user.id), "profile-picture", "picture"
+        )
+    else:
+        profile_picture_path = picture_key(picture_hash)
+
+    if request.user.has_picture is False:
+        # known to be missing, answered without a storage round trip
+        return __profile_picture_not_found_response__(request.user, profile_picture_path)
+    if picture_hash is not None and etag_matches(request, picture_hash):
+        return __not_modified_response__(picture_hash, MUTABLE_CACHE_CONTROL)
 
     try:
-        image_object = s3Client.get_object(Bucket=s3BucketName, Key=profile_picture_path)
-        object_content = image_object["Body"].read()
-        return HttpResponse(object_content, content_type="image/jpeg")
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "NoSuchKey":
-            return json_response(
-                {
-                    "data": {
-                        "message": "no profile picture present with current user: {}".format(
-                            str(request.user.id),
-                        ),
-                        "key": profile_picture_path,
-                    }
-                },
-                status=status.HTTP_404_NOT_FOUND,
-            )
+        response = __stream_picture__(request, profile_picture_path, picture_hash=picture_hash)
+    except InvalidRange:
+        return __invalid_range_response__()
+    except ObjectNotFound:
+        __record_picture_presence__(request.user, False)
+        return __profile_picture_not_found_response__(request.user, profile_picture_path)
+    except StorageUnavailable as e:
+        return __storage_unavailable_response__(e, request.user.picture_placeholder)
+    except StorageError as e:
         return json_response(
             data={
                 "error": "failed to fetch profile picture, ({})".format(e),
@@ -316,16 +443,143 @@ def __get_user_profile_picture__(request):  # pragma: no cover
             },
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
+    __record_picture_presence__(request.user, True)
+    return response
+
+
+def __profile_picture_not_found_response__(user, profile_picture_path):
+    return json_response(
+        {
+            "data": {
+                "message": "no profile picture present with current user: {}".format(
+                    str(user.id),
+                ),
+                "key": profile_picture_path,
+            }
+        },
+        status=status.HTTP_404_NOT_FOUND,
+    )
+
+
+def __record_picture_presence__(record, has_picture):
+    # rows predating `has_picture` learn whether their (legacy) picture exists on first fetch
+    if record.has_picture is None:
+        type(record).objects.filter(pk=record.pk, has_picture=None).update(has_picture=has_picture)
+        record.has_picture = has_picture
+
+
+def __set_record_picture__(record, picture_hash, picture):
+    record.picture_hash = picture_hash
+    record.picture_placeholder, record.picture_color = picture_placeholder(picture)
+    record.has_picture = True
+    record.picture_version += 1
+    record.save(update_fields=RECORD_PICTURE_FIELDS)
+
+
+def __clear_record_picture__(record):
+    record.picture_hash = None
+    record.picture_placeholder = None
+    record.picture_color = None
+    record.has_picture = False
+    record.picture_version += 1
+    record.save(update_fields=RECORD_PICTURE_FIELDS)
+
+
+def __stream_picture__(
+    request,
+    key,
+    picture_hash=None,
+    cache_control=MUTABLE_CACHE_CONTROL,
+    content_type="image/jpeg",
+):
+    byte_range = parse_range_header(request.META.get("HTTP_RANGE"))
+    storage = get_storage()
+
+    if byte_range is None:
+        # concurrent downloads of the same (small) picture share a single storage read
+        picture, content = read_picture(storage, key, pictureCoalesceMaxBytes)
+        if content is not None:
+            response = HttpResponse(content, content_type=content_type)
+            return __set_picture_headers__(response, picture, picture_hash, cache_control)
+    else:
+        picture = storage.stream(key, byte_range=byte_range)
+
+    # NOTE: the object body is forwarded in fixed-size chunks instead of being read
+    # into memory, so each download only holds one chunk in the worker at a time
+    response = StreamingHttpResponse(
+        iter_stream_chunks(picture.body, pictureStreamChunkSize),
+        content_type=content_type,
+        status=status.HTTP_206_PARTIAL_CONTENT if picture.content_range else status.HTTP_200_OK,
+    )
+    return __set_picture_headers__(response, picture, picture_hash, cache_control)
+
+
+def __set_picture_headers__(response, picture, picture_hash, cache_control):
+    response["Content-Length"] = str(picture.content_length)
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = cache_control
+    if picture_hash is not None:
+        response["ETag"] = picture_etag(picture_hash)
+    if picture.content_range:
+        response["Content-Range"] = picture.content_range
+    return response
+
 
+def __not_modified_response__(picture_hash, cache_control):
+    response = HttpResponseNotModified()
+    response["ETag"] = picture_etag(picture_hash)
+    response["Cache-Control"] = cache_control
+    return response
 
-def __upload_profile_picture__(request):  # pragma: no cover
-    if s3Config == None:
+
+def __storage_unavailable_response__(error, placeholder=None):
+    # the storage circuit breaker is open, clients can paint the placeholder in the meantime
+    data = {
+        "error": str(error),
+        "message": "picture storage is temporarily unavailable",
+    }
+    if placeholder is not None:
+        data["placeholder"] = placeholder
+    response = json_response(data=data, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response["Retry-After"] = str(error.retry_after)
+    return response
+
+
+def __invalid_range_response__():
+    return json_response(
+        {
+            "error": "requested range not satisfiable",
+            "message": "the requested byte range is outside of the picture",
+        },
+        status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+    )
+
+
+def __rejected_upload_response__(request):
+    # reading the body is what streams the upload into storage (and possibly rejects it)
+    request.FILES
+    rejected = getattr(request, "rejected_upload", None)
+    if rejected is None:
+        return None
+    if isinstance(rejected, StorageUnavailable):
+        return __storage_unavailable_response__(rejected)
+    if isinstance(rejected, StorageError):
         return json_response(
-            data={"error": "failed to upload profile picture due to internal error"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            {
+                "error": rejected.__str__(),
+                "message": "failed to upload file",
+            },
+            status=status.HTTP_400_BAD_REQUEST,
         )
+    return json_response({"error": rejected.error, "message": rejected.message}, rejected.status)
+
+
+def __upload_profile_picture__(request):
+    rejected_upload_response = __rejected_upload_response__(request)
+    if rejected_upload_response is not None:
+        return rejected_upload_response
 
-    picture = request.FILES["profile_picture"]
+    picture = request.FILES.get("profile_picture")
 
     if picture == None:
         return json_response(
@@ -345,12 +599,11 @@ def __upload_profile_picture__(request):  # pragma: no cover
         )
 
     try:
-        upload_path = make_s3_path(
-            s3AssetsFolder, str(request.user.id), "profile-picture", "picture"
-        )
-        # NOTE: if the Key is the same, the object(s) are overwritten
-        s3Client.put_object(Bucket=s3BucketName, Body=picture, Key=upload_path)
-    except ClientError as e:
+        # NOTE: pictures are stored by content hash, identical uploads share one object
+        picture_hash = store_picture(get_storage(), picture)
+    except StorageUnavailable as e:
+        return __storage_unavailable_response__(e)
+    except StorageError as e:
         return json_response(
             {
                 "error": e.__str__(),
@@ -359,13 +612,20 @@ def __upload_profile_picture__(request):  # pragma: no cover
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    __set_record_picture__(request.user, picture_hash, picture)
+
     return json_response(
-        data={"message": "profile picture has been updated"},
+        data={
+            "message": "profile picture has been updated",
+            "picture_hash": picture_hash,
+            "picture_version": request.user.picture_version,
+        },
         status=status.HTTP_201_CREATED,
     )
 
 
-@csrf_protect
+@stream_picture_uploads
+@csrf_protect_session
 @api_view(["POST", "GET", "OPTIONS", "DELETE"])
 def handle_pet_pictures(request):
     if not request.user.is_authenticated:
@@ -374,12 +634,6 @@ def handle_pet_pictures(request):
             status=status.HTTP_401_UNAUTHORIZED,
         )
 
-    if s3Config == None:
-        return json_response(
-            data={"error": "failed to upload picture due to internal error"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
-
     if request.method == "GET":
         return __get_user_pet_picture__(request)
 
@@ -398,6 +652,50 @@ def handle_pet_pictures(request):
     )
 
 
+@csrf_protect_session
+@api_view(["GET", "OPTIONS"])
+def serve_picture(request, picture_hash):
+    if not request.user.is_authenticated:
+        return json_response(
+            data={"error": "unauthenticated request. rejected"},
+            status=status.HTTP_401_UNAUTHORIZED,
+        )
+
+    if not is_picture_hash(picture_hash):
+        return json_response(
+            data={"error": "no picture present with the given hash"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    if etag_matches(request, picture_hash):
+        return __not_modified_response__(picture_hash, IMMUTABLE_CACHE_CONTROL)
+
+    try:
+        return __stream_picture__(
+            request,
+            picture_key(picture_hash),
+            picture_hash=picture_hash,
+            cache_control=IMMUTABLE_CACHE_CONTROL,
+        )
+    except InvalidRange:
+        return __invalid_range_response__()
+    except ObjectNotFound:
+        return json_response(
+            data={"error": "no picture present with the given hash"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    except StorageUnavailable as e:
+        return __storage_unavailable_response__(e)
+    except StorageError as e:
+        return json_response(
+            data={
+                "error": "failed to fetch picture, ({})".format(e),
+                "message": "unknown error occurred while fetching picture",
+            },
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
 # This class is for the user location(s)
 class UserLocationView(APIView):  # type: ignore
     # Fetch the locations serializer
@@ -431,6 +729,10 @@ class UserLocationView(APIView):  # type: ignore
             "zipcode": location.zipcode,
             "user_id": location.user_id,
             "default_location": location.default_location,
+            "normalized_address": location.normalized_address,
+            "borough": location.borough,
+            "latitude": location.latitude,
+            "longitude": location.longitude,
         }
 
     # takes as input a user_id and returns a JSON of all the locations for that user
@@ -449,6 +751,10 @@ class UserLocationView(APIView):  # type: ignore
                 "country": location.country,
                 "zipcode": location.zipcode,
                 "default_location": location.default_location,
+                "normalized_address": location.normalized_address,
+                "borough": location.borough,
+                "latitude": location.latitude,
+                "longitude": location.longitude,
             }
             for location in locations
         ]
@@ -576,6 +882,13 @@ def user_location_view(request):
         return json_response({"isAuthenticated": False}, status=status.HTTP_401_UNAUTHORIZED)
 
     if request.method == "GET":
+        if request.GET.get("default") == "true":
+            return json_response(
+                location_view.get_location_record(Locations.objects.default_for(request.user)),
+                status=status.HTTP_200_OK,
+                safe=False,
+                include_data=False,
+            )
         try:
             l = request.GET["location_id"]
             if l != None:
@@ -612,7 +925,7 @@ def user_location_view(request):
     )
 
 
-def __get_user_pet_picture__(request):  # pragma: no cover
+def __get_user_pet_picture__(request):
     pet_id = request.GET["id"]
     owner_id = request.GET["owner_id"]
     if owner_id is None:
@@ -627,24 +940,29 @@ def __get_user_pet_picture__(request):  # pragma: no cover
             status=status.HTTP_404_NOT_FOUND,
         )
 
-    pet_picture_path = make_s3_path(s3AssetsFolder, str(owner_id), "pets", str(pet_info.id))
+    picture_hash = pet_info.picture_hash
+    if picture_hash is None:
+        # pictures uploaded before they were stored by content hash
+        pet_picture_path = make_s3_path(s3AssetsFolder, str(owner_id), "pets", str(pet_info.id))
+    else:
+        pet_picture_path = picture_key(picture_hash)
+
+    if pet_info.has_picture is False:
+        # known to be missing, answered without a storage round trip
+        return __pet_picture_not_found_response__(owner_id, pet_info)
+    if picture_hash is not None and etag_matches(request, picture_hash):
+        return __not_modified_response__(picture_hash, MUTABLE_CACHE_CONTROL)
 
     try:
-        image_object = s3Client.get_object(Bucket=s3BucketName, Key=pet_picture_path)
-        object_content = image_object["Body"].read()
-        return HttpResponse(object_content, content_type="image/jpeg")
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "NoSuchKey":
-            return json_response(
-                {
-                    "data": {
-                        "message": "no pet picture present with current user({}) and pet({})".format(
-                            owner_id, pet_info.name
-                        )
-                    }
-                },
-                status=status.HTTP_404_NOT_FOUND,
-            )
+        response = __stream_picture__(request, pet_picture_path, picture_hash=picture_hash)
+    except InvalidRange:
+        return __invalid_range_response__()
+    except ObjectNotFound:
+        __record_picture_presence__(pet_info, False)
+        return __pet_picture_not_found_response__(owner_id, pet_info)
+    except StorageUnavailable as e:
+        return __storage_unavailable_response__(e, pet_info.picture_placeholder)
+    except StorageError as e:
         return json_response(
             data={
                 "error": "failed to fetch pet picture, ({})".format(e.__str__()),
@@ -652,9 +970,28 @@ def __get_user_pet_picture__(request):  # pragma: no cover
             },
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
+    __record_picture_presence__(pet_info, True)
+    return response
 
 
-def __put_user_pet_picture__(request):  # pragma: no cover
+def __pet_picture_not_found_response__(owner_id, pet_info):
+    return json_response(
+        {
+            "data": {
+                "message": "no pet picture present with current user({}) and pet({})".format(
+                    owner_id, pet_info.name
+                )
+            }
+        },
+        status=status.HTTP_404_NOT_FOUND,
+    )
+
+
+def __put_user_pet_picture__(request):
+    rejected_upload_response = __rejected_upload_response__(request)
+    if rejected_upload_response is not None:
+        return rejected_upload_response
+
     pet_id = request.data["pet_id"]
 
     pet_info = Pets.objects.filter(id=pet_id, owner=request.user.id).first()
@@ -665,7 +1002,7 @@ def __put_user_pet_picture__(request):  # pragma: no cover
             status=status.HTTP_404_NOT_FOUND,
         )
 
-    picture = request.FILES["pet_picture"]
+    picture = request.FILES.get("pet_picture")
 
     if picture == None:
         return json_response(
@@ -685,10 +1022,11 @@ def __put_user_pet_picture__(request):  # pragma: no cover
         )
 
     try:
-        upload_path = make_s3_path(s3AssetsFolder, str(request.user.id), "pets", str(pet_info.id))
-        # NOTE: if the Key is the same, the object(s) are overwritten
-        s3Client.put_object(Bucket=s3BucketName, Body=picture, Key=upload_path)
-    except ClientError as e:
+        # NOTE: pictures are stored by content hash, identical uploads share one object
+        picture_hash = store_picture(get_storage(), picture)
+    except StorageUnavailable as e:
+        return __storage_unavailable_response__(e)
+    except StorageError as e:
         return json_response(
             {
                 "error": e.__str__(),
@@ -697,13 +1035,19 @@ def __put_user_pet_picture__(request):  # pragma: no cover
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    __set_record_picture__(pet_info, picture_hash, picture)
+
     return json_response(
-        data={"message": "pet picture has been updated"},
+        data={
+            "message": "pet picture has been updated",
+            "picture_hash": picture_hash,
+            "picture_version": pet_info.picture_version,
+        },
         status=status.HTTP_201_CREATED,
     )
 
 
-def __delete_user_pet_picture__(request):  # pragma: no cover
+def __delete_user_pet_picture__(request):
     pet_id = request.data["pet_id"]
 
     pet_info = Pets.objects.filter(name=pet_id, owner=request.user.id).first()
@@ -719,25 +1063,19 @@ def __delete_user_pet_picture__(request):  # pragma: no cover
     pet_picture_path = make_s3_path(s3AssetsFolder, str(request.user.id), "pets", str(pet_info.id))
 
     try:
-        s3Client.delete_object(Bucket=s3BucketName, Key=pet_picture_path)
+        # the content-addressed object may be shared with other records, only the
+        # reference is dropped here (the legacy per-pet object is removed right away)
+        get_storage().delete(pet_picture_path)
+        __clear_record_picture__(pet_info)
         return json_response(
             data={
                 "data": {"message": "deleted pet({}) picture successful".format(pet_info.name)},
             },
             status=status.HTTP_200_OK,
         )
-    except ClientError as e:
-        if e.response["Error"]["Code"] == "NoSuchKey":
-            return json_response(
-                {
-                    "data": {
-                        "message": "no pet picture present with current user({}) and pet({})".format(
-                            request.user.id, pet_info.name
-                        )
-                    }
-                },
-                status=status.HTTP_200_OK,
-            )
+    except StorageUnavailable as e:
+        return __storage_unavailable_response__(e)
+    except StorageError as e:
         return json_response(
             data={
                 "error": "failed to fetch pet picture, ({})".format(e.__str__()),
@@ -786,13 +1124,44 @@ class JobView(APIView):
 
     def get_all(self, owner_id=None):
         self.job_status_check()
+        jobs = self.filter_by_pet(Jobs.objects.filter(status="open"))
         if owner_id:
-            return Jobs.objects.filter(status="open").exclude(user=owner_id)
-        return Jobs.objects.filter(status="open")
+            return jobs.exclude(user=owner_id).select_related("pet")
+        return jobs.select_related("pet")
+
+    def filter_by_pet(self, jobs):
+        # ?species_id= & ?breed_id= (see taxonomy_view) compare the taxonomy ids of the pets
+        for param, field in (
+            ("species_id", "pet__species_taxon_id"),
+            ("breed_id", "pet__breed_taxon_id"),
+        ):
+            value = self.request.query_params.get(param)
+            if value != None:
+                if not value.isdigit():
+                    raise ParseError("{} must be an id".format(param))
+                jobs = jobs.filter(**{field: int(value)})
+        # ?weight_min=, ?weight_max=, ?height_min= & ?height_max= are measurements, e.g. "20 lb"
+        # or "50cm" (see api/measurements.py), compared to the parsed weight & height of the pets
+        for param, parse, lookup in (
+            ("weight_min", parse_weight, "pet__weight_grams__gte"),
+            ("weight_max", parse_weight, "pet__weight_grams__lte"),
+            ("height_min", parse_height, "pet__height_cm__gte"),
+            ("height_max", parse_height, "pet__height_cm__lte"),
+        ):
+            value = self.request.query_params.get(param)
+            if value != None:
+                try:
+                    measurement = parse(value)
+                except ImplausibleMeasurement as e:
+                    raise ParseError("{} {}".format(param, e))
+                if measurement == None:
+                    raise ParseError("{} must be a measurement, e.g. 20lb or 50cm".format(param))
+                jobs = jobs.filter(**{lookup: measurement})
+        return jobs
 
     def get_queryset(self):
         self.job_status_check()
-        return Jobs.objects.filter(user_id=self.request.user.id)  # type: ignore
+        return Jobs.objects.filter(user_id=self.request.user.id).select_related("pet")  # type: ignore
 
     def get_object(self, job_id):
         try:
@@ -923,6 +1292,7 @@ class ApplicationView(APIView):
                     application.save()
 
                     Notifications.objects.create(
+                        recipient=application.user,
                         data=json.dumps(
                             {
                                 "job_id": str(job_instance.id),
@@ -933,7 +1303,7 @@ class ApplicationView(APIView):
                                     "message": f"Please connect with the owner on phone number {'' if application.job.user.phone_number is None else application.job.user.phone_number} to discuss other details",
                                 },
                             }
-                        )
+                        ),
                     )
 
                     # You can perform additional actions based on the new status if needed
@@ -1015,7 +1385,7 @@ class ApplicationView(APIView):
             )
 
 
-@csrf_protect
+@csrf_protect_session
 @api_view(["GET", "OPTIONS"])
 def notifications_view(request):
     if not request.user.is_authenticated:
@@ -1023,8 +1393,9 @@ def notifications_view(request):
             {"detail": "You're not logged in."}, status=status.HTTP_400_BAD_REQUEST
         )
 
-    current_notifications = Notifications.objects.all()
+    current_notifications = Notifications.objects.filter(recipient_id=request.user.id)
     notifs = []
+    unread_ids = []
     for cn in current_notifications:
         notifs.append(
             {
@@ -1034,4 +1405,30 @@ def notifications_view(request):
                 "updated_at": cn.updated_at,
             }
         )
+        if cn.read_at == None:
+            unread_ids.append(cn.id)
+    # what the recipient has been sent is left out of their notification digests, the (polled)
+    # view only writes when there's something new
+    if len(unread_ids) > 0:
+        Notifications.objects.filter(id__in=unread_ids, read_at=None).update(
+            read_at=datetime.now(timezone.utc)
+        )
     return json_response({"notifications": notifs}, status=status.HTTP_200_OK)
+
+
+@api_view(["GET", "OPTIONS"])
+def taxonomy_view(request):
+    # autocomplete of the species & breeds, ?q=<prefix>[&species_id=<id>]
+    if not request.user.is_authenticated:
+        return json_response(
+            {"detail": "You're not logged in."}, status=status.HTTP_400_BAD_REQUEST
+        )
+    species_id = request.GET.get("species_id")
+    if species_id != None and not species_id.isdigit():
+        return json_response(
+            {"error": "species_id must be an id"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    matches = get_taxonomy().autocomplete(
+        request.GET.get("q", ""), int(species_id) if species_id != None else None
+    )
+    return json_response(matches, status=status.HTTP_200_OK)
@@ -12,5 +12,12 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "furbaby.settings")
+# serve the picture endpoints through the non-blocking handlers in api/async_views.py
+os.environ.setdefault("ASYNC_PICTURE_VIEWS", "true")
+# and the login through the one awaiting the password hashing pool (see api/hashing.py)
+os.environ.setdefault("ASYNC_LOGIN_VIEW", "true")
+# the synchronous code of each request (views, ORM calls) runs on a thread of its own, its
+# persistent connection would be left open once the request ends (the pool can be used instead)
+os.environ.setdefault("DATABASE_CONN_MAX_AGE", "0")
 
 application = get_asgi_application()
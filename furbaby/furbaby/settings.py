@@ -37,7 +37,11 @@ def get_s3_assets_path():
 
 S3_CONFIG = AWSConfig(
     region_name="us-east-1",
-    retries={"max_attempts": 10, "mode": "standard"},
+    # fail (and let the circuit breaker below count the failure) instead of holding a worker
+    # for minutes when S3 degrades
+    connect_timeout=float(os.environ.get("S3_CONNECT_TIMEOUT", "2")),
+    read_timeout=float(os.environ.get("S3_READ_TIMEOUT", "5")),
+    retries={"max_attempts": 3, "mode": "standard"},
     signature_version="v4",
 )
 
@@ -45,6 +49,92 @@ AWS_BUCKET_NAME = os.environ.get("AWS_BUCKET_NAME", "")
 
 ASSETS_PATH = get_s3_assets_path()
 
+# backend used by the picture endpoints, see api/storage.py for the available backends
+PICTURE_STORAGE = {
+    "BACKEND": "api.storage.S3Storage",
+    "OPTIONS": {"bucket_name": AWS_BUCKET_NAME, "config": S3_CONFIG},
+}
+
+# pictures are streamed back to clients in chunks of this size (bytes), which bounds
+# the memory held per download regardless of the size of the stored object
+PICTURE_STREAM_CHUNK_SIZE = 64 * 1024
+# concurrent full downloads of the same picture within a worker share one storage read, pictures
+# up to this size (bytes) are read into memory once and served to every waiting request, larger
+# ones are streamed (read by each request on its own in the async views)
+PICTURE_COALESCE_MAX_BYTES = 1024 * 1024
+# picture uploads are streamed into storage while they are received (see api/uploads.py),
+# larger ones are rejected with a 413 as soon as they cross this size (bytes)
+PICTURE_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+
+# the async picture handlers (enabled by default under ASGI, see furbaby/asgi.py) run storage
+# calls on a dedicated pool of this many threads, each call is given at most
+# PICTURE_STORAGE_TIMEOUT seconds before the request is answered with a 504
+ASYNC_PICTURE_VIEWS = os.environ.get("ASYNC_PICTURE_VIEWS", "false").lower() == "true"
+PICTURE_STORAGE_EXECUTOR_WORKERS = int(os.environ.get("PICTURE_STORAGE_EXECUTOR_WORKERS", "16"))
+PICTURE_STORAGE_TIMEOUT = float(os.environ.get("PICTURE_STORAGE_TIMEOUT", "10"))
+# the async login (enabled by default under ASGI too) awaits the password hashing pool below
+ASYNC_LOGIN_VIEW = os.environ.get("ASYNC_LOGIN_VIEW", "false").lower() == "true"
+
+# passwords are hashed & checked on a pool of this many processes (0, the default, hashes them
+# inline: every request worker spawns a pool of its own, so e.g. one process per CPU would
+# oversubscribe a host running several workers), once PASSWORD_HASHING_MAX_PENDING are queued
+# further logins & registrations get a 429 (see api/hashing.py)
+PASSWORD_HASHING_WORKERS = int(os.environ.get("PASSWORD_HASHING_WORKERS", "0"))
+PASSWORD_HASHING_MAX_PENDING = int(os.environ.get("PASSWORD_HASHING_MAX_PENDING", "32"))
+
+# once half of the last (at least 20) storage calls failed, picture requests are answered with a
+# 503 right away for 30s, then a few probe calls decide whether the storage recovered
+# (see api/circuit_breaker.py, set to None to disable)
+PICTURE_STORAGE_CIRCUIT_BREAKER = {
+    "failure_rate_threshold": 0.5,
+    "minimum_calls": 20,
+    "window_size": 50,
+    "reset_timeout": 30,
+    "half_open_max_calls": 3,
+}
+
+# deleted accounts are disabled right away and their rows deleted by a background job in
+# batches of this many rows (see api/account_deletion.py)
+ACCOUNT_DELETION_BATCH_SIZE = 1000
+ACCOUNT_DELETION_IN_BACKGROUND = True
+
+# sessions, and anything else cached, go to a cache shared by all the workers when REDIS_URL is
+# set (needs the redis package), otherwise every process keeps its own
+REDIS_URL = os.environ.get("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "furbaby",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
+# sessions are read from the cache and only from the database on a miss (see api/sessions.py),
+# "django.contrib.sessions.backends.signed_cookies" keeps them in the cookie instead (no lookup
+# at all, but they can't be revoked server side) and "django.contrib.sessions.backends.db" is
+# Django's default
+SESSION_ENGINE = os.environ.get("SESSION_ENGINE", "api.sessions")
+# a session ended in one worker stays valid in the caches of the others for at most this long
+SESSION_CACHE_MAX_AGE = None if REDIS_URL else 60
+# the columns of the authenticated user needed for authorization are cached this long (see
+# api/user_cache.py), a per process cache only learns about changes made by its own worker
+USER_CACHE_TIMEOUT = 60 * 60 if REDIS_URL else 60
+# every process keeps the species & breeds taxonomy in memory this long (see api/taxonomy.py)
+TAXONOMY_CACHE_TIMEOUT = 5 * 60
+
+# lifetimes (seconds) of the signed tokens handed out by /auth/token (see api/tokens.py), without
+# a shared cache a revoked access token stays usable in the other workers for at most this long
+ACCESS_TOKEN_LIFETIME = 15 * 60
+REFRESH_TOKEN_LIFETIME = 14 * 24 * 60 * 60
+
 # NOTE: perhaps very few opportunities to test this feature...but nevertheless it would mostly work
 os.environ.setdefault("FORGOT_PASSWORD_HOST", "https://ui.furbabyapi.net")
 
@@ -119,13 +209,28 @@ WSGI_APPLICATION = "furbaby.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # the postgresql backend, with health checks & an optional pool (see api/db/base.py)
+        "ENGINE": "api.db",
         "NAME": "db",
         "USER": "root",
         "PASSWORD": os.environ.get("AWS_RDS_DATABASE_PASSWORD", ""),
         "HOST": "awseb-e-n3h4ykpptm-stack-awsebrdsdatabase-5tlrcwj3rs0l.ckzyhv20mvw0.us-east-1.rds.amazonaws.com",
         "PORT": "5432",
         "ATOMIC_REQUESTS": True,
+        # seconds a worker thread keeps its connection between requests (0 closes it after each
+        # one, the default under ASGI, see furbaby/asgi.py), the connection is checked before its
+        # first use in a request
+        "CONN_MAX_AGE": int(os.environ.get("DATABASE_CONN_MAX_AGE", "600")),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            # connections shared by the threads of a process when DATABASE_POOL_MAX_SIZE is above
+            # 0, which needs DATABASE_CONN_MAX_AGE=0 (the pool keeps them open instead)
+            "pool": {
+                "min_size": int(os.environ.get("DATABASE_POOL_MIN_SIZE", "4")),
+                "max_size": int(os.environ.get("DATABASE_POOL_MAX_SIZE", "0")),
+                "timeout": float(os.environ.get("DATABASE_POOL_TIMEOUT", "5")),
+            },
+        },
         "TEST": {
             "NAME": "tests_migrated",
             "MIGRATE": False,
@@ -136,6 +241,8 @@ DATABASES = {
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.SessionAuthentication",
+        # "Authorization: Bearer <access token>" for clients without a session (see api/tokens.py)
+        "api.authentication.BearerTokenAuthentication",
     ],
     "EXCEPTION_HANDLER": "drf_standardized_errors.handler.exception_handler",
 }
@@ -195,6 +302,8 @@ HEARTBEAT = {
         "heartbeat.checkers.debug_mode",
         "heartbeat.checkers.python",
         "heartbeat.checkers.database",
+        "api.checkers.picture_reads",
+        "api.checkers.picture_storage",
     ],
     "auth": {
         "username": "furbaby-api",
@@ -245,7 +354,10 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 # Email Backend Configuration
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# "django.core.mail.backends.console.EmailBackend" or "...filebased.EmailBackend" (writing to
+# EMAIL_FILE_PATH) stand in for SMTP locally & in benchmarks
+EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "django.core.mail.backends.smtp.EmailBackend")
+EMAIL_FILE_PATH = os.environ.get("EMAIL_FILE_PATH", str(BASE_DIR / "sent-emails"))
 
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True  # Set to False if perhaps you have a local mailserver running
@@ -253,6 +365,26 @@ EMAIL_HOST = "smtp.gmail.com"
 EMAIL_HOST_USER = os.environ.get("EMAIL_APP_USERNAME")
 EMAIL_HOST_PASSWORD = os.environ.get("EMAIL_APP_PASSWORD")
 
+# emails are queued in the outbox table and sent in batches of this many over one connection,
+# failed sends are retried up to EMAIL_OUTBOX_MAX_ATTEMPTS times, waiting
+# EMAIL_OUTBOX_RETRY_BACKOFF seconds (doubled on every attempt) in between (see api/outbox.py)
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_BACKOFF = 30
+# claimed emails left unsent this many seconds (by a sender that went away) are due again
+EMAIL_OUTBOX_CLAIM_TIMEOUT = 10 * 60
+# drains the outbox in a background thread of the web worker after each request queueing an
+# email, in addition to `manage.py send_outbox_emails`; only for development, deployments run
+# `manage.py send_outbox_emails --loop` instead
+EMAIL_OUTBOX_SEND_ON_COMMIT = DEBUG
+# emails/s sent by each outbox sender at most (the SMTP relay rejects bursts), 0 for no limit
+EMAIL_OUTBOX_MAX_RATE = float(os.environ.get("EMAIL_OUTBOX_MAX_RATE", "10"))
+
+# notifications unread for NOTIFICATION_DIGEST_MIN_AGE seconds are emailed to their recipient by
+# `manage.py send_notification_digests`, up to NOTIFICATION_DIGEST_MAX_ITEMS per digest
+NOTIFICATION_DIGEST_MIN_AGE = 60 * 60
+NOTIFICATION_DIGEST_MAX_ITEMS = 10
+
 GIT_COMMIT_SHORT_HASH = os.environ.get("GIT_COMMIT_SHORT_HASH", "")
 
 # # subprocess.check_output(["git", "rev-parse", "--short", "HEAD"])